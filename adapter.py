@@ -5,52 +5,147 @@ This handles different import scenarios and provides a consistent interface.
 
 import sys
 import os
+import json
 import importlib.util
 
+# Component roots are resolved relative to this file, not the working directory
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Candidate roots, relative to MODULE_DIR, that may contain src/PromptFeedbackChain.*
+SEARCH_PATHS = [
+    ".",  # This directory
+    "..",  # Parent directory
+    "../..",  # Grandparent directory
+    "src",  # src directory
+    "../src",  # Parent's src directory
+]
+
+COMPONENT_FILES = ("PromptFeedbackChain.py", "PromptFeedbackChain.ts", "PromptFeedbackChain.js")
+
+# Where the discovered location is remembered between processes; "" disables it
+DEFAULT_MANIFEST_PATH = os.path.join("~", ".cache", "langchain-prompt-feedback", "adapter.json")
+
+
+# Discovery results by use_manifest, shared by every adapter in the process
+_discovered = {}
+
+
+def _manifest_path():
+    """Get the manifest location from FEEDBACK_ADAPTER_MANIFEST, or None if disabled"""
+    path = os.environ.get("FEEDBACK_ADAPTER_MANIFEST", DEFAULT_MANIFEST_PATH)
+    return os.path.expanduser(path) if path else None
+
+
+def _read_manifest(path):
+    """Get the component file recorded for this module, if it still exists"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        entry = manifest.get(MODULE_DIR)
+    except (OSError, ValueError, AttributeError):
+        return None
+    # One stat confirms the cached location instead of probing every candidate
+    if isinstance(entry, dict) and os.path.isfile(os.path.join(entry.get("root", ""), "src", entry.get("file", ""))):
+        return entry
+    return None
+
+
+def _write_manifest(path, entry):
+    """Record the component location for this module; failures (e.g. read-only disks) are ignored"""
+    try:
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if not isinstance(manifest, dict):
+                manifest = {}
+        except (OSError, ValueError):
+            manifest = {}
+        manifest[MODULE_DIR] = entry
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(temporary, path)
+    except OSError:
+        pass
+
+
+def _probe(path):
+    """Get the manifest entry for a candidate root if it holds the component, or None"""
+    root = os.path.normpath(os.path.join(MODULE_DIR, path))
+    for name in COMPONENT_FILES:
+        if os.path.isfile(os.path.join(root, "src", name)):
+            return {"root": root, "path": path, "file": name}
+    return None
+
+
+def _find_component_root(paths=SEARCH_PATHS):
+    """Probe the candidate roots and return the manifest entry for the first match, or None"""
+    for path in paths:
+        entry = _probe(path)
+        if entry is not None:
+            return entry
+    return None
+
+
+def _add_to_sys_path(path):
+    """Put a directory on sys.path unless it is already there"""
+    if not any(os.path.abspath(entry or ".") == path for entry in sys.path):
+        sys.path.append(path)
+
+
+def discover_component(use_manifest=True):
+    """
+    Find the component and return (direct_import, import_path, root).
+
+    An installed `langchain_prompt_feedback` package wins. Otherwise the usual layout
+    (src/ next to this file) is checked with a single stat; only when it doesn't hold
+    the component is the remembered root read from the manifest, and the other roots
+    are only probed (and the manifest rewritten) when that misses too. Results are
+    cached for the life of the process.
+    """
+    if use_manifest in _discovered:
+        return _discovered[use_manifest]
+
+    if importlib.util.find_spec("langchain_prompt_feedback") is not None:
+        result = (True, "package", None)
+    else:
+        entry = _probe(SEARCH_PATHS[0])
+        if entry is None:
+            manifest = _manifest_path() if use_manifest else None
+            entry = _read_manifest(manifest) if manifest else None
+            if entry is None:
+                entry = _find_component_root(SEARCH_PATHS[1:])
+                if entry is not None and manifest:
+                    _write_manifest(manifest, entry)
+        result = (False, entry["path"], entry["root"]) if entry else (False, None, None)
+
+    _discovered[use_manifest] = result
+    return result
+
+
 class ComponentAdapter:
     """Adapter for the LangChain Prompt Feedback Component"""
     
-    def __init__(self):
+    def __init__(self, use_manifest=True):
         """Initialize the adapter and detect the component location"""
         self.direct_import = False
         self.component_available = False
         self.import_path = None
         
         # Try to detect the component
-        self._detect_component()
+        self._detect_component(use_manifest)
     
-    def _detect_component(self):
+    def _detect_component(self, use_manifest=True):
         """Detect how to import the component"""
-        # Try direct import (installed package)
-        try:
-            import langchain_prompt_feedback
-            self.direct_import = True
-            self.component_available = True
-            self.import_path = "package"
+        direct_import, import_path, root = discover_component(use_manifest)
+        if import_path is None:
             return
-        except ImportError:
-            pass
-        
-        # Try relative import (repository structure)
-        paths_to_check = [
-            ".",  # Current directory
-            "..",  # Parent directory
-            "../..",  # Grandparent directory
-            "src",  # src directory
-            "../src",  # Parent's src directory
-        ]
-        
-        for path in paths_to_check:
-            # Check if the path exists and contains the necessary files
-            if os.path.exists(os.path.join(path, "src")):
-                if os.path.exists(os.path.join(path, "src", "PromptFeedbackChain.ts")) or \
-                   os.path.exists(os.path.join(path, "src", "PromptFeedbackChain.js")) or \
-                   os.path.exists(os.path.join(path, "src", "PromptFeedbackChain.py")):
-                    sys.path.append(os.path.abspath(path))
-                    self.direct_import = False
-                    self.component_available = True
-                    self.import_path = path
-                    return
+        self.direct_import = direct_import
+        self.component_available = True
+        self.import_path = import_path
+        if root is not None:
+            _add_to_sys_path(root)
     
     def get_prompt_feedback_chain(self):
         """Get the PromptFeedbackChain class"""
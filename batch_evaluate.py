@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Batch evaluator for large prompt files.
+Streams prompts from JSONL or CSV and writes one feedback record per line to a JSONL file.
+Heuristic scoring runs in a process pool, LLM calls run with bounded concurrency, and
+progress is checkpointed so an interrupted run can be resumed.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from src.PromptFeedbackEvaluator import PromptFeedbackEvaluator
+from src.registry import get_evaluator
+from src.topics import TopicIndex
+from src.utils import create_feedback_criteria
+
+
+CRITERIA_NAMES = ("clarity", "context", "constraints", "examples", "format")
+
+# Heuristic evaluator for the current worker process, set by _init_worker
+_worker_evaluator = None
+
+
+def _init_worker(config):
+    """Create the heuristic evaluator for a worker process"""
+    global _worker_evaluator
+    _worker_evaluator = PromptFeedbackEvaluator(dict(config, useLLM=False))
+
+
+def heuristic_feedback(evaluator, prompt):
+    """Run the heuristic stage on a prompt, noting in the suggestions when it was cut at maxPromptLength"""
+    return evaluator.run_heuristic_stage(evaluator.process_input(prompt), len(prompt))
+
+
+def _heuristic_feedback(prompt):
+    """Run the heuristic stage in a worker process"""
+    return heuristic_feedback(_worker_evaluator, prompt)
+
+
+def detect_format(path):
+    """Guess the input format from the file extension"""
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_records(path, input_format, prompt_field, id_field):
+    """Yield {"id", "prompt"} records from a JSONL or CSV file without loading it into memory"""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = csv.DictReader(f) if input_format == "csv" else (line for line in f if line.strip())
+        for index, row in enumerate(rows):
+            if input_format != "csv":
+                try:
+                    row = json.loads(row)
+                except ValueError:
+                    row = {}
+            prompt = row.get(prompt_field) if isinstance(row, dict) else row
+            record_id = row.get(id_field, index) if isinstance(row, dict) else index
+            yield {"id": record_id, "prompt": prompt if isinstance(prompt, str) else None}
+
+
+def load_checkpoint(path, input_path, restart=False):
+    """Load the checkpoint for a run, or start a fresh one"""
+    state = {"input": os.path.abspath(input_path), "processed": 0, "output_bytes": 0}
+    if restart or not os.path.exists(path):
+        return state
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    if saved.get("input") != state["input"]:
+        raise ValueError(f"Checkpoint {path} belongs to {saved.get('input')}; use --restart to start over")
+    state.update(saved)
+    return state
+
+
+def save_checkpoint(path, state):
+    """Atomically write the checkpoint"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def evaluate_chunk(records, heuristic_pool, llm_pool, evaluator, workers, topic_index=None):
+    """Evaluate a chunk of records and return their output records in input order"""
+    prompts = [record["prompt"] or "" for record in records]
+
+    # Heuristic scoring, spread across the process pool
+    if heuristic_pool is not None:
+        chunksize = max(1, len(prompts) // (workers * 4))
+        heuristics = list(heuristic_pool.map(_heuristic_feedback, prompts, chunksize=chunksize))
+    else:
+        heuristics = [heuristic_feedback(evaluator, p) for p in prompts]
+
+    results = [
+        {"id": record["id"], "feedback": feedback}
+        if record["prompt"] is not None else
+        {"id": record["id"], "feedback": None, "error": "Missing or invalid prompt"}
+        for record, feedback in zip(records, heuristics)
+    ]
+    if topic_index is not None:
+        # Ranked against every prompt of the run so far, including earlier chunks
+        for record, result in zip(records, results):
+            if record["prompt"] is not None:
+                result["topics"] = topic_index.extract(record["prompt"])
+
+    # LLM evaluation, bounded by the thread pool size
+    if evaluator.llm is not None:
+        def llm_feedback(index):
+            try:
+                return index, evaluator.get_llm_feedback(evaluator.process_input(prompts[index])), None
+            except Exception as e:
+                return index, None, str(e)
+
+        def llm_pack_feedback(indices):
+            try:
+                outcomes = evaluator.get_packed_llm_feedback([evaluator.process_input(prompts[i]) for i in indices])
+            except Exception as e:
+                outcomes = [e] * len(indices)
+            return [
+                (index, None, str(outcome)) if isinstance(outcome, Exception) else (index, outcome, None)
+                for index, outcome in zip(indices, outcomes)
+            ]
+
+        pending = [i for i, record in enumerate(records)
+                   if record["prompt"] is not None and len(evaluator.process_input(prompts[i])) > 20]
+        if evaluator.config["packSize"] > 1:
+            # Several prompts per request, sharing one copy of the system prompt
+            packs = evaluator.pack_prompts([evaluator.process_input(prompts[i]) for i in pending])
+            outcomes = itertools.chain.from_iterable(
+                llm_pool.map(llm_pack_feedback, [[pending[i] for i in pack] for pack in packs])
+            )
+        else:
+            outcomes = llm_pool.map(llm_feedback, pending)
+        for index, feedback, error in outcomes:
+            if error is not None:
+                # Keep the heuristic feedback and record why the LLM step failed
+                results[index]["error"] = error
+            else:
+                results[index]["feedback"] = evaluator.combine_feedback(heuristics[index], feedback)
+    return results
+
+
+def run(args):
+    """Evaluate the input file and write the results"""
+    input_format = args.format or detect_format(args.input)
+    checkpoint_path = args.checkpoint or args.output + ".checkpoint"
+    state = load_checkpoint(checkpoint_path, args.input, restart=args.restart)
+    # Checkpoints from earlier versions held the whole topic index; it is now rebuilt on resume
+    state.pop("topics", None)
+    topic_index = TopicIndex() if args.topics else None
+
+    criteria = create_feedback_criteria({name: name not in args.skip_criteria for name in CRITERIA_NAMES})
+    config = {
+        "criteria": criteria,
+        "useLLM": args.use_llm,
+        "llmModel": args.model if args.use_llm else None,
+        "maxPromptLength": args.max_prompt_length,
+        "openAIApiKey": args.api_key or os.environ.get("OPENAI_API_KEY"),
+        "openAIBaseUrl": args.base_url,
+        "resilience": {"requestsPerSecond": args.rate_limit, "maxRetries": args.max_retries},
+        "packSize": args.pack_size,
+    }
+    evaluator = get_evaluator(config)
+
+    records = read_records(args.input, input_format, args.prompt_field, args.id_field)
+    if state["processed"]:
+        print(f"ℹ️ Resuming after {state['processed']} records", file=sys.stderr)
+        for record in itertools.islice(records, state["processed"]):
+            # Rebuild the topic index from the records already evaluated, so checkpoints stay small
+            if topic_index is not None and record["prompt"] is not None:
+                topic_index.add(record["prompt"])
+
+    heuristic_pool = None
+    if args.workers > 0:
+        heuristic_pool = ProcessPoolExecutor(
+            max_workers=args.workers, initializer=_init_worker,
+            initargs=({key: value for key, value in config.items() if key != "openAIApiKey"},)
+        )
+    llm_pool = ThreadPoolExecutor(max_workers=args.concurrency) if evaluator.llm is not None else None
+
+    started = time.time()
+    done = 0
+    mode = "r+b" if os.path.exists(args.output) and not args.restart else "w+b"
+    try:
+        with open(args.output, mode) as out:
+            if os.fstat(out.fileno()).st_size < state["output_bytes"]:
+                raise ValueError(f"{args.output} is shorter than its checkpoint; use --restart to start over")
+            # Drop anything written after the last checkpoint (e.g. a partial chunk before a crash)
+            out.truncate(state["output_bytes"])
+            out.seek(state["output_bytes"])
+            while True:
+                chunk = list(itertools.islice(records, args.chunk_size))
+                if not chunk:
+                    break
+                for result in evaluate_chunk(chunk, heuristic_pool, llm_pool, evaluator, args.workers, topic_index):
+                    out.write((json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8"))
+                out.flush()
+                os.fsync(out.fileno())
+
+                done += len(chunk)
+                state["processed"] += len(chunk)
+                state["output_bytes"] = out.tell()
+                save_checkpoint(checkpoint_path, state)
+                rate = done / max(time.time() - started, 1e-9)
+                print(f"✅ {state['processed']} records evaluated ({rate:.0f}/s)", file=sys.stderr)
+    finally:
+        if heuristic_pool is not None:
+            heuristic_pool.shutdown()
+        if llm_pool is not None:
+            llm_pool.shutdown()
+
+    print(f"✅ Done: {state['processed']} records written to {args.output}", file=sys.stderr)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Evaluate a JSONL or CSV file of prompts and write feedback as JSONL")
+    parser.add_argument("input", help="Input file (.jsonl or .csv)")
+    parser.add_argument("output", help="Output JSONL file")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format (default: from the file extension)")
+    parser.add_argument("--prompt-field", default="prompt", help="Field or column holding the prompt (default: prompt)")
+    parser.add_argument("--id-field", default="id", help="Field or column holding the record id (default: id, else the record index)")
+    parser.add_argument("--use-llm", action="store_true", help="Add LLM feedback (requires an API key)")
+    parser.add_argument("--model", default="gpt-3.5-turbo", help="OpenAI model for LLM feedback (default: gpt-3.5-turbo)")
+    parser.add_argument("--api-key", help="OpenAI API key (default: OPENAI_API_KEY)")
+    parser.add_argument("--base-url", help="OpenAI-compatible API base URL, e.g. a local fake_openai_server.py")
+    parser.add_argument("--skip-criteria", nargs="*", default=[], choices=CRITERIA_NAMES, help="Criteria to disable")
+    parser.add_argument("--max-prompt-length", type=int, default=2000, help="Maximum prompt length to evaluate (default: 2000)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Heuristic worker processes, 0 to run in-process (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum concurrent LLM requests (default: 8)")
+    parser.add_argument("--rate-limit", type=float, help="Maximum LLM requests per second (default: unlimited)")
+    parser.add_argument("--max-retries", type=int, default=2,
+                        help="Retries for throttled or failed LLM requests, with jittered backoff (default: 2)")
+    parser.add_argument("--pack-size", type=int, default=1,
+                        help="Prompts sent per LLM request; above 1, prompts are packed into shared requests (default: 1)")
+    parser.add_argument("--topics", action="store_true",
+                        help="Add each prompt's key topics, ranked by TF-IDF over the prompts evaluated so far")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Records evaluated between checkpoints (default: 1000)")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and overwrite the output")
+    args = parser.parse_args()
+
+    if args.use_llm and not (args.api_key or os.environ.get("OPENAI_API_KEY")):
+        print("❌ --use-llm requires --api-key or OPENAI_API_KEY")
+        sys.exit(1)
+    if args.chunk_size < 1 or args.concurrency < 1 or args.pack_size < 1 or args.workers < 0:
+        print("❌ --chunk-size, --concurrency and --pack-size must be at least 1 and --workers at least 0")
+        sys.exit(1)
+    if (args.rate_limit is not None and args.rate_limit <= 0) or args.max_retries < 0:
+        print("❌ --rate-limit must be positive and --max-retries at least 0")
+        sys.exit(1)
+
+    try:
+        run(args)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped; run the same command again to resume", file=sys.stderr)
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
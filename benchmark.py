@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the prompt feedback evaluation paths.
+Measures throughput, p50/p95/p99 latency and peak memory for heuristic evaluation,
+topic extraction, LLM response parsing and the end-to-end feedback path with a stubbed LLM,
+and reports them as JSON so results can be compared between versions.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from src.cache import FeedbackCache, cache_key
+from src.PromptFeedbackChain import PromptFeedbackChain
+from src.PromptFeedbackEvaluator import PromptFeedbackEvaluator
+from src.topics import TopicIndex
+from src.utils import create_default_feedback_criteria, extract_key_topics
+
+
+PROMPT_SIZES = (10, 100, 1000, 10000, 100000)
+
+SAMPLE_TEXT = (
+    "Explain the concept of quantum computing to a high school student because they are "
+    "preparing for a science fair. Use a numbered list, avoid jargon, and give one "
+    "concrete example of a problem a quantum computer could solve faster? "
+)
+
+LLM_RESPONSE = json.dumps({
+    "score": 72,
+    "strengths": ["Clear audience", "Specifies output format"],
+    "weaknesses": ["Could define the expected length"],
+    "suggestions": ["Add a word limit", "Mention the level of math allowed"],
+    "improvedPrompt": "Explain quantum computing to a high school student in 5 numbered points of under 50 words each."
+})
+
+
+class StubLLM:
+    """Stand-in chat model that returns a fixed feedback response after an optional delay"""
+
+    class Response:
+        """Minimal chat response"""
+
+        def __init__(self, content):
+            self.content = content
+
+    def __init__(self, latency=0.0):
+        """Create a stub that sleeps `latency` seconds per call"""
+        self.latency = latency
+
+    def invoke(self, messages):
+        """Return the canned feedback response"""
+        if self.latency:
+            time.sleep(self.latency)
+        return self.Response(f"Here is my evaluation:\n{LLM_RESPONSE}\nHope this helps!")
+
+
+def make_prompt(size):
+    """Create a prompt of exactly `size` characters"""
+    return (SAMPLE_TEXT * (size // len(SAMPLE_TEXT) + 1))[:size]
+
+
+def percentile(sorted_values, fraction):
+    """Get a percentile from sorted values using the nearest-rank method"""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def measure(func, min_iterations, min_time):
+    """Time repeated calls of `func` and measure its peak traced memory"""
+    func()  # Warm up
+
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < min_iterations or time.perf_counter() - started < min_time:
+        call_started = time.perf_counter_ns()
+        func()
+        latencies.append(time.perf_counter_ns() - call_started)
+    elapsed = time.perf_counter() - started
+
+    # Memory is traced in a separate pass so tracing overhead doesn't skew latency
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "iterations": len(latencies),
+        "throughput_per_s": len(latencies) / elapsed,
+        "p50_us": percentile(latencies, 0.50) / 1000,
+        "p95_us": percentile(latencies, 0.95) / 1000,
+        "p99_us": percentile(latencies, 0.99) / 1000,
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def build_benchmarks(llm_latency, cache_dir):
+    """Create the (name, params, func) benchmark cases"""
+    criteria = create_default_feedback_criteria()
+    heuristic_evaluator = PromptFeedbackEvaluator({"criteria": criteria, "useLLM": False})
+    cases = []
+
+    for size in PROMPT_SIZES:
+        prompt = make_prompt(size)
+        cases.append(("heuristic", {"prompt_chars": size},
+                      lambda p=prompt: heuristic_evaluator.run_heuristic_evaluation(p)))
+
+    for size in PROMPT_SIZES:
+        prompt = make_prompt(size)
+        cases.append(("topics", {"prompt_chars": size}, lambda p=prompt: extract_key_topics(p)))
+
+    # TF-IDF topics against a corpus of earlier prompts
+    topic_index = TopicIndex()
+    for i in range(1000):
+        topic_index.add(f"{make_prompt(1000)} subject{i} variant{i % 10}")
+    for size in PROMPT_SIZES:
+        prompt = make_prompt(size)
+        cases.append(("topics_tfidf", {"prompt_chars": size, "corpus": 1000},
+                      lambda p=prompt: topic_index.topics(p)))
+
+    response = StubLLM().invoke([]).content
+    cases.append(("parse_llm_response", {"response_chars": len(response)},
+                  lambda: heuristic_evaluator.parse_llm_response(response)))
+
+    # End-to-end: cache lookup, evaluation with a stubbed LLM, then cache write, like get_feedback
+    feedback_cache = FeedbackCache(os.path.join(cache_dir, "bench.sqlite3"))
+    chain = PromptFeedbackChain(evaluator=PromptFeedbackEvaluator(
+        {"criteria": criteria, "llmModel": "stub"}, llm=StubLLM(llm_latency)
+    ))
+    counter = iter(range(sys.maxsize))
+
+    def get_feedback(hit):
+        prompt = make_prompt(300) if hit else f"{next(counter)} {make_prompt(300)}"
+        key = cache_key(prompt, criteria, "stub")
+        cached = feedback_cache.get(key)
+        if cached is not None:
+            return cached
+        feedback = chain.call({"input": prompt})["feedback"]
+        feedback_cache.set(key, feedback)
+        return feedback
+
+    cases.append(("end_to_end", {"cache": "miss", "llm_latency_ms": llm_latency * 1000},
+                  lambda: get_feedback(False)))
+    cases.append(("end_to_end", {"cache": "hit", "llm_latency_ms": llm_latency * 1000},
+                  lambda: get_feedback(True)))
+    return cases
+
+
+def compare(results, baseline, threshold):
+    """Return descriptions of cases whose p50 latency regressed past the threshold"""
+    previous = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["name"], json.dumps(result["params"], sort_keys=True)))
+        if before and result["p50_us"] > before["p50_us"] * (1 + threshold):
+            regressions.append(
+                f"{result['name']} {result['params']}: p50 {before['p50_us']:.1f}us -> {result['p50_us']:.1f}us"
+            )
+    return regressions
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark the prompt feedback evaluation paths")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--only", nargs="*", help="Only run benchmarks with these names")
+    parser.add_argument("--min-iterations", type=int, default=50, help="Minimum iterations per case (default: 50)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum seconds per case (default: 0.5)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated LLM latency (default: 0)")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed p50 slowdown against the baseline before failing (default: 0.2)")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, params, func in build_benchmarks(args.llm_latency_ms / 1000, cache_dir):
+            if args.only and name not in args.only:
+                continue
+            result = {"name": name, "params": params}
+            result.update(measure(func, args.min_iterations, args.min_time))
+            results.append(result)
+            print(f"⏱️ {name} {params}: p50 {result['p50_us']:.1f}us, "
+                  f"{result['throughput_per_s']:.0f}/s", file=sys.stderr)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stand-in server for load and latency testing.
+Serves /v1/chat/completions with schema-valid prompt feedback JSON, with configurable
+latency, error and rate-limit behaviour, so the app and batch tools can be exercised offline.
+
+Point clients at it with OPENAI_BASE_URL=http://127.0.0.1:8008/v1 and any API key.
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.utils import calculate_basic_prompt_score, extract_key_topics
+
+
+_QUOTED_PROMPT = re.compile(r'Evaluate this prompt: "(.*)"\s*$', re.DOTALL)
+_PACKED_PROMPTS = re.compile(r'Evaluate each of these prompts:\s*(\[.*\])\s*$', re.DOTALL)
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution spec into a sampler returning seconds.
+
+    Supported specs: `fixed:S`, `uniform:MIN,MAX`, `normal:MEAN,STDDEV` and
+    `lognormal:MU,SIGMA` (parameters of the underlying normal, in log-seconds).
+    """
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(value) for value in params.split(",")] if params else []
+    except ValueError:
+        raise ValueError(f"Invalid latency spec: {spec}")
+    samplers = {
+        "fixed": (1, lambda s: s),
+        "uniform": (2, random.uniform),
+        "normal": (2, random.gauss),
+        "lognormal": (2, random.lognormvariate),
+    }
+    if kind not in samplers or len(values) != samplers[kind][0]:
+        raise ValueError(f"Invalid latency spec: {spec}")
+    sampler = samplers[kind][1]
+    return lambda: max(0.0, sampler(*values))
+
+
+def build_feedback(prompt):
+    """Build a schema-valid feedback object for a prompt"""
+    score = calculate_basic_prompt_score(prompt)
+    topics = extract_key_topics(prompt)
+    topic = topics[0] if topics else "the task"
+    return {
+        "score": score,
+        "strengths": [f"Focuses on {topic}"] if topics else [],
+        "weaknesses": [] if score >= 75 else ["Could give more detail about the expected answer"],
+        "suggestions": ["State the audience and the desired length", "Specify the output format"],
+        "improvedPrompt": f"{prompt.strip()} Answer in 3-5 bullet points for a general audience.",
+    }
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Request handler emulating the chat completions API"""
+
+    server_version = "FakeOpenAI/0.1"
+
+    def log_message(self, format, *args):
+        """Only log requests when running verbosely"""
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body, headers=None):
+        """Send a JSON response"""
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status, message, error_type, code, headers=None):
+        """Send an error in the OpenAI error format"""
+        self.server.count(str(status))
+        self._send_json(status, {"error": {"message": message, "type": error_type, "code": code}}, headers)
+
+    def do_GET(self):
+        """Serve the model list and request statistics"""
+        if self.path.rstrip("/").endswith("/models"):
+            models = [{"id": model, "object": "model", "owned_by": "fake"} for model in ("gpt-3.5-turbo", "gpt-4", "gpt-4-turbo")]
+            self._send_json(200, {"object": "list", "data": models})
+        elif self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.snapshot())
+        else:
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        """Serve chat completions"""
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_error(400, "Invalid JSON body", "invalid_request_error", None)
+            return
+
+        options = self.server.options
+        if not self.server.acquire():
+            self._send_error(429, "Too many concurrent requests", "requests", "rate_limit_exceeded",
+                             {"Retry-After": str(options.retry_after)})
+            return
+        try:
+            self._complete(request, options)
+        finally:
+            self.server.release()
+
+    def _complete(self, request, options):
+        """Simulate latency and failures, then send the completion"""
+        roll = random.random()
+        if roll < options.rate_limit_rate:
+            self._send_error(429, "Rate limit reached", "requests", "rate_limit_exceeded",
+                             {"Retry-After": str(options.retry_after)})
+            return
+        time.sleep(self.server.latency())
+        if roll < options.rate_limit_rate + options.error_rate:
+            self._send_error(500, "The server had an error while processing your request", "server_error", None)
+            return
+
+        messages = request.get("messages") or []
+        user_text = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        packed = _PACKED_PROMPTS.search(user_text or "")
+        match = _QUOTED_PROMPT.search(user_text or "")
+        prompt = match.group(1) if match else user_text or ""
+        if random.random() < options.malformed_rate:
+            content = "I could not produce structured feedback for this prompt."
+        elif packed:
+            # Packed bulk request: one feedback object per prompt, tagged with its id
+            items = json.loads(packed.group(1))
+            content = json.dumps([dict(build_feedback(item["prompt"]), id=item["id"]) for item in items], indent=2)
+        else:
+            content = json.dumps(build_feedback(prompt), indent=2)
+
+        model = request.get("model", "gpt-3.5-turbo")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                 "total_tokens": prompt_tokens + len(content) // 4}
+        self.server.count("200")
+
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def send_chunk(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        send_chunk({"role": "assistant", "content": ""})
+        for start in range(0, len(content), options.chunk_chars):
+            if options.chunk_delay:
+                time.sleep(options.chunk_delay)
+            send_chunk({"content": content[start:start + options.chunk_chars]})
+        send_chunk({}, "stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Threaded HTTP server that tracks concurrency and response counts"""
+
+    daemon_threads = True
+
+    def __init__(self, address, options):
+        """Create the server with the parsed command-line options"""
+        super().__init__(address, FakeOpenAIHandler)
+        self.options = options
+        self.latency = parse_latency(options.latency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._counts = {}
+
+    def acquire(self):
+        """Reserve a request slot, or return False when over --max-concurrency"""
+        with self._lock:
+            if self.options.max_concurrency and self._in_flight >= self.options.max_concurrency:
+                return False
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+            return True
+
+    def release(self):
+        """Release a request slot"""
+        with self._lock:
+            self._in_flight -= 1
+
+    def count(self, status):
+        """Count a response by status"""
+        with self._lock:
+            self._counts[status] = self._counts.get(status, 0) + 1
+
+    def snapshot(self):
+        """Get the current request statistics"""
+        with self._lock:
+            return {"in_flight": self._in_flight, "peak_in_flight": self._peak_in_flight,
+                    "responses": dict(self._counts)}
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible server for load testing")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8008, help="Port to listen on (default: 8008)")
+    parser.add_argument("--latency", default="fixed:0.5",
+                        help="Latency distribution: fixed:S, uniform:MIN,MAX, normal:MEAN,SD or lognormal:MU,SIGMA (default: fixed:0.5)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500 (default: 0)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429 (default: 0)")
+    parser.add_argument("--max-concurrency", type=int, default=0,
+                        help="Answer 429 when more requests than this are in flight, 0 for no limit (default: 0)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429 responses (default: 1)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="Fraction of completions that are not valid feedback JSON (default: 0)")
+    parser.add_argument("--chunk-chars", type=int, default=16, help="Characters per streamed chunk (default: 16)")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="Seconds between streamed chunks (default: 0.01)")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible runs")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    options = parser.parse_args()
+
+    if options.seed is not None:
+        random.seed(options.seed)
+    try:
+        server = FakeOpenAIServer((options.host, options.port), options)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"🚀 Fake OpenAI server listening on http://{options.host}:{options.port}/v1")
+    print(f"   export OPENAI_BASE_URL=http://{options.host}:{options.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Headless HTTP evaluation service.
+Serves prompt feedback over HTTP with asyncio, so other services (and the Streamlit app,
+see FEEDBACK_SERVICE_URL) can get feedback without embedding Streamlit, and evaluation
+can be scaled separately from the UI. Heuristic scoring runs in a pre-forked pool of
+worker processes and LLM calls in a bounded thread pool; requests beyond the service's
+capacity are turned away with 503 and Retry-After instead of queueing without bound.
+
+Endpoints (request bodies are JSON with a prompt or prompts plus evaluation options):
+  POST /evaluate         {"prompt": ...}          -> {"feedback": FeedbackResult}
+  POST /evaluate/batch   {"prompts": [...]}       -> {"results": [{"feedback": ...} or {"error": ...}]}
+  POST /evaluate/stream  {"prompt": ...}          -> FeedbackEvents as JSON lines, as each stage finishes
+  GET  /health                                    -> capacity and current load
+  GET  /metrics                                   -> Prometheus metrics
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager
+from http import HTTPStatus
+
+from src.PromptFeedbackEvaluator import PromptFeedbackEvaluator
+from src.cache import FeedbackCache, cache_key, evaluation_options, should_cache
+from src.interfaces import empty_feedback, feedback_event
+from src.metrics import metrics
+from src.registry import get_evaluator
+from src.similarity import NearDuplicateCache
+from src.utils import create_feedback_criteria
+
+
+# Evaluation options a request may set; the API base URL and resilience options are the service's
+OPTION_KEYS = ("criteria", "useLLM", "llmModel", "maxPromptLength", "streamLLM", "longPromptMode",
+               "chunkTokens", "maxChunks", "chunkConcurrency", "routing", "openAIApiKey")
+ENDPOINTS = ("/evaluate", "/evaluate/batch", "/evaluate/stream", "/health", "/metrics")
+MAX_BODY_BYTES = 1 << 20
+MAX_HEADERS = 100
+
+# Heuristic evaluators of the current worker process, by criteria
+_worker_evaluators = {}
+
+
+def _start_worker():
+    """Keep a worker busy briefly, so the pool starts every worker up front"""
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def _heuristic_stage(criteria, prompt, original_length):
+    """Run the heuristic stage in a worker process; returns (feedback, seconds)"""
+    key = json.dumps(criteria, sort_keys=True)
+    evaluator = _worker_evaluators.get(key)
+    if evaluator is None:
+        if len(_worker_evaluators) >= 64:
+            _worker_evaluators.clear()
+        evaluator = _worker_evaluators[key] = PromptFeedbackEvaluator({"criteria": criteria, "useLLM": False})
+    started = time.perf_counter()
+    feedback = evaluator.run_heuristic_stage(prompt, original_length)
+    return feedback, time.perf_counter() - started
+
+
+@asynccontextmanager
+async def aclosing(generator):
+    """Close an async generator when the block exits, like contextlib.aclosing on Python 3.10+"""
+    try:
+        yield generator
+    finally:
+        await generator.aclose()
+
+
+class HTTPError(Exception):
+    """An error answered with an HTTP status and a JSON {"error": message} body"""
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class FeedbackService:
+    """
+    Asyncio HTTP server for prompt feedback.
+
+    Evaluations follow the Streamlit app's path: repeats are served from the
+    feedback cache, the heuristic stage runs in the worker pool, and the LLM
+    stage (routing, long prompt chunks, streaming) runs in a thread of the LLM
+    pool. At most `max_concurrency` prompts are evaluated at once and at most
+    `max_queue` more wait for a slot; requests that would exceed that get 503.
+    """
+
+    def __init__(self, workers=0, max_concurrency=16, max_queue=256, max_batch=100, api_key=None,
+                 base_url=None, resilience=None, cache=None, similarity_cache=None):
+        """Create a service; call start() before serving"""
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.api_key = api_key
+        self.base_url = base_url
+        self.resilience = resilience
+        self.cache = cache
+        self.similarity_cache = similarity_cache
+        self.pending = 0
+        self.heuristic_pool = None
+        self.llm_pool = None
+        self._slots = None
+
+    def start(self):
+        """Pre-fork the heuristic workers and create the LLM thread pool"""
+        if self.workers > 0:
+            # Fork before any threads exist, and start every worker now rather than on first use
+            self.heuristic_pool = ProcessPoolExecutor(max_workers=self.workers)
+            wait([self.heuristic_pool.submit(_start_worker) for _ in range(self.workers)])
+        self.llm_pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="feedback-llm")
+        if self.api_key:
+            # Import LangChain and create the default LLM client before the first request needs them
+            self.llm_pool.submit(get_evaluator, self.config({}), self.similarity_cache)
+
+    def close(self):
+        """Shut the pools down"""
+        if self.heuristic_pool is not None:
+            self.heuristic_pool.shutdown(cancel_futures=True)
+        if self.llm_pool is not None:
+            self.llm_pool.shutdown(wait=False, cancel_futures=True)
+
+    def config(self, options):
+        """Build an evaluator config from a request's options"""
+        config = {key: options[key] for key in OPTION_KEYS if options.get(key) is not None}
+        if not isinstance(config.get("criteria", {}), dict):
+            raise HTTPError(400, "criteria must be an object")
+        config["criteria"] = create_feedback_criteria(config.get("criteria"))
+        config.setdefault("openAIApiKey", self.api_key)
+        config.setdefault("useLLM", bool(config["openAIApiKey"]))
+        if config["useLLM"] and not config["openAIApiKey"]:
+            raise HTTPError(400, "useLLM requires an API key; set openAIApiKey or start the service with one")
+        config["openAIBaseUrl"] = self.base_url
+        config["resilience"] = self.resilience
+        return config
+
+    def _admit(self, count):
+        """Reserve capacity for `count` prompts, or refuse the request"""
+        if count > self.max_batch:
+            raise HTTPError(413, f"At most {self.max_batch} prompts per request")
+        if self.pending + count > self.max_concurrency + self.max_queue:
+            raise HTTPError(503, "Service busy, retry later", retry_after=1)
+        self.pending += count
+
+    async def _in_thread(self, iterator):
+        """
+        Iterate a blocking iterator in the LLM pool without blocking the event loop.
+        Once the consumer stops (e.g. the client disconnected), the iterator is closed
+        after its current step, releasing the pool thread and its LLM request.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+        stopped = threading.Event()
+        iterator = iter(iterator)
+
+        def put(item, error=None):
+            if not stopped.is_set():
+                loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+
+        def drain():
+            try:
+                while not stopped.is_set():
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        break
+                    put(item)
+            except Exception as e:
+                put(done, e)
+                return
+            finally:
+                if stopped.is_set() and hasattr(iterator, "close"):
+                    iterator.close()
+            put(done)
+
+        loop.run_in_executor(self.llm_pool, drain)
+        try:
+            while True:
+                item, error = await queue.get()
+                if error is not None:
+                    raise error
+                if item is done:
+                    return
+                yield item
+        finally:
+            stopped.set()
+
+    async def _heuristics(self, evaluator, config, prompt, original_length):
+        """Run the heuristic stage in the worker pool, or in process without workers"""
+        if self.heuristic_pool is None:
+            return evaluator.run_heuristic_stage(prompt, original_length)
+        loop = asyncio.get_running_loop()
+        feedback, seconds = await loop.run_in_executor(
+            self.heuristic_pool, _heuristic_stage, config["criteria"], prompt, original_length
+        )
+        metrics.observe("feedback_stage_seconds", seconds, stage="heuristic")
+        return feedback
+
+    async def stream_events(self, prompt, options):
+        """
+        Evaluate a prompt, yielding FeedbackEvents as each stage finishes. `llm` events hold
+        the LLM feedback so far combined with the heuristic feedback, ready to display.
+        """
+        config = self.config(options)
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            # Building an evaluator may import LangChain and create a client, so keep it off the loop
+            evaluator = await loop.run_in_executor(self.llm_pool, get_evaluator, config, self.similarity_cache)
+            model = evaluator.config["llmModel"] if config["useLLM"] else None
+            key = cache_key(prompt, config["criteria"], model, evaluation_options(config))
+            cached = await loop.run_in_executor(None, self.cache.get, key) if self.cache else None
+            if cached is not None:
+                yield feedback_event("complete", cached, prompt)
+                return
+
+            processed = evaluator.process_input(prompt)
+            yield feedback_event("initial", empty_feedback(), processed)
+            heuristic_feedback = await self._heuristics(evaluator, config, processed, len(prompt))
+            yield feedback_event("heuristic", heuristic_feedback, processed)
+
+            async for event in self._in_thread(evaluator.stream_llm_stage(processed, heuristic_feedback)):
+                if event["type"] == "llm":
+                    event = dict(event, feedback=evaluator.combine_feedback(heuristic_feedback, event["feedback"]))
+                elif event["type"] == "complete" and self.cache:
+                    # Don't persist fallbacks for a failed or unparseable LLM call
+                    if should_cache(event["feedback"]):
+                        await loop.run_in_executor(None, self.cache.set, key, event["feedback"])
+                yield event
+
+    async def evaluate(self, prompt, options):
+        """Evaluate a prompt and return the complete feedback"""
+        async with aclosing(self.stream_events(prompt, options)) as events:
+            async for event in events:
+                if event["type"] == "complete":
+                    return event["feedback"]
+
+    async def _evaluate_result(self, prompt, options):
+        """Evaluate one prompt of a batch as {"feedback": ...} or {"error": ...}"""
+        if not isinstance(prompt, str):
+            return {"error": "Missing or invalid prompt"}
+        try:
+            return {"feedback": await self.evaluate(prompt, options)}
+        except HTTPError as e:
+            return {"error": str(e)}
+        except Exception as e:
+            print(f"Error evaluating prompt: {e}", file=sys.stderr)
+            return {"error": str(e)}
+
+    async def _read_request(self, reader):
+        """Read one request as (method, path, version, headers, body), or None at end of stream"""
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HTTPError(431, "Too many headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HTTPError(411, "Send a Content-Length instead of a chunked body")
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"Request bodies are limited to {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length > 0 else b""
+        return method.upper(), target.split("?", 1)[0], version, headers, body
+
+    @staticmethod
+    def _head(status, content_type, keep_alive, extra=()):
+        """Build a response's status line and headers"""
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", f"Content-Type: {content_type}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}", *extra]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _send(self, writer, status, payload, keep_alive=True, extra=(), content_type="application/json"):
+        """Send a complete response; `payload` is JSON-encoded unless it is bytes"""
+        body = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        extra = [f"Content-Length: {len(body)}", *extra]
+        writer.write(self._head(status, content_type, keep_alive, extra) + body)
+        await writer.drain()
+
+    async def _stream(self, writer, prompt, options, keep_alive):
+        """Send FeedbackEvents as JSON lines in a chunked response, waiting for slow clients to read them"""
+        writer.write(self._head(200, "application/x-ndjson", keep_alive, ["Transfer-Encoding: chunked"]))
+        async with aclosing(self.stream_events(prompt, options)) as events:
+            try:
+                async for event in events:
+                    data = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+                    writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    await writer.drain()
+            except Exception as e:
+                # Headers are already sent, so report the failure as the last line
+                data = (json.dumps({"error": str(e)}) + "\n").encode("utf-8")
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _dispatch(self, writer, method, path, body, keep_alive):
+        """Route a request; returns the response status"""
+        if method == "GET" and path == "/health":
+            await self._send(writer, 200, {
+                "status": "ok",
+                "workers": self.workers,
+                "maxConcurrency": self.max_concurrency,
+                "maxQueue": self.max_queue,
+                "pending": self.pending,
+            }, keep_alive)
+            return 200
+        if method == "GET" and path == "/metrics":
+            await self._send(writer, 200, metrics.render().encode("utf-8"), keep_alive,
+                             content_type="text/plain; version=0.0.4; charset=utf-8")
+            return 200
+        if path not in ENDPOINTS[:3]:
+            raise HTTPError(404, "Not found")
+        if method != "POST":
+            raise HTTPError(405, "Use POST")
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Request body must be JSON")
+        if not isinstance(request, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+
+        if path == "/evaluate/batch":
+            prompts = request.get("prompts")
+            if not isinstance(prompts, list):
+                raise HTTPError(400, "prompts must be a list")
+            self.config(request)
+            self._admit(len(prompts))
+            try:
+                results = await asyncio.gather(*(self._evaluate_result(prompt, request) for prompt in prompts))
+            finally:
+                self.pending -= len(prompts)
+            await self._send(writer, 200, {"results": results}, keep_alive)
+            return 200
+
+        prompt = request.get("prompt")
+        if not isinstance(prompt, str):
+            raise HTTPError(400, "prompt must be a string")
+        self.config(request)
+        self._admit(1)
+        try:
+            if path == "/evaluate/stream":
+                await self._stream(writer, prompt, request, keep_alive)
+            else:
+                await self._send(writer, 200, {"feedback": await self.evaluate(prompt, request)}, keep_alive)
+        finally:
+            self.pending -= 1
+        return 200
+
+    async def handle(self, reader, writer):
+        """Serve the requests of one connection"""
+        try:
+            while True:
+                endpoint, keep_alive = "other", False
+                try:
+                    try:
+                        request = await self._read_request(reader)
+                    except ValueError:
+                        # A request or header line over the stream reader's limit
+                        raise HTTPError(431, "Request header too large")
+                    if request is None:
+                        break
+                    method, path, version, headers, body = request
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                    if path in ENDPOINTS:
+                        endpoint = path
+                    status = await self._dispatch(writer, method, path, body, keep_alive)
+                except HTTPError as e:
+                    status = e.status
+                    extra = [f"Retry-After: {e.retry_after}"] if e.retry_after else []
+                    await self._send(writer, e.status, {"error": str(e)}, keep_alive, extra)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    break
+                except Exception as e:
+                    print(f"Error handling request: {e}", file=sys.stderr)
+                    status = 500
+                    await self._send(writer, 500, {"error": str(e)}, keep_alive)
+                metrics.inc("feedback_service_requests_total", endpoint=endpoint, status=status)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8010, ready=None):
+        """Serve until cancelled; calls ready(server) once listening"""
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        server = await asyncio.start_server(self.handle, host, port)
+        if ready is not None:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Serve prompt feedback over HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8010, help="Port to listen on (default: 8010)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Heuristic worker processes, 0 to run in-process (default: CPU count)")
+    parser.add_argument("--max-concurrency", type=int, default=16,
+                        help="Prompts evaluated at once, and LLM threads (default: 16)")
+    parser.add_argument("--max-queue", type=int, default=256,
+                        help="Prompts waiting for a slot before requests get 503 (default: 256)")
+    parser.add_argument("--max-batch", type=int, default=100, help="Most prompts per batch request (default: 100)")
+    parser.add_argument("--api-key", help="OpenAI API key for requests that don't send one (default: OPENAI_API_KEY)")
+    parser.add_argument("--base-url", help="OpenAI-compatible API base URL, e.g. a local fake_openai_server.py")
+    parser.add_argument("--rate-limit", type=float, help="Maximum LLM requests per second (default: unlimited)")
+    parser.add_argument("--max-retries", type=int, default=2,
+                        help="Retries for throttled or failed LLM requests, with jittered backoff (default: 2)")
+    parser.add_argument("--no-cache", action="store_true", help="Don't use the feedback and near-duplicate caches")
+    args = parser.parse_args()
+
+    if args.workers < 0 or args.max_concurrency < 1 or args.max_queue < 0 or args.max_batch < 1:
+        print("❌ --max-concurrency and --max-batch must be at least 1 and --workers and --max-queue at least 0")
+        sys.exit(1)
+    if (args.rate_limit is not None and args.rate_limit <= 0) or args.max_retries < 0:
+        print("❌ --rate-limit must be positive and --max-retries at least 0")
+        sys.exit(1)
+
+    service = FeedbackService(
+        workers=args.workers,
+        max_concurrency=args.max_concurrency,
+        max_queue=args.max_queue,
+        max_batch=args.max_batch,
+        api_key=args.api_key or os.environ.get("OPENAI_API_KEY"),
+        base_url=args.base_url,
+        resilience={"requestsPerSecond": args.rate_limit, "maxRetries": args.max_retries},
+        cache=None if args.no_cache else FeedbackCache.from_env(),
+        similarity_cache=None if args.no_cache else NearDuplicateCache.from_env(),
+    )
+    service.start()
+
+    def ready(server):
+        address = server.sockets[0].getsockname()
+        print(f"🚀 Feedback service on http://{address[0]}:{address[1]} "
+              f"({args.workers} heuristic workers, {args.max_concurrency} concurrent evaluations)", file=sys.stderr)
+
+    try:
+        asyncio.run(service.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
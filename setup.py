@@ -11,9 +11,9 @@ import argparse
 from pathlib import Path
 
 def check_python_version():
-    """Check if Python version is 3.7 or higher"""
-    if sys.version_info < (3, 7):
-        print("Error: Python 3.7 or higher is required.")
+    """Check if Python version is 3.9 or higher"""
+    if sys.version_info < (3, 9):
+        print("Error: Python 3.9 or higher is required.")
         sys.exit(1)
     print(f"✅ Python version: {sys.version.split()[0]}")
 
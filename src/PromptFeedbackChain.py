@@ -0,0 +1,52 @@
+"""
+Chain for providing feedback on prompts.
+Python port of src/PromptFeedbackChain.ts, used by the Streamlit app and the adapter.
+"""
+
+from .PromptFeedbackEvaluator import PromptFeedbackEvaluator
+from .utils import create_default_feedback_criteria
+
+
+class PromptFeedbackChain:
+    """Chain for providing feedback on prompts"""
+
+    def __init__(self, config=None, evaluator=None):
+        """
+        Create a new chain; `config` takes criteria, inputKey, outputKey and evaluator
+        options. Pass `evaluator` to reuse an existing (e.g. pooled) evaluator instead.
+        """
+        config = dict(config or {})
+        criteria = config.pop("criteria", None) or create_default_feedback_criteria()
+        self.input_key = config.pop("inputKey", "input")
+        self.output_key = config.pop("outputKey", "feedback")
+        self.evaluator = evaluator or PromptFeedbackEvaluator({"criteria": criteria, **config})
+
+    @property
+    def input_keys(self):
+        """Get the input keys for the chain"""
+        return [self.input_key]
+
+    @property
+    def output_keys(self):
+        """Get the output keys for the chain"""
+        return [self.output_key]
+
+    def _chain_type(self):
+        """Get the chain type"""
+        return "prompt_feedback_chain"
+
+    def call(self, values):
+        """Process a prompt and return its feedback under the output key"""
+        prompt = values.get(self.input_key)
+        if not isinstance(prompt, str):
+            raise TypeError(f"Expected string for {self.input_key}, got {type(prompt).__name__}")
+
+        return {self.output_key: self.evaluator.evaluate(prompt)}
+
+    def stream_feedback(self, input_text):
+        """Stream feedback events for a prompt as each evaluation stage finishes"""
+        return self.evaluator.stream_feedback(input_text)
+
+    def get_evaluator(self):
+        """Get the prompt feedback evaluator"""
+        return self.evaluator
@@ -0,0 +1,782 @@
+"""
+Core class for evaluating prompts and providing feedback.
+Python port of src/PromptFeedbackEvaluator.ts.
+"""
+
+import asyncio
+import copy
+import json
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from .cache import key_fingerprint
+from .interfaces import empty_feedback, fallback_feedback, feedback_event
+from .metrics import metrics
+from .resilience import CircuitOpenError, RateLimitExceededError, llm_guards
+from .routing import ModelRouter
+from .singleflight import llm_flights
+from .streaming import FeedbackStreamParser, partial_feedback
+from .tokens import get_token_counter, split_into_chunks
+from .utils import HEURISTIC_MATCHER
+
+
+SYSTEM_PROMPT = """
+You are an expert prompt engineer. Analyze the user's prompt and provide constructive feedback.
+Evaluate the prompt on these criteria:
+1. Clarity: Is it clear what is being asked?
+2. Specificity: Does it provide specific details?
+3. Context: Does it include necessary background information?
+4. Constraints: Does it specify any constraints or requirements?
+5. Output format: Does it specify the desired output format?
+
+Respond with a JSON object in this exact format:
+{
+  "score": <number between 0-100>,
+  "strengths": [<list of strings highlighting what's good about the prompt>],
+  "weaknesses": [<list of strings identifying areas for improvement>],
+  "suggestions": [<list of specific suggestions to improve the prompt>],
+  "improvedPrompt": "<an improved version of the prompt>"
+}
+"""
+
+PACKED_SYSTEM_PROMPT = """
+You are an expert prompt engineer. You will receive a JSON array of prompts, each with a numeric "id".
+Analyze each prompt on its own and provide constructive feedback.
+Evaluate each prompt on these criteria:
+1. Clarity: Is it clear what is being asked?
+2. Specificity: Does it provide specific details?
+3. Context: Does it include necessary background information?
+4. Constraints: Does it specify any constraints or requirements?
+5. Output format: Does it specify the desired output format?
+
+Respond with a JSON array holding one object per prompt, in this exact format:
+[
+  {
+    "id": <the id of the prompt>,
+    "score": <number between 0-100>,
+    "strengths": [<list of strings highlighting what's good about the prompt>],
+    "weaknesses": [<list of strings identifying areas for improvement>],
+    "suggestions": [<list of specific suggestions to improve the prompt>],
+    "improvedPrompt": "<an improved version of the prompt>"
+  }
+]
+"""
+
+DEFAULT_CONFIG = {
+    "debounceTime": 300,
+    "useLLM": True,
+    "llmModel": "gpt-3.5-turbo",
+    "maxPromptLength": 2000,
+    # Stream the LLM response and emit partial `llm` events as its fields are parsed
+    "streamLLM": False,
+    # Long prompt mode: evaluate the whole prompt in token-budgeted chunks instead of truncating
+    "longPromptMode": False,
+    "chunkTokens": 1000,
+    "maxChunks": 16,
+    "chunkConcurrency": 4,
+    # Confidence-gated model cascade; a dict of routing options (see routing.DEFAULT_ROUTING) enables it
+    "routing": None,
+    # Rate limit, retry and circuit breaker options for LLM calls (see resilience.DEFAULT_RESILIENCE)
+    "resilience": None,
+    # Packed bulk evaluation: most prompts per LLM request, and their total token budget
+    "packSize": 10,
+    "packTokens": 2000,
+}
+
+# Most strengths, weaknesses and suggestions kept when merging chunk feedback
+MAX_MERGED_ITEMS = 10
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def create_llm(model, api_key=None, base_url=None):
+    """Create a chat model, supporting both new and legacy LangChain layouts"""
+    try:
+        from langchain_openai import ChatOpenAI
+    except ImportError:
+        try:
+            from langchain_community.chat_models import ChatOpenAI
+        except ImportError:
+            from langchain.chat_models import ChatOpenAI
+    # Retries are left to the evaluator's LLMGuard, so they share its backoff and circuit breaker
+    options = {"model_name": model, "temperature": 0.1, "max_retries": 0}
+    if api_key:
+        # Pass the key to this client only instead of setting OPENAI_API_KEY process-wide
+        options["openai_api_key"] = api_key
+    if base_url:
+        # Any OpenAI-compatible endpoint, e.g. fake_openai_server.py for load tests
+        options["openai_api_base"] = base_url
+    return ChatOpenAI(**options)
+
+
+def _create_messages(prompt, part=None):
+    """Create the system and human messages for an evaluation request; `part` is (number, total) for a chunk"""
+    try:
+        from langchain_core.messages import HumanMessage, SystemMessage
+    except ImportError:
+        from langchain.schema import HumanMessage, SystemMessage
+    if part is None:
+        request = f'Evaluate this prompt: "{prompt}"'
+    else:
+        request = (f'Evaluate part {part[0]} of {part[1]} of a longer prompt. '
+                   f'Judge and improve only this part: "{prompt}"')
+    return [
+        SystemMessage(content=SYSTEM_PROMPT),
+        HumanMessage(content=request)
+    ]
+
+
+def _create_packed_messages(prompts):
+    """Create the system and human messages for one request evaluating several prompts, numbered from 1"""
+    try:
+        from langchain_core.messages import HumanMessage, SystemMessage
+    except ImportError:
+        from langchain.schema import HumanMessage, SystemMessage
+    items = [{"id": number, "prompt": prompt} for number, prompt in enumerate(prompts, 1)]
+    return [
+        SystemMessage(content=PACKED_SYSTEM_PROMPT),
+        HumanMessage(content="Evaluate each of these prompts:\n" + json.dumps(items, ensure_ascii=False))
+    ]
+
+
+def _chunk_text(chunk):
+    """Get the text of a streamed chat model chunk"""
+    return chunk.content if isinstance(chunk.content, str) else str(chunk.content)
+
+
+def _round_half_up(value):
+    """Round like JavaScript's Math.round"""
+    return int(math.floor(value + 0.5))
+
+
+class PromptFeedbackEvaluator:
+    """Core class for evaluating prompts and providing feedback"""
+
+    def __init__(self, config, llm=None, llm_cache=None, llm_factory=None):
+        """
+        Create a new evaluator; `config` follows PromptFeedbackConfig plus optional
+        `openAIApiKey` and `openAIBaseUrl`. Pass `llm` to share an existing chat model client,
+        `llm_cache` (a NearDuplicateCache) to reuse LLM feedback for near-identical prompts,
+        and `llm_factory(model)` to share the clients of models chosen by routing.
+        """
+        self.config = dict(DEFAULT_CONFIG)
+        self.config.update({key: value for key, value in config.items() if value is not None})
+        self.llm = None
+        self.llm_cache = llm_cache
+        self.router = None
+        self.guard = None
+        self._llm_factory = llm_factory or (lambda model: create_llm(
+            model, self.config.get("openAIApiKey"), self.config.get("openAIBaseUrl")
+        ))
+        self._routed = {}
+        self._routed_lock = threading.Lock()
+
+        # Initialize LLM if enabled
+        if self.config["useLLM"]:
+            self.llm = llm if llm is not None else self._llm_factory(self.config["llmModel"])
+            self.guard = self._get_guard()
+            if self.config["routing"] is not None:
+                self.router = ModelRouter.from_env(self.config["routing"])
+
+    def process_input(self, text):
+        """Truncate input text to the configured maximum prompt length, unless in long prompt mode"""
+        if self.config.get("longPromptMode"):
+            return text
+        max_length = self.config.get("maxPromptLength") or 2000
+        if len(text) > max_length:
+            text = text[:max_length]
+        return text
+
+    def split_prompt(self, prompt):
+        """Split a prompt into token-budgeted chunks in long prompt mode, or return it whole"""
+        if not self.config.get("longPromptMode"):
+            return [prompt]
+        count_tokens = get_token_counter(self.config["llmModel"])
+        return split_into_chunks(prompt, self.config["chunkTokens"], count_tokens)
+
+    def with_model(self, model):
+        """Get an evaluator like this one that asks `model` instead, sharing caches and clients"""
+        if model == self.config["llmModel"]:
+            return self
+        with self._routed_lock:
+            evaluator = self._routed.get(model)
+            if evaluator is None:
+                evaluator = copy.copy(self)
+                evaluator.config = dict(self.config, llmModel=model, routing=None)
+                evaluator.llm = self._llm_factory(model)
+                evaluator.guard = evaluator._get_guard()
+                evaluator.router = None
+                evaluator._routed = {}
+                evaluator._routed_lock = threading.Lock()
+                self._routed[model] = evaluator
+            return evaluator
+
+    def _get_guard(self):
+        """Get the shared LLMGuard for this evaluator's API key, endpoint and model"""
+        api_key = self.config.get("openAIApiKey") or os.environ.get("OPENAI_API_KEY")
+        return llm_guards.get(key_fingerprint(api_key), self.config.get("openAIBaseUrl"),
+                              self.config["llmModel"], self.config["resilience"])
+
+    def clients(self):
+        """Get the chat model clients in use, including those of routed models"""
+        with self._routed_lock:
+            return [self.llm] + [evaluator.llm for evaluator in self._routed.values()]
+
+    def route(self, prompt, heuristic_feedback):
+        """
+        Choose the evaluator for a prompt's LLM step. Returns (evaluator, decision), where
+        the evaluator is None when routing skips the LLM and the decision is None without routing.
+        """
+        if self.router is None:
+            return self, None
+        decision = self.router.route(prompt, heuristic_feedback)
+        if decision["route"] == "skip":
+            return None, decision
+        return self.with_model(decision["model"]), decision
+
+    def record_route(self, decision, llm_feedback=None, error=None):
+        """Record the outcome of a routing decision"""
+        if decision is not None:
+            self.router.record(decision, llm_feedback, error)
+
+    def evaluate(self, prompt):
+        """Evaluate a prompt and return the complete feedback"""
+        for event in self.stream_feedback(prompt):
+            if event["type"] == "complete":
+                return event["feedback"]
+
+    def stream_feedback(self, prompt):
+        """
+        Evaluate a prompt, yielding FeedbackEvents as each stage finishes.
+
+        Yields `initial` and `heuristic` events right away, then `llm` once the
+        LLM responds (when enabled), and always ends with a `complete` event.
+        In long prompt mode a prompt over the chunk budget yields an `llm` event
+        with the merged feedback so far as each chunk finishes. With `streamLLM`,
+        partial `llm` events hold only the fields parsed so far (usually `score`
+        first); the last `llm` event always holds the full LLM feedback.
+        """
+        original_length = len(prompt)
+        prompt = self.process_input(prompt)
+
+        # Emit initial feedback event
+        yield feedback_event('initial', empty_feedback(), prompt)
+
+        # Run heuristic evaluation
+        heuristic_feedback = self.run_heuristic_stage(prompt, original_length)
+        yield feedback_event('heuristic', heuristic_feedback, prompt)
+
+        yield from self.stream_llm_stage(prompt, heuristic_feedback)
+
+    def run_heuristic_stage(self, prompt, original_length=None):
+        """Run heuristic evaluation on a processed prompt, noting when it was cut from `original_length` characters"""
+        heuristic_feedback = self.run_heuristic_evaluation(prompt)
+        if original_length is not None and len(prompt) < original_length:
+            heuristic_feedback["suggestions"].append(
+                f"Only the first {len(prompt)} of {original_length} characters were evaluated. "
+                "Enable long prompt mode to evaluate the whole prompt"
+            )
+        return heuristic_feedback
+
+    def stream_llm_stage(self, prompt, heuristic_feedback):
+        """
+        Yield the `llm` and `complete` FeedbackEvents for a processed prompt whose
+        heuristic feedback is known, like the rest of stream_feedback
+        """
+        # If LLM is enabled and prompt is substantial, get LLM feedback
+        if self.llm is not None and len(prompt) > 20:
+            # With routing, clear-cut prompts skip the LLM and the rest pick a model
+            evaluator, decision = self.route(prompt, heuristic_feedback)
+            if evaluator is None:
+                self.record_route(decision)
+                yield feedback_event('complete', heuristic_feedback, prompt)
+                return
+            try:
+                chunks = evaluator.split_prompt(prompt)
+                if len(chunks) > 1:
+                    for llm_feedback in evaluator.iter_chunked_llm_feedback(chunks):
+                        yield feedback_event('llm', llm_feedback, prompt)
+                elif evaluator.config.get("streamLLM") and hasattr(evaluator.llm, "stream"):
+                    for llm_feedback in evaluator.stream_llm_feedback(prompt):
+                        yield feedback_event('llm', llm_feedback, prompt)
+                else:
+                    llm_feedback = evaluator.get_llm_feedback(prompt)
+                    yield feedback_event('llm', llm_feedback, prompt)
+            except Exception as e:
+                # If LLM fails, just use heuristic feedback as final result
+                print(f"Error getting LLM feedback: {e}")
+                self.record_route(decision, error=e)
+                yield feedback_event('complete', fallback_feedback(heuristic_feedback), prompt)
+                return
+            self.record_route(decision, llm_feedback)
+
+            # Emit complete event with combined feedback
+            yield feedback_event('complete', self.combine_feedback(heuristic_feedback, llm_feedback), prompt)
+        else:
+            # If no LLM, heuristic feedback is the final result
+            yield feedback_event('complete', heuristic_feedback, prompt)
+
+    def run_heuristic_evaluation(self, prompt):
+        """Run basic heuristic evaluation on the prompt"""
+        with metrics.time_stage("heuristic"):
+            return self.build_heuristic_feedback(prompt, HEURISTIC_MATCHER.match(prompt))
+
+    def build_heuristic_feedback(self, prompt, matched, has_question=None):
+        """Build heuristic feedback from the HEURISTIC_MATCHER keyword sets found in the prompt"""
+        criteria = self.config["criteria"]
+        result = empty_feedback()
+        strengths = result["strengths"]
+        weaknesses = result["weaknesses"]
+        suggestions = result["suggestions"]
+        length = len(prompt)
+        if has_question is None:
+            has_question = '?' in prompt
+
+        # Check prompt length
+        if length < 10:
+            weaknesses.append('Prompt is too short')
+            suggestions.append('Add more details to your prompt')
+        elif length > 20:
+            strengths.append('Prompt has sufficient length')
+
+        # Check for question marks (indicates a clear question)
+        if has_question:
+            strengths.append('Prompt contains a clear question')
+        elif length > 15:
+            suggestions.append('Consider phrasing your request as a question')
+
+        # Check for context
+        if criteria.get("context"):
+            if "context" in matched:
+                strengths.append('Prompt provides context')
+            else:
+                weaknesses.append('Prompt may lack context')
+                suggestions.append('Add background information or context')
+
+        # Check for specificity
+        if criteria.get("clarity"):
+            if "vague" in matched:
+                weaknesses.append('Prompt contains vague language')
+                suggestions.append('Replace vague terms with specific descriptions')
+            else:
+                strengths.append('Prompt uses specific language')
+
+        # Check for output format specification
+        if criteria.get("format"):
+            if "format" in matched:
+                strengths.append('Prompt specifies desired output format')
+            else:
+                weaknesses.append('Prompt does not specify output format')
+                suggestions.append('Specify your preferred output format')
+
+        # Run custom criteria if provided
+        for criterion in criteria.get("customCriteria") or []:
+            outcome = criterion["evaluator"](prompt)
+            if isinstance(outcome, bool):
+                if outcome:
+                    strengths.append(f"Passes custom criterion: {criterion['name']}")
+                else:
+                    weaknesses.append(f"Fails custom criterion: {criterion['name']}")
+            elif isinstance(outcome, (int, float)):
+                if outcome > 0.7:
+                    strengths.append(f"High score on: {criterion['name']}")
+                elif outcome < 0.3:
+                    weaknesses.append(f"Low score on: {criterion['name']}")
+
+        # Calculate score based on strengths and weaknesses
+        result["score"] = min(100, max(0, 50 + len(strengths) * 10 - len(weaknesses) * 10))
+        return result
+
+    def _flight_key(self, prompt, part=None):
+        """
+        Key identical LLM requests by client and prompt. The request doesn't depend on
+        the criteria, and pooled clients are shared per model, API key and base URL.
+        """
+        return (id(self.llm), self.config["llmModel"], prompt, part)
+
+    def _cache_scope(self, part):
+        """Keep chunk feedback apart from whole-prompt feedback in the near-duplicate cache"""
+        return self.config["llmModel"] if part is None else f"{self.config['llmModel']}:part"
+
+    def get_llm_feedback(self, prompt, part=None):
+        """
+        Get feedback from an LLM, sharing any identical request already in flight.
+        Pass `part` as (number, total) when the prompt is one chunk of a longer prompt.
+        """
+        if self.llm is None:
+            raise RuntimeError("LLM is not initialized")
+
+        cached = self._cached_llm_feedback(prompt, part)
+        if cached is not None:
+            return cached
+        return llm_flights.do(self._flight_key(prompt, part), self._request_llm_feedback, prompt, part)
+
+    def _cached_llm_feedback(self, prompt, part=None):
+        """Get LLM feedback stored for this or a near-identical prompt, if any"""
+        if self.llm_cache is None:
+            return None
+        hit = self.llm_cache.get(prompt, self._cache_scope(part))
+        return hit[0] if hit is not None else None
+
+    def _store_llm_feedback(self, prompt, llm_feedback, part=None):
+        """Store parsed LLM feedback, skipping the fallback returned for unparseable responses"""
+        if self.llm_cache is not None and not llm_feedback.get("_fallback"):
+            self.llm_cache.set(prompt, llm_feedback, self._cache_scope(part))
+        return llm_feedback
+
+    @contextmanager
+    def _timed_llm_request(self):
+        """Time an LLM request and count it as an error if it fails"""
+        model = self.config["llmModel"]
+        start = time.perf_counter()
+        refused = False
+        try:
+            yield
+        except (CircuitOpenError, RateLimitExceededError):
+            # Refused by the guard without calling the LLM; the guard counts these itself
+            refused = True
+            raise
+        except Exception:
+            metrics.inc("feedback_llm_errors_total", model=model, kind="request")
+            raise
+        finally:
+            if not refused:
+                metrics.observe("feedback_stage_seconds", time.perf_counter() - start, stage="llm_request", model=model)
+
+    def _request_llm_feedback(self, prompt, part=None):
+        """Send one feedback request to the LLM"""
+        with self._timed_llm_request():
+            response = self.guard.call(self.llm.invoke, _create_messages(prompt, part))
+        return self._store_llm_feedback(prompt, self.parse_llm_response(response.content), part)
+
+    def stream_llm_feedback(self, prompt):
+        """
+        Get feedback from an LLM as its response streams in.
+
+        Yields the fields parsed so far each time another one completes, then the
+        full feedback. A caller joining an identical request already in flight
+        only gets the full feedback, once the leading stream finishes.
+        """
+        if self.llm is None:
+            raise RuntimeError("LLM is not initialized")
+
+        cached = self._cached_llm_feedback(prompt)
+        if cached is not None:
+            yield cached
+            return
+        key = self._flight_key(prompt)
+        call, leader = llm_flights.join(key)
+        if not leader:
+            yield llm_flights.wait(call)
+            return
+
+        chunks = self.guard.stream(self.llm.stream, _create_messages(prompt))
+        content = []
+        try:
+            parser = FeedbackStreamParser()
+            with self._timed_llm_request():
+                started = time.perf_counter()
+                for chunk in chunks:
+                    if not content:
+                        metrics.observe("feedback_stage_seconds", time.perf_counter() - started,
+                                        stage="llm_first_token", model=self.config["llmModel"])
+                    text = _chunk_text(chunk)
+                    content.append(text)
+                    if parser.feed(text) and (partial := partial_feedback(parser.fields)):
+                        yield partial
+            llm_feedback = self._store_llm_feedback(prompt, self.parse_llm_response("".join(content)))
+        except GeneratorExit:
+            if llm_flights.abandon(key, call, RuntimeError("LLM feedback stream was closed before it finished")):
+                chunks.close()
+            else:
+                # Other callers joined this request, so finish it for them in the background
+                threading.Thread(target=self._finish_llm_stream, args=(prompt, key, call, chunks, content),
+                                 name="feedback-stream-drain", daemon=True).start()
+            raise
+        except BaseException as e:
+            llm_flights.finish(key, call, error=e)
+            raise
+        llm_flights.finish(key, call, llm_feedback)
+        yield llm_feedback
+
+    def _finish_llm_stream(self, prompt, key, call, chunks, content):
+        """Read the rest of a stream its leader closed and publish the feedback to the callers that joined it"""
+        try:
+            for chunk in chunks:
+                content.append(_chunk_text(chunk))
+            llm_feedback = self._store_llm_feedback(prompt, self.parse_llm_response("".join(content)))
+        except BaseException as e:
+            llm_flights.finish(key, call, error=e)
+            return
+        llm_flights.finish(key, call, llm_feedback)
+
+    def iter_chunked_llm_feedback(self, chunks):
+        """
+        Get LLM feedback for the chunks of a long prompt, at most `chunkConcurrency` at a time.
+
+        Yields the merged feedback so far each time a chunk finishes; the last value
+        covers every evaluated chunk. Chunks past `maxChunks` are not sent, and the
+        merged suggestions say so. Raises the last error if no chunk could be evaluated.
+        """
+        evaluated = chunks[:self.config["maxChunks"]]
+        results = [None] * len(evaluated)
+        failed = []
+        error = None
+        workers = max(1, min(self.config["chunkConcurrency"], len(evaluated)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="feedback-chunk") as executor:
+            futures = {
+                executor.submit(self.get_llm_feedback, chunk, (number, len(evaluated))): number - 1
+                for number, chunk in enumerate(evaluated, 1)
+            }
+            try:
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        print(f"Error getting LLM feedback for part {index + 1}: {e}")
+                        failed.append(index)
+                        error = e
+                        continue
+                    yield self.merge_chunk_feedback(evaluated, results, len(chunks), failed)
+            except GeneratorExit:
+                # Closed early, so don't start the parts that are still queued
+                for future in futures:
+                    future.cancel()
+                raise
+        if len(failed) == len(evaluated):
+            raise error
+
+    def get_chunked_llm_feedback(self, chunks):
+        """Get the merged LLM feedback for every chunk of a long prompt"""
+        llm_feedback = None
+        for llm_feedback in self.iter_chunked_llm_feedback(chunks):
+            pass
+        return llm_feedback
+
+    def merge_chunk_feedback(self, chunks, results, total_chunks=None, failed=()):
+        """
+        Merge per-chunk LLM feedback into one result.
+
+        The score is the mean of the chunk scores weighted by chunk length, the lists
+        are deduplicated and capped at MAX_MERGED_ITEMS, and the improved prompt is the
+        improved chunks joined in order once every chunk has one. A merge missing a
+        failed or unparseable part is marked as a fallback.
+        """
+        done = [(chunk, result) for chunk, result in zip(chunks, results) if result is not None]
+        weight = sum(len(chunk) for chunk, _ in done) or 1
+        merged = {
+            "score": _round_half_up(sum(len(chunk) * result["score"] for chunk, result in done) / weight),
+            "strengths": [],
+            "weaknesses": [],
+            "suggestions": [],
+            "improvedPrompt": None,
+        }
+        for key in ("strengths", "weaknesses", "suggestions"):
+            items = dict.fromkeys(item for _, result in done for item in result[key])
+            merged[key] = list(items)[:MAX_MERGED_ITEMS]
+        if len(done) == len(chunks) and all(result.get("improvedPrompt") for _, result in done):
+            merged["improvedPrompt"] = "\n\n".join(result["improvedPrompt"].strip() for _, result in done)
+
+        # Feedback missing a failed or unparseable part is never cached
+        if failed or any(result.get("_fallback") for _, result in done):
+            merged["_fallback"] = True
+
+        # Never drop content silently
+        for index in sorted(failed):
+            merged["suggestions"].append(f"Part {index + 1} of the prompt could not be evaluated by the LLM")
+        total_chunks = total_chunks or len(chunks)
+        if total_chunks > len(chunks):
+            merged["suggestions"].append(
+                f"Only the first {len(chunks)} of {total_chunks} parts of the prompt were evaluated by the LLM. "
+                "Raise maxChunks or chunkTokens to include the rest"
+            )
+        return merged
+
+    async def aget_llm_feedback(self, prompt):
+        """
+        Get feedback from an LLM without blocking the event loop, sharing any identical
+        request in flight; cancelling aborts the request once no other caller is waiting
+        """
+        if self.llm is None:
+            raise RuntimeError("LLM is not initialized")
+
+        cached = self._cached_llm_feedback(prompt)
+        if cached is not None:
+            return cached
+        return await llm_flights.ado(self._flight_key(prompt), self._arequest_llm_feedback, prompt)
+
+    async def _arequest_llm_feedback(self, prompt):
+        """Send one feedback request to the LLM asynchronously"""
+        with self._timed_llm_request():
+            if hasattr(self.llm, "ainvoke"):
+                response = await self.guard.acall(self.llm.ainvoke, _create_messages(prompt))
+            else:
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(None, self.guard.call, self.llm.invoke, _create_messages(prompt))
+        return self._store_llm_feedback(prompt, self.parse_llm_response(response.content))
+
+    def pack_prompts(self, prompts):
+        """
+        Group prompts for packed evaluation. Returns lists of indices into `prompts`, each
+        with at most `packSize` prompts and, unless a single prompt is over it, `packTokens` tokens.
+        """
+        count_tokens = get_token_counter(self.config["llmModel"])
+        packs = []
+        pack, pack_tokens = [], 0
+        for index, prompt in enumerate(prompts):
+            tokens = count_tokens(prompt)
+            if pack and (len(pack) >= self.config["packSize"] or pack_tokens + tokens > self.config["packTokens"]):
+                packs.append(pack)
+                pack, pack_tokens = [], 0
+            pack.append(index)
+            pack_tokens += tokens
+        if pack:
+            packs.append(pack)
+        return packs
+
+    def get_packed_llm_feedback(self, prompts):
+        """
+        Get LLM feedback for several prompts with one request, for bulk evaluation.
+
+        Returns a list aligned with `prompts` holding each prompt's feedback, or the
+        exception that kept it from being evaluated. Prompts in the near-duplicate cache
+        aren't sent. Items missing from the response or malformed fall back to one
+        request per prompt; a failed request is not retried per prompt.
+        """
+        if self.llm is None:
+            raise RuntimeError("LLM is not initialized")
+
+        results = [self._cached_llm_feedback(prompt) for prompt in prompts]
+        pending = [index for index, result in enumerate(results) if result is None]
+        if len(pending) == 1:
+            pending_results = {}
+        elif pending:
+            try:
+                with self._timed_llm_request():
+                    response = self.guard.call(self.llm.invoke, _create_packed_messages([prompts[i] for i in pending]))
+            except Exception as e:
+                print(f"Error getting packed LLM feedback: {e}")
+                for index in pending:
+                    results[index] = e
+                return results
+            pending_results = self.parse_packed_llm_response(response.content, len(pending))
+
+        for number, index in enumerate(pending, 1):
+            llm_feedback = pending_results.get(number)
+            if llm_feedback is not None:
+                results[index] = self._store_llm_feedback(prompts[index], llm_feedback)
+                continue
+            if len(pending) > 1:
+                metrics.inc("feedback_llm_pack_fallbacks_total", model=self.config["llmModel"])
+            try:
+                results[index] = self.get_llm_feedback(prompts[index])
+            except Exception as e:
+                results[index] = e
+        return results
+
+    def parse_packed_llm_response(self, content, count):
+        """
+        Parse a packed LLM response into {id: feedback} for ids 1 to `count`.
+        Complete items before a truncation or syntax error are kept; malformed items are skipped.
+        """
+        with metrics.time_stage("parse"):
+            text = str(content)
+            start = text.find("[")
+            items = []
+            if start >= 0:
+                decoder = json.JSONDecoder()
+                position = start + 1
+                while True:
+                    while position < len(text) and text[position] in " \t\r\n,":
+                        position += 1
+                    if position >= len(text) or text[position] == "]":
+                        break
+                    try:
+                        item, position = decoder.raw_decode(text, position)
+                    except ValueError:
+                        break
+                    items.append(item)
+
+            results = {}
+            for item in items:
+                if not isinstance(item, dict):
+                    continue
+                try:
+                    number = int(item.get("id"))
+                except (TypeError, ValueError):
+                    continue
+                score = item.get("score")
+                if not 1 <= number <= count or number in results or \
+                        not isinstance(score, (int, float)) or isinstance(score, bool):
+                    continue
+                results[number] = {
+                    "score": score,
+                    "strengths": item.get("strengths") if isinstance(item.get("strengths"), list) else [],
+                    "weaknesses": item.get("weaknesses") if isinstance(item.get("weaknesses"), list) else [],
+                    "suggestions": item.get("suggestions") if isinstance(item.get("suggestions"), list) else [],
+                    "improvedPrompt": item.get("improvedPrompt") if isinstance(item.get("improvedPrompt"), str) else None,
+                }
+            if len(results) < count:
+                print(f"Packed LLM response had feedback for {len(results)} of {count} prompts")
+                metrics.inc("feedback_llm_errors_total", model=self.config["llmModel"], kind="parse")
+            return results
+
+    def parse_llm_response(self, content):
+        """Parse the JSON feedback object out of an LLM response"""
+        with metrics.time_stage("parse"):
+            return self._parse_llm_response(content)
+
+    def _parse_llm_response(self, content):
+        """Parse an LLM response, falling back to a basic result if it isn't valid feedback JSON"""
+        try:
+            json_match = _JSON_OBJECT.search(str(content))
+            if json_match:
+                feedback_json = json.loads(json_match.group(0))
+                return {
+                    "score": feedback_json.get("score") or 0,
+                    "strengths": feedback_json.get("strengths") or [],
+                    "weaknesses": feedback_json.get("weaknesses") or [],
+                    "suggestions": feedback_json.get("suggestions") or [],
+                    "improvedPrompt": feedback_json.get("improvedPrompt")
+                }
+            raise ValueError("Could not parse LLM response as JSON")
+        except (ValueError, AttributeError) as e:
+            print(f"Error parsing LLM response: {e}")
+            metrics.inc("feedback_llm_errors_total", model=self.config["llmModel"], kind="parse")
+            # Return a basic result if parsing fails
+            return {
+                "score": 50,
+                "strengths": ['LLM analyzed your prompt'],
+                "weaknesses": ['Could not parse detailed LLM feedback'],
+                "suggestions": ['Try rephrasing your prompt'],
+                "_fallback": True,
+            }
+
+    def combine_feedback(self, heuristic_feedback, llm_feedback):
+        """
+        Combine heuristic and LLM feedback, preferring the LLM score.
+        Partial LLM feedback from a stream is combined with the fields it has so far.
+        """
+        with metrics.time_stage("combine"):
+            return self._combine_feedback(heuristic_feedback, llm_feedback)
+
+    def _combine_feedback(self, heuristic_feedback, llm_feedback):
+        """Combine the scores and deduplicate the findings of heuristic and LLM feedback"""
+        llm_score = llm_feedback.get("score", heuristic_feedback["score"])
+        score = _round_half_up(llm_score * 0.8 + heuristic_feedback["score"] * 0.2)
+
+        # Combine and deduplicate strengths, weaknesses, and suggestions
+        combined = {
+            "score": score,
+            "strengths": list(dict.fromkeys(heuristic_feedback["strengths"] + llm_feedback.get("strengths", []))),
+            "weaknesses": list(dict.fromkeys(heuristic_feedback["weaknesses"] + llm_feedback.get("weaknesses", []))),
+            "suggestions": list(dict.fromkeys(heuristic_feedback["suggestions"] + llm_feedback.get("suggestions", []))),
+            "improvedPrompt": llm_feedback.get("improvedPrompt")
+        }
+        return fallback_feedback(combined) if llm_feedback.get("_fallback") else combined
@@ -0,0 +1,17 @@
+"""
+Python port of the LangChain Prompt Feedback Component.
+Mirrors the exports of src/index.ts.
+"""
+
+from .interfaces import FEEDBACK_EVENT_TYPES, empty_feedback, feedback_event
+from .PromptFeedbackEvaluator import PromptFeedbackEvaluator
+from .PromptFeedbackChain import PromptFeedbackChain
+from .scoring import prompt_features, score_batch
+from .utils import (
+    calculate_basic_prompt_score,
+    calculateBasicPromptScore,
+    create_default_feedback_criteria,
+    create_feedback_criteria,
+    createDefaultFeedbackCriteria,
+    createFeedbackCriteria,
+)
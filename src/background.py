@@ -0,0 +1,29 @@
+"""
+Shared background event loop for asynchronous evaluation work.
+One daemon thread per process runs the loop, so synchronous callers (like
+Streamlit scripts) can schedule and cancel coroutines without blocking.
+"""
+
+import asyncio
+import threading
+
+
+_loop = None
+_lock = threading.Lock()
+
+
+def get_background_loop():
+    """Get the process-wide background event loop, starting it on first use"""
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="feedback-background-loop", daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+
+def submit(coro):
+    """Schedule a coroutine on the background loop and return its concurrent Future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop())
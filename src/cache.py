@@ -0,0 +1,162 @@
+"""
+Persistent feedback cache shared across processes.
+Stores feedback results in SQLite in their compact encoding, keyed by a hash of
+prompt, criteria and model.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .compact import decode_feedback, encode_feedback
+from .metrics import metrics
+from .utils import create_feedback_criteria
+
+
+DEFAULT_CACHE_PATH = os.path.join("~", ".cache", "langchain-prompt-feedback", "feedback.sqlite3")
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL = 7 * 24 * 60 * 60  # One week, in seconds
+
+
+def normalize_criteria(criteria):
+    """Normalize criteria to a JSON-serializable dict with every default key present"""
+    normalized = {key: bool(value) for key, value in create_feedback_criteria(
+        {key: value for key, value in (criteria or {}).items() if key != "customCriteria"}
+    ).items()}
+    custom = (criteria or {}).get("customCriteria")
+    if custom:
+        normalized["customCriteria"] = sorted(criterion["name"] for criterion in custom)
+    return normalized
+
+
+def evaluation_options(config):
+    """Get the evaluator options beyond criteria and model that change feedback, or None for the defaults"""
+    options = {}
+    if config.get("longPromptMode"):
+        options.update({key: config.get(key) for key in ("longPromptMode", "chunkTokens", "maxChunks")})
+    if config.get("routing") is not None:
+        options["routing"] = config["routing"]
+    return options or None
+
+
+def cache_key(prompt, criteria, model, options=None):
+    """Create a cache key from the prompt, normalized criteria, model and evaluation options"""
+    payload = {"prompt": prompt, "criteria": normalize_criteria(criteria), "model": model}
+    if options:
+        payload["options"] = options
+    payload = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def should_cache(feedback):
+    """
+    Check whether complete feedback should be cached: anything but a fallback for
+    LLM feedback that failed or couldn't be parsed (see interfaces.fallback_feedback)
+    """
+    return not feedback.get("_fallback")
+
+
+def key_fingerprint(api_key):
+    """Get a short, non-reversible fingerprint of an API key, for keys that must tell API keys apart"""
+    if not api_key:
+        return None
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class FeedbackCache:
+    """
+    Size-bounded LRU cache of feedback results backed by SQLite.
+
+    The database file can be shared by several processes (e.g. Streamlit
+    workers or replicas on a shared volume). Entries expire `ttl` seconds after
+    they were stored; a `ttl` of None or 0 keeps them until they are evicted.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        """Open (or create) the cache database"""
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.path = os.path.expanduser(path)
+        self.max_entries = max_entries
+        self.ttl = ttl or None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS feedback ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS feedback_last_access ON feedback (last_access)")
+
+    @classmethod
+    def from_env(cls):
+        """Create a cache configured by FEEDBACK_CACHE_PATH, FEEDBACK_CACHE_MAX_ENTRIES and FEEDBACK_CACHE_TTL"""
+        return cls(
+            path=os.environ.get("FEEDBACK_CACHE_PATH", DEFAULT_CACHE_PATH),
+            max_entries=int(os.environ.get("FEEDBACK_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            ttl=float(os.environ.get("FEEDBACK_CACHE_TTL", DEFAULT_TTL)),
+        )
+
+    def _connect(self):
+        """Get this thread's connection to the cache database"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Get a cached feedback result, or None if it is missing or expired"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM feedback WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and row[1] < now - self.ttl:
+                conn.execute("DELETE FROM feedback WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                with self._lock:
+                    self.misses += 1
+                metrics.inc("feedback_cache_requests_total", cache="feedback", result="miss")
+                return None
+            conn.execute("UPDATE feedback SET last_access = ? WHERE key = ?", (now, key))
+        with self._lock:
+            self.hits += 1
+        metrics.inc("feedback_cache_requests_total", cache="feedback", result="hit")
+        return decode_feedback(row[0])
+
+    def set(self, key, feedback):
+        """Store a feedback result and evict the least recently used entries over the limit"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO feedback (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, encode_feedback(feedback), now, now),
+            )
+            conn.execute(
+                "DELETE FROM feedback WHERE key IN ("
+                " SELECT key FROM feedback ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM feedback")
+
+    def __len__(self):
+        """Get the number of stored entries, including expired ones not yet removed"""
+        return self._connect().execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
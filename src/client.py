@@ -0,0 +1,131 @@
+"""
+Client for the headless feedback service (feedback_service.py).
+Uses only the standard library, so the Streamlit app can act as a thin client of a
+separately scaled evaluation service.
+"""
+
+import http.client
+import json
+import os
+import select
+import threading
+from urllib.parse import urlsplit
+
+
+# Requests that can be sent again if the connection drops after they were sent
+_IDEMPOTENT_METHODS = frozenset(("GET", "HEAD"))
+
+
+class ServiceError(RuntimeError):
+    """An error response from the feedback service"""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class FeedbackServiceClient:
+    """
+    Thread-safe client for the feedback service.
+
+    Evaluation options use the evaluator's config keys (criteria, useLLM,
+    llmModel, longPromptMode, routing, openAIApiKey, ...); options that are None
+    are left to the service. Each thread keeps one connection open between requests.
+    """
+
+    def __init__(self, base_url, timeout=120.0):
+        """Create a client for the service at `base_url`, e.g. http://127.0.0.1:8010"""
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Invalid feedback service URL: {base_url}")
+        self.base_url = base_url
+        self.timeout = timeout
+        self._scheme = parts.scheme
+        self._host = parts.hostname
+        self._port = parts.port
+        self._prefix = parts.path.rstrip("/")
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls):
+        """Create a client for FEEDBACK_SERVICE_URL, or None if it isn't set"""
+        url = os.environ.get("FEEDBACK_SERVICE_URL")
+        return cls(url) if url else None
+
+    def _connection(self):
+        """Get this thread's connection to the service"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and conn.sock is not None and select.select([conn.sock], [], [], 0)[0]:
+            # An idle kept-alive connection only becomes readable when the service closed it;
+            # closing it here makes the next request reconnect instead of failing
+            conn.close()
+        if conn is None:
+            connection_class = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+            conn = self._local.conn = connection_class(self._host, self._port, timeout=self.timeout)
+        return conn
+
+    def _request(self, method, path, payload=None):
+        """Send a request and return the response, raising ServiceError for error statuses"""
+        body = None if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            conn = self._connection()
+            sent = False
+            try:
+                conn.request(method, self._prefix + path, body=body, headers=headers)
+                sent = True
+                response = conn.getresponse()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The service closed a kept-alive connection. Reconnect and resend once, but
+                # only if the request never went out or repeating it is harmless: a POST that
+                # was sent may already be evaluating, and sending it again would repeat the LLM call
+                conn.close()
+                if attempt or (sent and method not in _IDEMPOTENT_METHODS):
+                    raise
+        if response.status != 200:
+            data = response.read()
+            try:
+                message = json.loads(data)["error"]
+            except (ValueError, KeyError, TypeError):
+                message = data.decode("utf-8", "replace") or response.reason
+            raise ServiceError(message, response.status, response.getheader("Retry-After"))
+        return response
+
+    @staticmethod
+    def _payload(options, **fields):
+        """Build a request body from evaluation options and request fields"""
+        payload = {key: value for key, value in (options or {}).items() if value is not None}
+        payload.update(fields)
+        return payload
+
+    def evaluate(self, prompt, options=None):
+        """Evaluate a prompt and return the complete FeedbackResult"""
+        return json.loads(self._request("POST", "/evaluate", self._payload(options, prompt=prompt)).read())["feedback"]
+
+    def evaluate_batch(self, prompts, options=None):
+        """Evaluate prompts and return a {"feedback": ...} or {"error": ...} result for each, in order"""
+        response = self._request("POST", "/evaluate/batch", self._payload(options, prompts=list(prompts)))
+        return json.loads(response.read())["results"]
+
+    def stream_feedback(self, prompt, options=None):
+        """Evaluate a prompt, yielding FeedbackEvents as the service finishes each stage"""
+        response = self._request("POST", "/evaluate/stream", self._payload(options, prompt=prompt))
+        try:
+            for line in response:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if "error" in event:
+                    raise ServiceError(event["error"])
+                yield event
+        finally:
+            # Close a stream abandoned part way, so its connection isn't reused mid-response
+            if not response.isclosed():
+                response.close()
+                self._connection().close()
+
+    def health(self):
+        """Get the service's capacity and current load"""
+        return json.loads(self._request("GET", "/health").read())
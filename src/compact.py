@@ -0,0 +1,246 @@
+"""
+Compact storage for feedback results.
+Heuristic findings come from a small fixed set of sentences, so they are stored as
+one-byte codes from a finding registry, and whole results use a binary encoding
+instead of JSON in the feedback cache, near-duplicate cache and history.
+"""
+
+import json
+import struct
+import sys
+import zlib
+
+
+# Finding registry. Codes are positions in this tuple and are stored on disk, so
+# entries must only ever be appended, never reordered or removed.
+FINDINGS = tuple(sys.intern(text) for text in (
+    # Heuristic strengths
+    "Prompt has sufficient length",
+    "Prompt contains a clear question",
+    "Prompt provides context",
+    "Prompt uses specific language",
+    "Prompt specifies desired output format",
+    # Heuristic weaknesses
+    "Prompt is too short",
+    "Prompt may lack context",
+    "Prompt contains vague language",
+    "Prompt does not specify output format",
+    # Heuristic suggestions
+    "Add more details to your prompt",
+    "Consider phrasing your request as a question",
+    "Add background information or context",
+    "Replace vague terms with specific descriptions",
+    "Specify your preferred output format",
+    # Fallback for unparseable LLM responses
+    "LLM analyzed your prompt",
+    "Could not parse detailed LLM feedback",
+    "Try rephrasing your prompt",
+))
+
+FINDING_CODES = {text: code for code, text in enumerate(FINDINGS)}
+
+# First byte of the binary encoding; JSON starts with "{" and zlib streams with 0x78
+MAGIC = 0xFC
+_COMPRESSED = 0x01
+# Bodies longer than this are zlib-compressed
+COMPRESS_THRESHOLD = 1024
+
+# List headers hold the number of leading registered findings; this bit marks lists
+# followed by a count of other findings, whose texts are stored NUL-separated at the end
+_TAIL = 0x8000
+_LISTS = ("strengths", "weaknesses", "suggestions")
+_REQUIRED = frozenset(("score",) + _LISTS)
+_FIELDS = _REQUIRED | {"improvedPrompt"}
+_UINT16 = struct.Struct("<H")
+_UINT32 = struct.Struct("<I")
+_INT_SCORE = struct.Struct("<cq")
+_FLOAT_SCORE = struct.Struct("<cd")
+
+if len(FINDINGS) > 0xFF:
+    raise RuntimeError("The finding registry is full")
+
+
+class CompactFeedback:
+    """
+    Memory-light FeedbackResult.
+
+    Findings are kept as tuples whose registered sentences are ints (codes into
+    FINDINGS) and other findings plain strings. `improved_prompt` is None when
+    the feedback has no improved prompt and `has_improved_prompt` tells an
+    explicit None apart from a missing key, so dicts round-trip exactly.
+    """
+
+    __slots__ = ("score", "strengths", "weaknesses", "suggestions", "improved_prompt", "has_improved_prompt")
+
+    def __init__(self, score=0, strengths=(), weaknesses=(), suggestions=(), improved_prompt=None,
+                 has_improved_prompt=None):
+        """Create compact feedback from findings given as codes or strings"""
+        self.score = score
+        self.strengths = _encode_findings(strengths)
+        self.weaknesses = _encode_findings(weaknesses)
+        self.suggestions = _encode_findings(suggestions)
+        self.improved_prompt = improved_prompt
+        self.has_improved_prompt = improved_prompt is not None if has_improved_prompt is None else has_improved_prompt
+
+    @classmethod
+    def from_dict(cls, feedback):
+        """Create compact feedback from a FeedbackResult dict"""
+        return cls(
+            feedback.get("score", 0),
+            feedback.get("strengths", ()),
+            feedback.get("weaknesses", ()),
+            feedback.get("suggestions", ()),
+            feedback.get("improvedPrompt"),
+            "improvedPrompt" in feedback,
+        )
+
+    def to_dict(self):
+        """Get the FeedbackResult dict"""
+        feedback = {
+            "score": self.score,
+            "strengths": _decode_findings(self.strengths),
+            "weaknesses": _decode_findings(self.weaknesses),
+            "suggestions": _decode_findings(self.suggestions),
+        }
+        if self.has_improved_prompt:
+            feedback["improvedPrompt"] = self.improved_prompt
+        return feedback
+
+    def to_bytes(self):
+        """Encode as bytes (see encode_feedback)"""
+        return _pack(self.to_dict())
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Decode bytes produced by to_bytes or encode_feedback"""
+        return cls.from_dict(_unpack(data))
+
+    def __eq__(self, other):
+        """Compare by content"""
+        if not isinstance(other, CompactFeedback):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        """Show the feedback as its dict"""
+        return f"CompactFeedback({self.to_dict()!r})"
+
+
+def _encode_findings(findings):
+    """Replace registered sentences with their codes"""
+    return tuple(finding if isinstance(finding, int) else FINDING_CODES.get(finding, finding) for finding in findings)
+
+
+def _decode_findings(findings):
+    """Replace codes with their (interned) registered sentences"""
+    return [FINDINGS[finding] if isinstance(finding, int) else finding for finding in findings]
+
+
+def _pack_findings(findings, tails):
+    """
+    Encode a list of findings as the codes of its leading registered findings. The rest,
+    starting at the first finding outside the registry, is added to `tails` as text.
+    """
+    if type(findings) is not list or len(findings) >= _TAIL:
+        raise TypeError("Findings must be a list of strings")
+    codes = [FINDING_CODES.get(finding) for finding in findings]
+    if None not in codes:
+        return _UINT16.pack(len(codes)) + bytes(codes)
+    head = codes.index(None)
+    tail = findings[head:]
+    if not all(type(finding) is str and "\0" not in finding for finding in tail):
+        raise TypeError("Findings must be a list of strings without NUL characters")
+    tails.extend(tail)
+    return _UINT16.pack(head | _TAIL) + bytes(codes[:head]) + _UINT16.pack(len(tail))
+
+
+def _pack(feedback):
+    """
+    Encode a FeedbackResult dict; raises TypeError, AttributeError or struct.error if it has another
+    shape, and UnicodeEncodeError if its text isn't valid UTF-8 (such as a lone surrogate)
+    """
+    if not _REQUIRED <= feedback.keys() <= _FIELDS:
+        raise TypeError("Not a FeedbackResult")
+    score = feedback["score"]
+    if type(score) is int:
+        score = _INT_SCORE.pack(b"i", score)
+    elif type(score) is float:
+        score = _FLOAT_SCORE.pack(b"d", score)
+    else:
+        raise TypeError("Score must be a number")
+    if "improvedPrompt" not in feedback:
+        improved_prompt = _UINT32.pack(0)
+    elif feedback["improvedPrompt"] is None:
+        improved_prompt = _UINT32.pack(1)
+    else:
+        data = feedback["improvedPrompt"].encode("utf-8")
+        improved_prompt = _UINT32.pack(len(data) + 2) + data
+
+    tails = []
+    parts = [
+        score,
+        _pack_findings(feedback["strengths"], tails),
+        _pack_findings(feedback["weaknesses"], tails),
+        _pack_findings(feedback["suggestions"], tails),
+        improved_prompt,
+    ]
+    if tails:
+        parts.append("\0".join(tails).encode("utf-8"))
+    body = b"".join(parts)
+    if len(body) > COMPRESS_THRESHOLD:
+        return bytes((MAGIC, _COMPRESSED)) + zlib.compress(body)
+    return bytes((MAGIC, 0)) + body
+
+
+def _unpack(data):
+    """Decode bytes produced by _pack into a FeedbackResult dict"""
+    if len(data) < 2 or data[0] != MAGIC:
+        raise ValueError("Not compact feedback")
+    body = zlib.decompress(data[2:]) if data[1] & _COMPRESSED else data[2:]
+    _, score = (_INT_SCORE if body[:1] == b"i" else _FLOAT_SCORE).unpack_from(body)
+    position = 9
+    feedback = {"score": score}
+    with_tails = []
+    for key in _LISTS:
+        header = _UINT16.unpack_from(body, position)[0]
+        head = header & ~_TAIL
+        feedback[key] = list(map(FINDINGS.__getitem__, body[position + 2:position + 2 + head]))
+        position += 2 + head
+        if header & _TAIL:
+            with_tails.append((feedback[key], _UINT16.unpack_from(body, position)[0]))
+            position += 2
+    length = _UINT32.unpack_from(body, position)[0]
+    position += 4
+    if length:
+        feedback["improvedPrompt"] = body[position:position + length - 2].decode("utf-8") if length > 1 else None
+        position += max(0, length - 2)
+    if with_tails:
+        tails = body[position:].decode("utf-8").split("\0")
+        start = 0
+        for findings, count in with_tails:
+            findings.extend(tails[start:start + count])
+            start += count
+    return feedback
+
+
+def encode_feedback(feedback):
+    """
+    Encode a FeedbackResult dict for storage. Dicts the binary encoding can't represent
+    exactly (extra keys, non-string findings, text with lone surrogates) are stored as
+    JSON text instead.
+    """
+    try:
+        return _pack(feedback)
+    except (TypeError, AttributeError, ValueError, struct.error):
+        return json.dumps(feedback)
+
+
+def decode_feedback(value):
+    """Decode a stored FeedbackResult: compact bytes, JSON text, or zlib-compressed JSON bytes"""
+    if isinstance(value, str):
+        return json.loads(value)
+    if value[:1] == bytes((MAGIC,)):
+        return _unpack(bytes(value))
+    if value[:1] == b"{":
+        return json.loads(value)
+    return json.loads(zlib.decompress(value))
@@ -0,0 +1,174 @@
+"""
+Persistent prompt history for the Streamlit app.
+Keeps a capped number of entries per session in SQLite and serves them a page at a time,
+so memory use and render cost don't grow with the length of a session. Entries also expire
+after a retention period and the whole store is capped, so abandoned sessions are pruned.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from .compact import decode_feedback, encode_feedback
+
+
+DEFAULT_HISTORY_PATH = os.path.join("~", ".cache", "langchain-prompt-feedback", "history.sqlite3")
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_TOTAL_ENTRIES = 50000
+DEFAULT_TTL = 30 * 24 * 60 * 60  # 30 days, in seconds
+PREVIEW_LENGTH = 100
+
+
+def _escape_like(text):
+    """Escape LIKE wildcards so a search matches them literally"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _details(blob):
+    """Decode an entry's details; entries written before the compact encoding are zlib-compressed JSON"""
+    details = decode_feedback(blob)
+    details.pop("score", None)
+    return details
+
+
+class HistoryStore:
+    """
+    Capped, paginated prompt history backed by SQLite.
+
+    Each session keeps at most `max_entries` entries and the store at most
+    `max_total_entries` across all sessions; adding one past either cap drops the
+    oldest. Entries expire `ttl` seconds after they were added (None or 0 keeps
+    them until they are dropped), so every session is eventually pruned, whether
+    or not it is still in use. The prompt is stored as text so it can be searched, and the
+    rest of the feedback (improved prompt, strengths, weaknesses, suggestions) as
+    one compact blob (see src.compact) that is only decoded for the entries on a page.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_total_entries=DEFAULT_MAX_TOTAL_ENTRIES, ttl=DEFAULT_TTL):
+        """Open (or create) the history database"""
+        if max_entries < 1 or max_total_entries < 1:
+            raise ValueError("max_entries and max_total_entries must be at least 1")
+        self.path = os.path.expanduser(path)
+        self.max_entries = max_entries
+        self.max_total_entries = max_total_entries
+        self.ttl = ttl or None
+        self._local = threading.local()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                " id INTEGER PRIMARY KEY,"
+                " session TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " score INTEGER NOT NULL,"
+                " prompt TEXT NOT NULL,"
+                " details BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS history_session ON history (session, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS history_created_at ON history (created_at)")
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create a store configured by FEEDBACK_HISTORY_PATH, FEEDBACK_HISTORY_MAX_ENTRIES,
+        FEEDBACK_HISTORY_MAX_TOTAL_ENTRIES and FEEDBACK_HISTORY_TTL
+        """
+        return cls(
+            path=os.environ.get("FEEDBACK_HISTORY_PATH", DEFAULT_HISTORY_PATH),
+            max_entries=int(os.environ.get("FEEDBACK_HISTORY_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            max_total_entries=int(os.environ.get("FEEDBACK_HISTORY_MAX_TOTAL_ENTRIES", DEFAULT_MAX_TOTAL_ENTRIES)),
+            ttl=float(os.environ.get("FEEDBACK_HISTORY_TTL", DEFAULT_TTL)),
+        )
+
+    def _connect(self):
+        """Get this thread's connection to the history database"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, session, prompt, feedback):
+        """Add an evaluated prompt to a session's history, and drop expired entries and those over the caps"""
+        score = feedback.get("score", 0)
+        blob = encode_feedback({
+            "score": score,
+            "strengths": feedback.get("strengths", []),
+            "weaknesses": feedback.get("weaknesses", []),
+            "suggestions": feedback.get("suggestions", []),
+            "improvedPrompt": feedback.get("improvedPrompt") or "",
+        })
+        now = time.time()
+        with self._connect() as conn:
+            entry = conn.execute(
+                "INSERT INTO history (session, created_at, score, prompt, details) VALUES (?, ?, ?, ?, ?)",
+                (session, now, score, prompt, blob),
+            ).lastrowid
+            conn.execute(
+                "DELETE FROM history WHERE session = ? AND id <= ("
+                " SELECT id FROM history WHERE session = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (session, session, self.max_entries),
+            )
+            conn.execute(
+                "DELETE FROM history WHERE id <= (SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (self.max_total_entries,),
+            )
+            if self.ttl is not None:
+                conn.execute("DELETE FROM history WHERE created_at < ?", (now - self.ttl,))
+        return entry
+
+    def _where(self, session, query):
+        """Build the WHERE clause and parameters for a session and optional search query"""
+        if not query:
+            return "session = ?", [session]
+        return "session = ? AND prompt LIKE ? ESCAPE '\\'", [session, f"%{_escape_like(query)}%"]
+
+    def count(self, session, query=None):
+        """Count a session's entries, optionally only those whose prompt contains `query`"""
+        where, params = self._where(session, query)
+        return self._connect().execute(f"SELECT COUNT(*) FROM history WHERE {where}", params).fetchone()[0]
+
+    def page(self, session, page=0, page_size=10, query=None):
+        """
+        Get one page of a session's entries, newest first, optionally filtered by `query`.
+        Each entry has id, number (1 for the oldest kept), timestamp, score, prompt, preview and details.
+        """
+        where, params = self._where(session, query)
+        rows = self._connect().execute(
+            f"SELECT id, created_at, score, prompt, details,"
+            f" (SELECT COUNT(*) FROM history AS older WHERE older.session = history.session AND older.id <= history.id)"
+            f" FROM history WHERE {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+            params + [page_size, page * page_size],
+        ).fetchall()
+        return [
+            {
+                "id": entry,
+                "number": number,
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created_at)),
+                "score": score,
+                "prompt": prompt,
+                "preview": prompt[:PREVIEW_LENGTH] + ("..." if len(prompt) > PREVIEW_LENGTH else ""),
+                **_details(details),
+            }
+            for entry, created_at, score, prompt, details, number in rows
+        ]
+
+    def prompts(self, limit=None):
+        """Yield the stored prompts from all sessions, oldest first; with `limit`, only the most recent ones"""
+        rows = self._connect().execute(
+            "SELECT prompt FROM (SELECT id, prompt FROM history ORDER BY id DESC LIMIT ?) ORDER BY id",
+            (-1 if limit is None else limit,),
+        )
+        yield from (row[0] for row in rows)
+
+    def clear(self, session):
+        """Remove every entry of a session"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM history WHERE session = ?", (session,))
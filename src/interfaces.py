@@ -0,0 +1,40 @@
+"""
+Shapes shared by the Python port of the prompt feedback component.
+Mirrors src/interfaces.ts; results and events are plain dicts with the same keys.
+"""
+
+import time
+
+
+# Types of feedback events, in the order they are emitted for a prompt
+FEEDBACK_EVENT_TYPES = ('initial', 'heuristic', 'llm', 'complete')
+
+
+def empty_feedback():
+    """Create an empty FeedbackResult"""
+    return {
+        "score": 0,
+        "strengths": [],
+        "weaknesses": [],
+        "suggestions": []
+    }
+
+
+def fallback_feedback(feedback):
+    """
+    Mark feedback as standing in for LLM feedback that failed or couldn't be parsed,
+    so it is shown but never cached
+    """
+    return dict(feedback, _fallback=True)
+
+
+def feedback_event(event_type, feedback, prompt):
+    """Create a FeedbackEvent"""
+    if event_type not in FEEDBACK_EVENT_TYPES:
+        raise ValueError(f"Unknown feedback event type: {event_type}")
+    return {
+        "type": event_type,
+        "feedback": feedback,
+        "prompt": prompt,
+        "timestamp": int(time.time() * 1000)
+    }
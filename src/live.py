@@ -0,0 +1,218 @@
+"""
+As-you-type evaluation for interactive editors.
+Heuristic feedback is updated incrementally from the edited region of the prompt, and
+LLM feedback is debounced and cancelled when a newer edit arrives.
+"""
+
+import asyncio
+import threading
+
+from .background import submit
+from .cache import cache_key, evaluation_options, should_cache
+from .interfaces import empty_feedback, fallback_feedback
+from .metrics import metrics
+from .utils import HEURISTIC_MATCHER
+
+
+def _common_prefix_length(a, b):
+    """Get the length of the common prefix of two strings using C-speed slice comparisons"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _common_suffix_length(a, b, limit):
+    """Get the length of the common suffix of two strings, at most `limit`"""
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def edit_region(old, new):
+    """Return (start, old_end, new_end) such that old[start:old_end] was replaced by new[start:new_end]"""
+    start = _common_prefix_length(old, new)
+    suffix = _common_suffix_length(old, new, min(len(old), len(new)) - start)
+    return start, len(old) - suffix, len(new) - suffix
+
+
+class IncrementalHeuristics:
+    """
+    Heuristic feedback for a prompt that is edited a little at a time.
+
+    Keeps per-set keyword match counts and the number of question marks, and
+    on each update only rescans the edited region plus a keyword-length margin.
+    """
+
+    def __init__(self, evaluator, matcher=HEURISTIC_MATCHER):
+        """Create incremental heuristics for an evaluator"""
+        self.evaluator = evaluator
+        self.matcher = matcher
+        self.text = ""
+        self.question_marks = 0
+        self.counts = dict.fromkeys(matcher.names, 0)
+
+    def _count(self, text, low, high):
+        """Count keyword matches per set starting in text[low:high], or None if offsets can't be mapped"""
+        margin = self.matcher.max_length + 1
+        offset = max(0, low - 1)
+        window = text[offset:high + margin]
+        if len(window.lower()) != len(window):
+            return None
+        counts = dict.fromkeys(self.matcher.names, 0)
+        for name, positions in self.matcher.positions(window).items():
+            counts[name] = sum(1 for position in positions if low <= position + offset < high)
+        return counts
+
+    def _recompute(self, text):
+        """Recount everything for the text"""
+        # A full count needs no offsets, so it stays exact even when lowercasing changes the length
+        self.question_marks = text.count('?')
+        self.counts = {name: len(positions) for name, positions in self.matcher.positions(text).items()}
+
+    def update(self, text):
+        """Update the state for the new prompt text and return its heuristic feedback"""
+        with metrics.time_stage("heuristic"):
+            text = self.evaluator.process_input(text)
+            old = self.text
+            if text != old:
+                start, old_end, new_end = edit_region(old, text)
+                # Matches starting before `low` end before the edit, and those after the
+                # edit only shift, so only starts in [low, end] need to be recounted
+                low = max(0, start - self.matcher.max_length - 1)
+                removed = self._count(old, low, old_end + 1)
+                added = self._count(text, low, new_end + 1)
+                if removed is None or added is None:
+                    # Lowercasing changed the length around the edit, so window offsets don't map
+                    self._recompute(text)
+                else:
+                    for name in self.counts:
+                        self.counts[name] += added[name] - removed[name]
+                    self.question_marks += text.count('?', start, new_end) - old.count('?', start, old_end)
+                self.text = text
+
+            matched = {name for name, count in self.counts.items() if count > 0}
+            return self.evaluator.build_heuristic_feedback(text, matched, has_question=self.question_marks > 0)
+
+
+class LiveEvaluator:
+    """
+    Debounced as-you-type evaluation for one editing session.
+
+    `update` returns heuristic feedback right away and schedules an LLM evaluation
+    after `debounce_ms` of inactivity. A newer update cancels the pending or
+    in-flight LLM call, so stale results are never shown. `snapshot` returns the
+    latest feedback and whether LLM feedback is still pending.
+    """
+
+    def __init__(self, evaluator, debounce_ms=300, cache=None, cache_model=None):
+        """Create a live evaluator; pass a FeedbackCache to reuse and store LLM results"""
+        self.evaluator = evaluator
+        self.debounce = debounce_ms / 1000
+        self.cache = cache
+        self.cache_model = cache_model
+        self.heuristics = IncrementalHeuristics(evaluator)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._future = None
+        self._state = {"prompt": None, "feedback": empty_feedback(), "pending": False}
+
+    def update(self, text):
+        """Evaluate edited prompt text and return its heuristic feedback"""
+        with self._lock:
+            if text == self._state["prompt"]:
+                return self._state["feedback"]
+            heuristic_feedback = self.heuristics.update(text)
+            prompt = self.heuristics.text
+
+            self._generation += 1
+            if self._future is not None:
+                self._future.cancel()
+                self._future = None
+            pending = self.evaluator.llm is not None and len(prompt) > 20
+            self._state = {"prompt": text, "feedback": heuristic_feedback, "pending": pending}
+            if pending:
+                self._future = submit(self._evaluate_llm(self._generation, prompt, heuristic_feedback))
+            return heuristic_feedback
+
+    async def _evaluate_llm(self, generation, prompt, heuristic_feedback):
+        """
+        Wait out the debounce time, then get and publish the combined feedback. The
+        heuristic feedback is published if anything fails, so `pending` always clears.
+        """
+        await asyncio.sleep(self.debounce)
+
+        # The cache is SQLite, so keep its calls off the shared event loop
+        loop = asyncio.get_running_loop()
+        feedback = heuristic_feedback
+        try:
+            key = cached = None
+            if self.cache:
+                try:
+                    config = self.evaluator.config
+                    key = cache_key(prompt, config["criteria"], self.cache_model, evaluation_options(config))
+                    cached = await loop.run_in_executor(None, self.cache.get, key)
+                except Exception as e:
+                    print(f"Error reading the feedback cache: {e}")
+                    key = None
+            if cached is not None:
+                feedback = cached
+            else:
+                feedback = await self._combined_feedback(prompt, heuristic_feedback)
+                # Don't persist fallbacks for a failed or unparseable LLM call
+                if key is not None and should_cache(feedback):
+                    try:
+                        await loop.run_in_executor(None, self.cache.set, key, feedback)
+                    except Exception as e:
+                        print(f"Error writing the feedback cache: {e}")
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._state = dict(self._state, feedback=feedback, pending=False)
+                    self._future = None
+
+    async def _combined_feedback(self, prompt, heuristic_feedback):
+        """Get the LLM feedback chosen by routing and combine it, or fall back to the heuristic feedback"""
+        evaluator, decision = self.evaluator.route(prompt, heuristic_feedback)
+        if evaluator is None:
+            # Routing judged the heuristics conclusive
+            self.evaluator.record_route(decision)
+            return heuristic_feedback
+        try:
+            chunks = evaluator.split_prompt(prompt)
+            if len(chunks) > 1:
+                loop = asyncio.get_running_loop()
+                llm_feedback = await loop.run_in_executor(None, evaluator.get_chunked_llm_feedback, chunks)
+            else:
+                llm_feedback = await evaluator.aget_llm_feedback(prompt)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error getting LLM feedback: {e}")
+            self.evaluator.record_route(decision, error=e)
+            return fallback_feedback(heuristic_feedback)
+        self.evaluator.record_route(decision, llm_feedback)
+        return self.evaluator.combine_feedback(heuristic_feedback, llm_feedback)
+
+    def snapshot(self):
+        """Get the latest prompt, feedback and pending flag"""
+        with self._lock:
+            return dict(self._state)
+
+    def cancel(self):
+        """Cancel any pending or in-flight LLM evaluation"""
+        with self._lock:
+            self._generation += 1
+            if self._future is not None:
+                self._future.cancel()
+                self._future = None
+            self._state = dict(self._state, pending=False)
@@ -0,0 +1,233 @@
+"""
+Per-stage latency histograms and counters for the evaluation pipeline.
+Metrics are kept in process and exported in the Prometheus text format, over HTTP
+or to a file, so latency SLOs can be set and regressions found in production.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Upper bounds in seconds, from sub-millisecond heuristics to slow LLM completions
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Stages timed in feedback_stage_seconds
+STAGES = ("heuristic", "llm_request", "llm_first_token", "parse", "combine", "render")
+
+HELP = {
+    "feedback_stage_seconds": "Time spent in each evaluation stage",
+    "feedback_cache_requests_total": "Feedback cache lookups by cache and result",
+    "feedback_llm_errors_total": "Failed LLM requests and unparseable LLM responses",
+    "feedback_llm_retries_total": "Retried LLM requests",
+    "feedback_llm_pack_fallbacks_total": "Prompts re-sent on their own after a packed LLM response left them out",
+    "feedback_service_requests_total": "Requests to the feedback service by endpoint and status",
+    "feedback_speculations_total": "Speculative evaluations by outcome",
+}
+
+
+def _escape(value):
+    """Escape a label value as the text format requires"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    """Format label pairs as {name="value",...}"""
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_number(value):
+    """Format a sample value or bucket bound"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Create an empty histogram with the given bucket upper bounds"""
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # The last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Record one value"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation within its bucket, like histogram_quantile"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                if index == len(self.buckets):
+                    # Values above the largest bound; report the bound
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of labelled histograms and counters.
+
+    Series are created on first use, keyed by metric name and label values.
+    `render` returns every series in the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Create an empty registry; histograms use `buckets` (in seconds)"""
+        self.buckets = buckets
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        """Record a value in a histogram"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        """Increment a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def time(self, name, **labels):
+        """Record the time spent in the enclosed block, in seconds, even if it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def time_stage(self, stage, **labels):
+        """Time an evaluation stage in feedback_stage_seconds"""
+        return self.time("feedback_stage_seconds", stage=stage, **labels)
+
+    def stage_summary(self):
+        """
+        Get per-stage latency summaries, merged over other labels, as rows with stage,
+        count, mean, p50, p95 and p99 (in milliseconds)
+        """
+        merged = {}
+        with self._lock:
+            for (name, labels), histogram in self._histograms.items():
+                if name != "feedback_stage_seconds":
+                    continue
+                stage = dict(labels).get("stage")
+                total = merged.setdefault(stage, Histogram(self.buckets))
+                total.counts = [a + b for a, b in zip(total.counts, histogram.counts)]
+                total.count += histogram.count
+                total.sum += histogram.sum
+        order = {stage: index for index, stage in enumerate(STAGES)}
+        return [
+            {
+                "stage": stage,
+                "count": histogram.count,
+                "mean": round(histogram.sum / histogram.count * 1000, 2),
+                "p50": round(histogram.quantile(0.5) * 1000, 2),
+                "p95": round(histogram.quantile(0.95) * 1000, 2),
+                "p99": round(histogram.quantile(0.99) * 1000, 2),
+            }
+            for stage, histogram in sorted(merged.items(), key=lambda item: order.get(item[0], len(order)))
+        ]
+
+    def counters(self, name):
+        """Get a counter's series as {sorted (label, value) pairs: count}"""
+        with self._lock:
+            return {labels: value for (metric, labels), value in self._counters.items() if metric == name}
+
+    def render(self):
+        """Render every series in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        described = set()
+
+        def header(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), histogram in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', _format_number(bound))])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(histogram.sum)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the metrics to a file atomically, e.g. for node_exporter's textfile collector"""
+        path = os.path.expanduser(path)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(temporary, path)
+
+    def reset(self):
+        """Drop every series"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def start_http_server(port, host="127.0.0.1", registry=None):
+    """Serve the metrics at /metrics from a daemon thread and return the server"""
+    registry = registry or metrics
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="feedback-metrics", daemon=True).start()
+    return server
+
+
+# Process-wide registry shared by the evaluator, caches and app
+metrics = MetricsRegistry()
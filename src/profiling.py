@@ -0,0 +1,47 @@
+"""
+Lightweight phase timing for the Streamlit app.
+Streamlit re-executes the whole script on every interaction, so the app times its
+phases on each run to show where cold-start and rerun latency go.
+"""
+
+import sys
+import time
+
+
+class PhaseTimer:
+    """
+    Wall-clock timer for the named phases of one script run.
+
+    `mark(name)` ends a phase: the time since the previous mark (or since the
+    timer was created) is added to `name`, so a script can be split into phases
+    without re-indenting it. Marks cost almost nothing when the timer is disabled.
+    """
+
+    def __init__(self, enabled=False, started=None):
+        """Create a timer; the run's total is measured from `started` (a perf_counter value) or now"""
+        self.enabled = enabled
+        self.phases = {}
+        self.started = self._last = time.perf_counter() if started is None else started
+
+    def mark(self, name):
+        """End the current phase and add its time to `name`"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + now - self._last
+        self._last = now
+
+    def total(self):
+        """Get the time since the timer was created, in seconds"""
+        return time.perf_counter() - self.started
+
+    def report(self):
+        """Get (phase, milliseconds) rows in run order, ending with the total"""
+        rows = [(name, round(seconds * 1000, 2)) for name, seconds in self.phases.items()]
+        rows.append(("total", round(self.total() * 1000, 2)))
+        return rows
+
+    def log(self, label="run", stream=None):
+        """Write the report as one line to stderr (or `stream`)"""
+        line = ", ".join(f"{name}={ms}ms" for name, ms in self.report())
+        print(f"[profile] {label}: {line}", file=stream or sys.stderr)
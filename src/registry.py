@@ -0,0 +1,115 @@
+"""
+Registry of ready-to-use evaluators shared across requests and sessions.
+Evaluators and their LLM clients are built once per configuration and reused,
+so repeat requests skip construction and keep their HTTP connections warm.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+from .cache import key_fingerprint, normalize_criteria
+from .PromptFeedbackEvaluator import DEFAULT_CONFIG, PromptFeedbackEvaluator, create_llm
+
+
+DEFAULT_MAX_EVALUATORS = 32
+
+
+class EvaluatorRegistry:
+    """
+    Thread-safe LRU pool of PromptFeedbackEvaluator instances keyed by configuration.
+
+    Evaluators hold no per-request state, so one instance can serve concurrent
+    Streamlit sessions. LLM clients are pooled separately by model, key fingerprint
+    and base URL, so evaluators that only differ in criteria share connections.
+    The API key is passed to the client directly and never written to os.environ.
+    """
+
+    def __init__(self, max_evaluators=DEFAULT_MAX_EVALUATORS):
+        """Create an empty registry holding at most `max_evaluators` evaluators"""
+        self.max_evaluators = max_evaluators
+        self._evaluators = OrderedDict()
+        self._llms = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def config_key(config):
+        """Create the registry key for an evaluator configuration"""
+        config = {key: value for key, value in config.items() if value is not None}
+        criteria = config.pop("criteria", None) or {}
+        api_key = config.pop("openAIApiKey", None)
+        merged = dict(DEFAULT_CONFIG)
+        merged.update(config)
+        if not merged["useLLM"]:
+            merged["llmModel"] = None
+        # Custom criteria are functions, so tell them apart by identity as well as name
+        custom = tuple((c["name"], id(c["evaluator"])) for c in criteria.get("customCriteria") or ())
+        return (
+            json.dumps(normalize_criteria(criteria), sort_keys=True),
+            json.dumps(merged, sort_keys=True, default=repr),
+            custom,
+            key_fingerprint(api_key),
+        )
+
+    def get_evaluator(self, config, llm_cache=None):
+        """
+        Get a shared evaluator for the configuration, building it on first use.
+        Pass `llm_cache` (a NearDuplicateCache) to reuse LLM feedback for near-identical prompts.
+        """
+        key = self.config_key(config) + (id(llm_cache) if llm_cache is not None else None,)
+        with self._lock:
+            evaluator = self._evaluators.get(key)
+            if evaluator is not None:
+                self._evaluators.move_to_end(key)
+                return evaluator
+
+            # Models chosen by routing share the pooled clients too
+            def llm_factory(model):
+                return self._get_llm(model, config.get("openAIApiKey"), config.get("openAIBaseUrl"))
+
+            llm = None
+            if config.get("useLLM", DEFAULT_CONFIG["useLLM"]):
+                llm = llm_factory(config.get("llmModel") or DEFAULT_CONFIG["llmModel"])
+
+            evaluator = PromptFeedbackEvaluator(config, llm=llm, llm_cache=llm_cache, llm_factory=llm_factory)
+            self._evaluators[key] = evaluator
+            if len(self._evaluators) > self.max_evaluators:
+                self._evaluators.popitem(last=False)
+                self._prune_llms()
+            return evaluator
+
+    def _get_llm(self, model, api_key, base_url):
+        """Get the pooled client for a model, API key and base URL, creating it on first use"""
+        llm_key = (model, key_fingerprint(api_key), base_url)
+        with self._lock:
+            llm = self._llms.get(llm_key)
+            if llm is None:
+                llm = self._llms[llm_key] = create_llm(model, api_key, base_url)
+            return llm
+
+    def _prune_llms(self):
+        """Drop LLM clients no longer used by any pooled evaluator"""
+        in_use = {id(llm) for evaluator in self._evaluators.values() for llm in evaluator.clients()}
+        for llm_key, llm in list(self._llms.items()):
+            if id(llm) not in in_use:
+                del self._llms[llm_key]
+
+    def clear(self):
+        """Remove every pooled evaluator and client"""
+        with self._lock:
+            self._evaluators.clear()
+            self._llms.clear()
+
+    def __len__(self):
+        """Get the number of pooled evaluators"""
+        return len(self._evaluators)
+
+
+# Create a singleton instance
+registry = EvaluatorRegistry()
+
+
+# Convenience functions
+def get_evaluator(config, llm_cache=None):
+    """Get a shared evaluator for the configuration from the default registry"""
+    return registry.get_evaluator(config, llm_cache)
@@ -0,0 +1,299 @@
+"""
+Client-side protection for LLM calls.
+A token bucket limits the request rate per API key and model, throttled and failed
+requests are retried with jittered exponential backoff, and a circuit breaker stops
+calling a failing provider so callers fall back to heuristic feedback right away.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+
+from .metrics import metrics
+
+
+DEFAULT_RESILIENCE = {
+    # Requests per second per API key and model; None means unlimited
+    "requestsPerSecond": None,
+    "burst": None,  # Defaults to max(1, requestsPerSecond)
+    "maxWait": 10.0,  # Longest wait for a rate limit token before failing
+    "maxRetries": 2,
+    "retryBaseDelay": 0.5,
+    "retryMaxDelay": 8.0,
+    # Consecutive failed calls that open the breaker; 0 disables it
+    "failureThreshold": 5,
+    "resetTimeout": 30.0,
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the LLM while its circuit breaker is open"""
+
+
+class RateLimitExceededError(RuntimeError):
+    """Raised when a rate limit token isn't available within the allowed wait"""
+
+
+# Errors without a status code that are still worth retrying
+_RETRYABLE_ERRORS = {"APITimeoutError", "APIConnectionError", "Timeout", "ServiceUnavailableError"}
+
+
+def _status_code(error):
+    """Get the HTTP status code of an OpenAI or HTTP client error, if any"""
+    for source in (error, getattr(error, "response", None)):
+        for name in ("status_code", "http_status", "status"):
+            code = getattr(source, name, None)
+            if isinstance(code, int):
+                return code
+    return None
+
+
+def is_retryable(error):
+    """Check whether an error is worth retrying: throttling, server errors, timeouts and dropped connections"""
+    code = _status_code(error)
+    if code is not None:
+        return code in (408, 409, 429) or code >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # Match OpenAI and wrapping client error classes by name, so no client library is imported here
+    return any(cls.__name__ in _RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+def _retry_after(error):
+    """Get the Retry-After delay in seconds from an error's response, if it has one"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate, burst=None):
+        """Create a full bucket"""
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait=None):
+        """
+        Take a token and return how long to wait before using it, or None (taking
+        nothing) if that would be longer than `max_wait` seconds
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker over consecutive failures.
+
+    After `failure_threshold` failures in a row the breaker opens and `allow`
+    refuses calls. Once `reset_timeout` seconds have passed it lets a single
+    probe through (half-open); the probe's outcome closes or reopens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        """Create a closed breaker"""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Check whether a call may go ahead"""
+        if not self.failure_threshold:
+            return True
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        """Record a call that reached the provider"""
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """Record a call that failed after its retries"""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.failure_threshold and (self.state == "half_open" or self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Give up a probe that was abandoned before it had an outcome"""
+        with self._lock:
+            self._probing = False
+
+
+class LLMGuard:
+    """
+    Rate limiting, retries and a circuit breaker around the calls to one model.
+
+    `call`, `acall` and `stream` run a request function under the guard. While
+    the breaker is open they raise CircuitOpenError without calling the LLM.
+    Only errors that `is_retryable` accepts are retried or counted by the breaker;
+    other errors (e.g. an invalid API key) are raised at once and leave the breaker as it was. A stream is only
+    retried if it fails before its first chunk.
+    """
+
+    def __init__(self, options=None, model=None):
+        """Create a guard from resilience options (see DEFAULT_RESILIENCE)"""
+        self.options = dict(DEFAULT_RESILIENCE)
+        self.options.update({key: value for key, value in (options or {}).items() if value is not None})
+        self.model = model
+        rate = self.options["requestsPerSecond"]
+        self.bucket = TokenBucket(rate, self.options["burst"]) if rate else None
+        self.breaker = CircuitBreaker(self.options["failureThreshold"], self.options["resetTimeout"])
+
+    def _admit(self):
+        """Check the breaker and take a rate limit token; returns the time to wait before calling"""
+        if not self.breaker.allow():
+            metrics.inc("feedback_llm_errors_total", model=self.model, kind="circuit_open")
+            raise CircuitOpenError(f"LLM calls to {self.model} are paused after repeated failures")
+        if self.bucket is None:
+            return 0.0
+        wait = self.bucket.reserve(self.options["maxWait"])
+        if wait is None:
+            self.breaker.release()
+            metrics.inc("feedback_llm_errors_total", model=self.model, kind="rate_limited")
+            raise RateLimitExceededError(f"Rate limit for {self.model} reached")
+        return wait
+
+    def _backoff(self, attempt, error):
+        """
+        Get the delay before retry `attempt` (0-based) of a failed call, or None to give up.
+        Uses full jitter, and waits at least as long as the provider's Retry-After.
+        """
+        if not is_retryable(error):
+            # A client error (e.g. 400 or 401) says nothing about the provider's health,
+            # so it neither closes nor opens the breaker; a probe just frees its slot
+            self.breaker.release()
+            return None
+        if attempt >= self.options["maxRetries"]:
+            self.breaker.record_failure()
+            return None
+        self.breaker.release()
+        metrics.inc("feedback_llm_retries_total", model=self.model)
+        ceiling = min(self.options["retryMaxDelay"], self.options["retryBaseDelay"] * 2 ** attempt)
+        delay = random.uniform(0, ceiling)
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.options["retryMaxDelay"]))
+        return delay
+
+    def call(self, func, *args):
+        """Call func(*args) under the guard"""
+        for attempt in range(self.options["maxRetries"] + 1):
+            time.sleep(self._admit())
+            try:
+                result = func(*args)
+            except Exception as e:
+                delay = self._backoff(attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, func, *args):
+        """Await func(*args) under the guard without blocking the event loop"""
+        for attempt in range(self.options["maxRetries"] + 1):
+            await asyncio.sleep(self._admit())
+            try:
+                result = await func(*args)
+            except Exception as e:
+                delay = self._backoff(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def stream(self, func, *args):
+        """Yield the items of the iterator func(*args) under the guard"""
+        for attempt in range(self.options["maxRetries"] + 1):
+            time.sleep(self._admit())
+            started = False
+            try:
+                for item in func(*args):
+                    started = True
+                    yield item
+            except Exception as e:
+                delay = None if started else self._backoff(attempt, e)
+                if delay is None:
+                    if started and is_retryable(e):
+                        self.breaker.record_failure()
+                    elif started:
+                        self.breaker.release()
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return
+
+
+class GuardPool:
+    """Thread-safe pool of LLMGuards keyed by API key fingerprint, base URL, model and options"""
+
+    def __init__(self):
+        """Create an empty pool"""
+        self._guards = {}
+        self._lock = threading.Lock()
+
+    def get(self, fingerprint, base_url, model, options=None):
+        """Get the shared guard for calls with this key, endpoint and model"""
+        key = (fingerprint, base_url, model, json.dumps(options or {}, sort_keys=True))
+        with self._lock:
+            guard = self._guards.get(key)
+            if guard is None:
+                guard = self._guards[key] = LLMGuard(options, model=model)
+            return guard
+
+    def clear(self):
+        """Drop every guard"""
+        with self._lock:
+            self._guards.clear()
+
+
+# Process-wide guards, so every evaluator calling the same model with the same key shares one budget
+llm_guards = GuardPool()
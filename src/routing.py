@@ -0,0 +1,103 @@
+"""
+Confidence-gated routing of LLM evaluations.
+Clear-cut prompts skip the LLM, medium-confidence ones go to a fast model and only
+ambiguous ones are escalated to a strong model. Decisions are recorded for tuning.
+"""
+
+import json
+import os
+import threading
+import time
+
+from .utils import calculate_basic_prompt_score
+
+
+DEFAULT_ROUTING = {
+    "skipConfidence": 0.8,
+    "fastConfidence": 0.3,
+    "fastModel": "gpt-3.5-turbo",
+    "strongModel": "gpt-4",
+}
+
+ROUTES = ("skip", "fast", "strong")
+
+
+def heuristic_confidence(prompt, heuristic_feedback):
+    """
+    Estimate how settled a prompt's quality is from the heuristics alone, from 0 to 1.
+
+    A heuristic score far from the neutral 50 is more decisive, and it counts for
+    less when calculate_basic_prompt_score, an independent heuristic, disagrees.
+    """
+    score = heuristic_feedback["score"]
+    decisiveness = min(1.0, abs(score - 50) / 50)
+    agreement = 1 - min(1.0, abs(score - calculate_basic_prompt_score(prompt)) / 100)
+    return round(decisiveness * agreement, 4)
+
+
+class ModelRouter:
+    """
+    Routes prompts to no LLM, a fast model or a strong model by heuristic confidence.
+
+    Prompts at or above `skipConfidence` skip the LLM, those at or above
+    `fastConfidence` go to `fastModel`, and the rest go to `strongModel`. With a
+    `log_path`, every decision and its LLM outcome is appended as a JSON line.
+    """
+
+    def __init__(self, options=None, log_path=None):
+        """Create a router from routing options (see DEFAULT_ROUTING)"""
+        self.options = dict(DEFAULT_ROUTING)
+        self.options.update({key: value for key, value in (options or {}).items() if value is not None})
+        if not 0 <= self.options["fastConfidence"] <= self.options["skipConfidence"]:
+            raise ValueError("fastConfidence must be between 0 and skipConfidence")
+        self.log_path = os.path.expanduser(log_path) if log_path else None
+        self.counts = dict.fromkeys(ROUTES, 0)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, options=None):
+        """Create a router that records decisions to FEEDBACK_ROUTING_LOG, if set"""
+        return cls(options, log_path=os.environ.get("FEEDBACK_ROUTING_LOG"))
+
+    def route(self, prompt, heuristic_feedback):
+        """Decide how to evaluate a prompt; returns a decision dict with `route` and `model`"""
+        confidence = heuristic_confidence(prompt, heuristic_feedback)
+        if confidence >= self.options["skipConfidence"]:
+            route, model = "skip", None
+        elif confidence >= self.options["fastConfidence"]:
+            route, model = "fast", self.options["fastModel"]
+        else:
+            route, model = "strong", self.options["strongModel"]
+        with self._lock:
+            self.counts[route] += 1
+        return {
+            "route": route,
+            "model": model,
+            "confidence": confidence,
+            "heuristicScore": heuristic_feedback["score"],
+            "promptLength": len(prompt),
+            "started": time.time(),
+        }
+
+    def record(self, decision, llm_feedback=None, error=None):
+        """Record a decision with the LLM score it led to, so thresholds can be tuned"""
+        if self.log_path is None:
+            return
+        entry = {
+            "timestamp": int(time.time() * 1000),
+            "route": decision["route"],
+            "model": decision["model"],
+            "confidence": decision["confidence"],
+            "heuristicScore": decision["heuristicScore"],
+            "llmScore": llm_feedback.get("score") if llm_feedback else None,
+            "promptLength": decision["promptLength"],
+            "latencyMs": round((time.time() - decision["started"]) * 1000, 1),
+            "error": str(error) if error else None,
+        }
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line)
@@ -0,0 +1,83 @@
+"""
+Vectorized batch scoring for large prompt collections.
+Computes the calculate_basic_prompt_score rules for many prompts at once with NumPy.
+"""
+
+from .utils import SCORE_MATCHER
+
+# Joins prompts for a single keyword scan; no keyword contains it and it is not a word character
+_SEPARATOR = "\x00"
+
+
+def _require_numpy():
+    """Import NumPy, which is only needed for batch scoring"""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Batch scoring requires NumPy. Run: `pip install numpy`")
+    return numpy
+
+
+def prompt_features(prompts):
+    """
+    Compute the scoring features for a batch of prompts.
+
+    Returns a dict of NumPy arrays: `length` (int64) and boolean `question`,
+    `specificity`, `context`, `format` and `vague` flags, one entry per prompt.
+    """
+    np = _require_numpy()
+    prompts = [prompt or "" for prompt in prompts]
+    count = len(prompts)
+    features = {
+        "length": np.fromiter(map(len, prompts), dtype=np.int64, count=count),
+        "question": np.fromiter(("?" in prompt for prompt in prompts), dtype=bool, count=count),
+    }
+    for name in SCORE_MATCHER.names:
+        features[name] = np.zeros(count, dtype=bool)
+    if not count:
+        return features
+
+    # Scan all prompts in one pass and map match offsets back to their prompt
+    joined = _SEPARATOR.join(prompts)
+    if joined.isascii():
+        lengths = features["length"]
+    else:
+        # Some characters grow when lowercased, and match offsets are into the lowercased text
+        lengths = np.fromiter((len(prompt.lower()) for prompt in prompts), dtype=np.int64, count=count)
+    starts = np.zeros(count, dtype=np.int64)
+    np.cumsum(lengths[:-1] + 1, out=starts[1:])
+
+    for name, positions in SCORE_MATCHER.positions(joined).items():
+        if positions:
+            rows = np.searchsorted(starts, np.asarray(positions, dtype=np.int64), side="right") - 1
+            features[name][rows] = True
+    return features
+
+
+def score_batch(prompts, chunk_size=100000):
+    """
+    Score a batch of prompts with the calculate_basic_prompt_score rules.
+
+    Returns an int64 NumPy array with one 0-100 score per prompt, identical to
+    calling calculate_basic_prompt_score on each prompt. Prompts are processed
+    in chunks of `chunk_size` to keep the joined scan text bounded.
+    """
+    np = _require_numpy()
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    prompts = prompts if isinstance(prompts, list) else list(prompts)
+
+    scores = np.empty(len(prompts), dtype=np.int64)
+    for offset in range(0, len(prompts), chunk_size):
+        features = prompt_features(prompts[offset:offset + chunk_size])
+        score = 50 + np.minimum(20, features["length"] // 10)
+        score += 10 * features["specificity"]
+        score += 10 * features["question"]
+        score += 10 * features["context"]
+        score += 10 * features["format"]
+        score -= 10 * features["vague"]
+        score = np.clip(score, 0, 100)
+        # Empty prompts score 0
+        score[features["length"] == 0] = 0
+        scores[offset:offset + len(score)] = score
+    return scores
@@ -0,0 +1,254 @@
+"""
+Near-duplicate cache for LLM feedback.
+Prompts are normalized and summarized by MinHash signatures, and an LSH index of
+signature bands finds earlier prompts similar enough to reuse their LLM feedback.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+
+from .cache import DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES, DEFAULT_TTL
+from .compact import decode_feedback, encode_feedback
+from .metrics import metrics
+
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 128
+SHINGLE_SIZE = 5
+
+# Modulus for the permutation hashes: the Mersenne prime 2**61 - 1
+_PRIME = (1 << 61) - 1
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def _require_numpy():
+    """Import NumPy, which is needed to compute signatures"""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("The near-duplicate cache requires NumPy. Run: `pip install numpy`")
+    return numpy
+
+
+def normalize_prompt(prompt):
+    """Normalize a prompt for comparison: casefold, and reduce punctuation and whitespace to single spaces"""
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Get the set of character shingles of a normalized prompt"""
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def lsh_params(threshold, num_perm):
+    """
+    Choose (bands, rows) for the LSH index.
+
+    Uses the most rows per band (fewest false candidates) for which a pair with
+    exactly `threshold` similarity still becomes a candidate 99% of the time.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= 0.99:
+            best = (bands, rows)
+    return best
+
+
+class MinHasher:
+    """MinHash signatures estimating the Jaccard similarity of shingle sets"""
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, seed=1):
+        """Create `num_perm` seeded universal hash permutations"""
+        np = _require_numpy()
+        generator = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        # Keep the coefficients below 2**31 so products with 32-bit hashes fit in uint64
+        self._a = generator.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self._b = generator.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+    def signature(self, text):
+        """Get the MinHash signature of a normalized prompt as a uint64 array"""
+        np = _require_numpy()
+        tokens = shingles(text)
+        hashes = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in tokens),
+                             dtype=np.uint64, count=len(tokens))
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % np.uint64(_PRIME)).min(axis=1)
+
+    @staticmethod
+    def similarity(first, second):
+        """Estimate the Jaccard similarity of two signatures"""
+        return float((first == second).mean())
+
+
+class NearDuplicateCache:
+    """
+    SQLite-backed cache of LLM feedback that also matches near-identical prompts.
+
+    Entries are scoped (e.g. by model), and only prompts in the same scope are
+    compared. A lookup returns the stored feedback of the most similar earlier
+    prompt whose estimated similarity is at least `threshold`. The tables live
+    next to FeedbackCache's in the same database file by default, with the same
+    LRU eviction and TTL behaviour.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM,
+                 max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        """Open (or create) the near-duplicate tables"""
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.path = os.path.expanduser(path)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl or None
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS near_duplicates ("
+                " id INTEGER PRIMARY KEY,"
+                " scope TEXT NOT NULL,"
+                " prompt TEXT NOT NULL,"
+                " signature BLOB NOT NULL,"
+                " value BLOB NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL,"
+                " UNIQUE (scope, prompt))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS near_duplicates_last_access ON near_duplicates (last_access)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS near_duplicate_bands ("
+                " band TEXT NOT NULL,"
+                " entry INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS near_duplicate_bands_band ON near_duplicate_bands (band)")
+            conn.execute("CREATE INDEX IF NOT EXISTS near_duplicate_bands_entry ON near_duplicate_bands (entry)")
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create a cache configured by FEEDBACK_CACHE_PATH, FEEDBACK_CACHE_MAX_ENTRIES,
+        FEEDBACK_CACHE_TTL and FEEDBACK_SIMILARITY_THRESHOLD
+        """
+        return cls(
+            path=os.environ.get("FEEDBACK_CACHE_PATH", DEFAULT_CACHE_PATH),
+            threshold=float(os.environ.get("FEEDBACK_SIMILARITY_THRESHOLD", DEFAULT_THRESHOLD)),
+            max_entries=int(os.environ.get("FEEDBACK_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            ttl=float(os.environ.get("FEEDBACK_CACHE_TTL", DEFAULT_TTL)),
+        )
+
+    def _connect(self):
+        """Get this thread's connection to the cache database"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _band_keys(self, scope, signature):
+        """Get the LSH bucket keys of a signature, one per band"""
+        keys = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(f"{scope}:{band}:".encode("utf-8") + chunk, digest_size=12)
+            keys.append(digest.hexdigest())
+        return keys
+
+    @staticmethod
+    def _delete(conn, ids):
+        """Delete entries and their bands"""
+        conn.executemany("DELETE FROM near_duplicate_bands WHERE entry = ?", ((i,) for i in ids))
+        conn.executemany("DELETE FROM near_duplicates WHERE id = ?", ((i,) for i in ids))
+
+    def get(self, prompt, scope=None):
+        """
+        Get (feedback, similarity) for the most similar cached prompt in the scope,
+        or None if no prompt reaches the threshold
+        """
+        np = _require_numpy()
+        text = normalize_prompt(prompt)
+        scope = scope or ""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT id, value, created_at FROM near_duplicates WHERE scope = ? AND prompt = ?",
+                               (scope, text)).fetchone()
+            best = (row[0], row[1], 1.0, row[2]) if row is not None else None
+            if best is None:
+                signature = self.hasher.signature(text)
+                keys = self._band_keys(scope, signature)
+                candidates = conn.execute(
+                    "SELECT id, value, created_at, signature FROM near_duplicates WHERE id IN ("
+                    f" SELECT entry FROM near_duplicate_bands WHERE band IN ({','.join('?' * len(keys))}))",
+                    keys,
+                ).fetchall()
+                for entry, value, created_at, blob in candidates:
+                    similarity = self.hasher.similarity(signature, np.frombuffer(blob, dtype=np.uint64))
+                    if similarity >= self.threshold and (best is None or similarity > best[2]):
+                        best = (entry, value, similarity, created_at)
+
+            if best is not None and self.ttl is not None and best[3] < now - self.ttl:
+                self._delete(conn, [best[0]])
+                best = None
+            if best is None:
+                self.misses += 1
+                metrics.inc("feedback_cache_requests_total", cache="near_duplicate", result="miss")
+                return None
+            conn.execute("UPDATE near_duplicates SET last_access = ? WHERE id = ?", (now, best[0]))
+        self.hits += 1
+        metrics.inc("feedback_cache_requests_total", cache="near_duplicate", result="hit")
+        return decode_feedback(best[1]), best[2]
+
+    def set(self, prompt, feedback, scope=None):
+        """Store feedback for a prompt and evict the least recently used entries over the limit"""
+        text = normalize_prompt(prompt)
+        scope = scope or ""
+        signature = self.hasher.signature(text)
+        now = time.time()
+        with self._connect() as conn:
+            old = conn.execute("SELECT id FROM near_duplicates WHERE scope = ? AND prompt = ?", (scope, text)).fetchone()
+            if old is not None:
+                self._delete(conn, [old[0]])
+            entry = conn.execute(
+                "INSERT INTO near_duplicates (scope, prompt, signature, value, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, text, signature.tobytes(), encode_feedback(feedback), now, now),
+            ).lastrowid
+            conn.executemany("INSERT INTO near_duplicate_bands (band, entry) VALUES (?, ?)",
+                             ((key, entry) for key in self._band_keys(scope, signature)))
+            evicted = [row[0] for row in conn.execute(
+                "SELECT id FROM near_duplicates ORDER BY last_access DESC LIMIT -1 OFFSET ?", (self.max_entries,)
+            )]
+            if evicted:
+                self._delete(conn, evicted)
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM near_duplicate_bands")
+            conn.execute("DELETE FROM near_duplicates")
+
+    def __len__(self):
+        """Get the number of stored entries, including expired ones not yet removed"""
+        return self._connect().execute("SELECT COUNT(*) FROM near_duplicates").fetchone()[0]
@@ -0,0 +1,141 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+While a call for a key is in flight, further callers with the same key wait for
+it and share its result instead of starting their own.
+"""
+
+import asyncio
+import copy
+import threading
+
+
+class _Call:
+    """A call in flight and the callers waiting for it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with equal keys into one.
+
+    `do` is for threads and `ado` for coroutines; they keep separate in-flight
+    tables, so a blocking and an async caller never wait on each other. Callers
+    that produce a result step by step (e.g. while streaming) can use `join`,
+    `wait` and `finish` directly, and `abandon` a call nobody else is waiting for. Results are deep-copied for waiting callers,
+    so no caller can mutate another's result. Errors are shared as well, and a
+    finished call is forgotten immediately, so results are never cached beyond
+    the calls that overlapped it.
+    """
+
+    def __init__(self):
+        """Create an empty single-flight group"""
+        self.calls = 0
+        self.shared = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._tasks = {}
+
+    def join(self, key):
+        """Join the call in flight for a key, or start one; returns (call, is_leader)"""
+        with self._lock:
+            call = self._in_flight.get(key)
+            if call is not None:
+                self.shared += 1
+                call.waiters += 1
+                return call, False
+            call = self._in_flight[key] = _Call()
+            self.calls += 1
+            return call, True
+
+    def wait(self, call):
+        """Wait for a joined call and return a copy of its result, or raise its error"""
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return copy.deepcopy(call.result)
+
+    def finish(self, key, call, result=None, error=None):
+        """Publish the leader's result or error to the waiting callers"""
+        call.result = result
+        call.error = error
+        with self._lock:
+            del self._in_flight[key]
+        call.done.set()
+
+    def abandon(self, key, call, error):
+        """
+        Fail a call its leader gave up on, unless other callers joined it. Returns False,
+        leaving the call in flight, when someone is waiting; the leader must then finish it.
+        """
+        with self._lock:
+            if call.waiters:
+                return False
+            del self._in_flight[key]
+        call.error = error
+        call.done.set()
+        return True
+
+    def do(self, key, func, *args):
+        """Call `func(*args)`, or wait for the identical call already in flight"""
+        call, leader = self.join(key)
+        if not leader:
+            return self.wait(call)
+        try:
+            result = func(*args)
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result)
+        return result
+
+    async def ado(self, key, func, *args):
+        """Await `func(*args)`, or the identical call already in flight on this event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._tasks.get((id(loop), key))
+            if entry is None:
+                task = loop.create_task(func(*args))
+                entry = self._tasks[(id(loop), key)] = [task, 0]
+                task.add_done_callback(lambda _: self._forget((id(loop), key), task))
+                self.calls += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+            entry[1] += 1
+        task = entry[0]
+
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Only abort the shared call once every caller waiting on it has given up
+            with self._lock:
+                entry[1] -= 1
+                abandoned = entry[1] == 0
+            if abandoned:
+                self._forget((id(loop), key), task)
+                task.cancel()
+            raise
+        with self._lock:
+            entry[1] -= 1
+        return result if leader else copy.deepcopy(result)
+
+    def _forget(self, task_key, task):
+        """Remove a finished task from the in-flight table"""
+        with self._lock:
+            if self._tasks.get(task_key, (None,))[0] is task:
+                del self._tasks[task_key]
+
+    def in_flight(self):
+        """Get the number of calls currently in flight"""
+        with self._lock:
+            return len(self._in_flight) + len(self._tasks)
+
+
+# Create a singleton instance for LLM evaluations
+llm_flights = SingleFlight()
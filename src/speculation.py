@@ -0,0 +1,145 @@
+"""
+Speculative background evaluation.
+Prompts a user is likely to evaluate next (such as the LLM's improved prompt) are
+evaluated at low priority ahead of time, so their feedback is already cached when
+the user asks for it. Speculation yields to foreground evaluations and is cancelled
+when the user moves on.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from .metrics import metrics
+
+
+class _Job:
+    """A speculative evaluation and its cancellation and completion flags"""
+
+    def __init__(self, owner, key, func, group):
+        self.owner = owner
+        self.key = key
+        self.func = func
+        self.group = group
+        self.running = False
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+
+
+class Speculator:
+    """
+    Low-priority queue of speculative evaluations.
+
+    Jobs run one at a time on a daemon thread with a raised nice value, and
+    none starts while a foreground evaluation is running (see `foreground`).
+    A job is `func(cancelled)`, which should stop at its next step once the
+    `cancelled` event is set. Jobs belong to an owner (a session) and an optional
+    group; each owner keeps at most `max_pending` queued jobs, dropping the oldest.
+    """
+
+    def __init__(self, max_pending=4, remember=256):
+        """Create an idle speculator; its thread starts with the first job"""
+        self.max_pending = max_pending
+        self._jobs = {}
+        self._queue = deque()
+        self._finished = OrderedDict()
+        self._remember = remember
+        self._foreground = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, owner, key, func, group=None):
+        """Queue `func` unless the same key is already queued, running or recently finished for the owner"""
+        with self._cond:
+            if (owner, key) in self._jobs or (owner, key) in self._finished:
+                return False
+            queued = [job for job in self._queue if job.owner == owner]
+            for job in queued[:max(0, len(queued) - self.max_pending + 1)]:
+                self._drop(job, "dropped")
+            job = self._jobs[(owner, key)] = _Job(owner, key, func, group)
+            self._queue.append(job)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="feedback-speculation", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            return True
+
+    def cancel(self, owner, keep=(), group=None):
+        """Cancel an owner's jobs (only those in `group`, if given) except the keys in `keep`"""
+        with self._cond:
+            for job in list(self._jobs.values()):
+                if job.owner == owner and job.key not in keep and (group is None or job.group == group):
+                    self._drop(job, "cancelled")
+
+    def supersede(self, owner, key):
+        """
+        Drop a queued job whose prompt is about to be evaluated in the foreground. A running
+        job is left alone: the foreground evaluation joins its in-flight LLM request (see
+        src.singleflight) instead of repeating it. Returns whether a job was running.
+        """
+        with self._cond:
+            job = self._jobs.get((owner, key))
+            if job is None:
+                return False
+            if not job.running:
+                self._drop(job, "superseded")
+            return job.running
+
+    @contextmanager
+    def foreground(self):
+        """Mark a foreground evaluation as running; no speculative job starts until it ends"""
+        with self._cond:
+            self._foreground += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._foreground -= 1
+                self._cond.notify_all()
+
+    def _drop(self, job, outcome):
+        """Cancel a job (the caller holds the lock)"""
+        job.cancelled.set()
+        if self._jobs.get((job.owner, job.key)) is job:
+            del self._jobs[(job.owner, job.key)]
+        if not job.running:
+            self._queue.remove(job)
+            job.done.set()
+        metrics.inc("feedback_speculations_total", outcome=outcome)
+
+    def _run(self):
+        """Run queued jobs one at a time, whenever no foreground evaluation is running"""
+        # Only on Linux is a thread id a valid PRIO_PROCESS target meaning this thread; elsewhere
+        # it could name an unrelated process
+        if sys.platform.startswith("linux"):
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+            except OSError:
+                pass
+        while True:
+            with self._cond:
+                while not self._queue or self._foreground:
+                    self._cond.wait()
+                job = self._queue.popleft()
+                job.running = True
+            outcome = "completed"
+            try:
+                job.func(job.cancelled)
+            except Exception as e:
+                print(f"Error in speculative evaluation: {e}")
+                outcome = "failed"
+            with self._cond:
+                if self._jobs.get((job.owner, job.key)) is job:
+                    del self._jobs[(job.owner, job.key)]
+                    if outcome == "completed":
+                        self._finished[(job.owner, job.key)] = True
+                        if len(self._finished) > self._remember:
+                            self._finished.popitem(last=False)
+                    metrics.inc("feedback_speculations_total", outcome=outcome)
+                job.done.set()
+
+
+# Process-wide speculator shared by all sessions
+speculator = Speculator()
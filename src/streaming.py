@@ -0,0 +1,111 @@
+"""
+Incremental parsing of streamed LLM feedback.
+Parses the top-level fields of a JSON object as its text arrives token by token,
+so each field can be shown as soon as it is complete.
+"""
+
+import json
+
+
+# Marks a field whose value isn't valid JSON; such fields are left to the full parse
+_INVALID = object()
+
+# Types of the FeedbackResult fields an LLM response may contain
+_FIELD_TYPES = {
+    "score": (int, float),
+    "strengths": list,
+    "weaknesses": list,
+    "suggestions": list,
+    "improvedPrompt": str,
+}
+
+
+def partial_feedback(fields):
+    """Keep the parsed fields that are FeedbackResult fields of the right type"""
+    return {
+        name: value for name, value in fields.items()
+        if isinstance(value, _FIELD_TYPES.get(name, ())) and not isinstance(value, bool)
+    }
+
+
+class FeedbackStreamParser:
+    """
+    Incremental parser for the top-level fields of a streamed JSON object.
+
+    Text before the first `{` (e.g. "Here is my evaluation:") is skipped. `feed`
+    returns the (name, value) pairs completed by the new text; each character is
+    scanned once, so parsing a whole response stays linear in its length.
+    """
+
+    def __init__(self):
+        """Create a parser waiting for the start of an object"""
+        self.fields = {}
+        self.done = False
+        self._started = False
+        self._state = "key"  # key, colon or value
+        self._in_string = False
+        self._escape = False
+        self._depth = 0  # Nesting inside the current value
+        self._chars = []
+        self._key = None
+
+    def feed(self, text):
+        """Parse more response text and return the fields it completed"""
+        completed = []
+        for char in text:
+            if self.done:
+                break
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                continue
+
+            if self._in_string:
+                self._chars.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._state == "key":
+                        key = self._load()
+                        self._key = key if isinstance(key, str) else None
+                        self._state = "colon"
+                continue
+
+            if self._state == "value":
+                if self._depth == 0 and char in ",}":
+                    value = self._load()
+                    if self._key is not None and value is not _INVALID:
+                        self.fields[self._key] = value
+                        completed.append((self._key, value))
+                    self._state = "key"
+                    self.done = char == "}"
+                    continue
+                self._chars.append(char)
+                if char == '"':
+                    self._in_string = True
+                elif char in "[{":
+                    self._depth += 1
+                elif char in "]}":
+                    self._depth -= 1
+            elif self._state == "key":
+                if char == '"':
+                    self._chars = [char]
+                    self._in_string = True
+                elif char == "}":
+                    self.done = True
+            elif self._state == "colon" and char == ":":
+                self._chars = []
+                self._state = "value"
+        return completed
+
+    def _load(self):
+        """Decode the buffered JSON text, or return _INVALID"""
+        try:
+            return json.loads("".join(self._chars))
+        except ValueError:
+            return _INVALID
+        finally:
+            self._chars = []
@@ -0,0 +1,72 @@
+"""
+Token counting and token-budgeted chunking for long prompts.
+Uses tiktoken when it is installed and its encoding can be loaded, and otherwise
+estimates about four characters per token.
+"""
+
+import functools
+import math
+import re
+
+
+CHARS_PER_TOKEN = 4
+
+# Sentences and lines, each with its trailing whitespace; concatenated they rebuild the text
+_SEGMENT = re.compile(r"[^\n.!?]*(?:[.!?]+|\n+|$)\s*")
+
+
+def _estimate_tokens(text):
+    """Estimate the token count of text without a tokenizer"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@functools.lru_cache(maxsize=None)
+def get_token_counter(model=None):
+    """Get a function counting the tokens of text for a model"""
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(model or "gpt-3.5-turbo")
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # tiktoken is missing, or its encoding files can't be downloaded
+        return _estimate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _split_segment(segment, tokens, max_tokens):
+    """Split a segment longer than the budget into equal pieces of at most about `max_tokens` each"""
+    # Equal pieces, so the last one isn't a sliver sent to the LLM as a part of its own
+    pieces = min(len(segment), math.ceil(tokens / max_tokens))
+    bounds = [len(segment) * number // pieces for number in range(pieces + 1)]
+    return [segment[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def split_into_chunks(text, max_tokens, count_tokens=_estimate_tokens):
+    """
+    Split text into chunks of at most about `max_tokens` tokens each.
+
+    Chunks end at sentence or line boundaries where possible; a single sentence
+    over the budget is split by length. Joining the chunks gives back the text.
+    """
+    if max_tokens < 1:
+        raise ValueError("max_tokens must be at least 1")
+    chunks = []
+    current = []
+    current_tokens = 0
+    for segment in _SEGMENT.findall(text):
+        if not segment:
+            continue
+        tokens = count_tokens(segment)
+        pieces = [segment] if tokens <= max_tokens else _split_segment(segment, tokens, max_tokens)
+        for piece in pieces:
+            piece_tokens = tokens if len(pieces) == 1 else count_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
@@ -0,0 +1,92 @@
+"""
+Corpus-aware topic extraction.
+Keeps document frequencies for every prompt evaluated so far, so key topics are the
+words that are frequent in a prompt but rare across the corpus, not just frequent.
+"""
+
+import hashlib
+import heapq
+import math
+import threading
+from operator import itemgetter
+
+from .utils import topic_counts
+
+
+DEFAULT_MAX_WORDS = 50000
+DEFAULT_MAX_PROMPTS = 100000
+
+
+class TopicIndex:
+    """
+    Incrementally updated TF-IDF index over evaluated prompts.
+
+    `add` counts a prompt's distinct topic words into the document
+    frequencies; `topics` ranks a prompt's words by term frequency times smoothed
+    inverse document frequency, log((1 + N) / (1 + df)) + 1. Both are linear in
+    the prompt's length, with a heap selecting the top k. On an empty index, and
+    for the first prompt added, every IDF is equal and the result matches
+    extract_key_topics.
+
+    Each distinct prompt is counted once, so re-evaluating a prompt doesn't skew
+    the weights; the last `max_prompts` prompts are remembered for this. When the
+    vocabulary grows past `max_words`, the rarest words are dropped (and count as
+    unseen again), so memory stays bounded however large the corpus gets.
+    """
+
+    def __init__(self, max_words=DEFAULT_MAX_WORDS, max_prompts=DEFAULT_MAX_PROMPTS):
+        """Create an empty index"""
+        if max_words < 1 or max_prompts < 1:
+            raise ValueError("max_words and max_prompts must be at least 1")
+        self.max_words = max_words
+        self.max_prompts = max_prompts
+        self.documents = 0
+        self.document_frequency = {}
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def add(self, prompt):
+        """Add a prompt to the corpus, unless it was already added, and return its topic word counts"""
+        counts = topic_counts(prompt)
+        digest = hashlib.blake2b(prompt.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+        with self._lock:
+            if digest in self._seen:
+                return counts
+            self._seen[digest] = None
+            if len(self._seen) > self.max_prompts:
+                del self._seen[next(iter(self._seen))]
+            self.documents += 1
+            frequency = self.document_frequency
+            for word in counts:
+                frequency[word] = frequency.get(word, 0) + 1
+            if len(frequency) > self.max_words:
+                self._prune()
+        return counts
+
+    def _prune(self):
+        """Keep the most frequent 90% of `max_words` words, so pruning doesn't run on every add (the caller holds the lock)"""
+        # nlargest is stable, so ties keep the words seen first
+        keep = heapq.nlargest(max(1, self.max_words * 9 // 10), self.document_frequency.items(), key=itemgetter(1))
+        self.document_frequency = dict(keep)
+
+    def topics(self, prompt, k=5, counts=None):
+        """Get up to k key topics of a prompt, most distinctive first, without adding it to the corpus"""
+        counts = topic_counts(prompt) if counts is None else counts
+        with self._lock:
+            documents = self.documents + 1
+            frequency = self.document_frequency
+            scores = {word: count * (math.log(documents / (frequency.get(word, 0) + 1)) + 1)
+                      for word, count in counts.items()}
+        # nlargest is stable, so ties keep first-seen order
+        return heapq.nlargest(k, scores, key=scores.__getitem__)
+
+    def extract(self, prompt, k=5):
+        """Add a prompt to the corpus and get its key topics"""
+        return self.topics(prompt, k, counts=self.add(prompt))
+
+    def extract_batch(self, prompts, k=5):
+        """
+        Add prompts to the corpus in order and get the key topics of each, ranked
+        against the corpus as it stood once that prompt was added
+        """
+        return [self.extract(prompt, k) for prompt in prompts]
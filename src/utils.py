@@ -0,0 +1,233 @@
+"""
+Utility functions for the Python port of the prompt feedback component.
+Mirrors src/utils.ts and holds the shared keyword matcher used by the heuristics.
+"""
+
+import heapq
+import re
+from collections import Counter
+
+
+# Keyword sets shared by the heuristic rules (kept in sync with the TypeScript sources)
+CONTEXT_WORDS = ('because', 'since', 'as', 'given that', 'context')
+VAGUE_WORDS = ('thing', 'stuff', 'etc', 'something', 'anything', 'good', 'nice', 'great')
+FORMAT_WORDS = ('format', 'structure', 'style', 'bullet points', 'numbered', 'list', 'table', 'json')
+# calculateBasicPromptScore uses its own specificity words and a context list without 'as'
+SPECIFICITY_WORDS = ('specific', 'exactly', 'precisely', 'detailed')
+SCORE_CONTEXT_WORDS = ('because', 'since', 'given that', 'context')
+
+# Stop words ignored by topic extraction (the TypeScript list, without its duplicates)
+STOP_WORDS = frozenset((
+    'a', 'an', 'the', 'and', 'or', 'but', 'if', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+    'am', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing', 'would', 'should', 'could',
+    'ought', 'can', 'will', 'just', 'don', 'now', 's', 't',
+    'to', 'from', 'in', 'out', 'on', 'off', 'over', 'under', 'up', 'down', 'of', 'at', 'by', 'for',
+    'with', 'about', 'against', 'between', 'into', 'through', 'during', 'before', 'after', 'above',
+    'below', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how',
+    'because', 'as', 'until', 'while', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other',
+    'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very',
+    'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', 'your', 'yours', 'yourself',
+    'yourselves', 'he', 'him', 'his', 'himself', 'she', 'her', 'hers', 'herself', 'it', 'its',
+    'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom',
+    'this', 'that', 'these', 'those',
+    "i'm", "you're", "he's", "she's", "it's", "we're", "they're", "i've", "you've", "we've",
+    "they've", "i'd", "you'd", "he'd", "she'd", "we'd", "they'd", "i'll", "you'll", "he'll",
+    "she'll", "we'll", "they'll", "isn't", "aren't", "wasn't", "weren't", "hasn't", "haven't",
+    "hadn't", "doesn't", "don't", "didn't", "won't", "wouldn't", "shan't", "shouldn't", "can't",
+    'cannot', "couldn't", "mustn't", "let's", "that's", "who's", "what's", "here's", "there's",
+    "when's", "where's", "why's", "how's",
+))
+
+_TOPIC_PUNCTUATION = re.compile(r"[.,/#!$%^&*;:{}=\-_`~()]")
+# JavaScript's \s, which differs from Python's (no \x1c-\x1f or \x85, but \ufeff)
+_EXTRA_SPACES = re.compile("[\t\n\v\f\r \xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000\ufeff]{2,}")
+
+# The only non-ASCII characters that lowercase to ASCII word characters. JavaScript's
+# \b treats them as boundaries, so whole-word sets see them as same-length NULs instead
+_WORD_LOOKALIKES = {0x130: "\x00\x00", 0x212A: "\x00"}
+
+
+def create_default_feedback_criteria():
+    """Create default feedback criteria"""
+    return {
+        "clarity": True,
+        "context": True,
+        "constraints": True,
+        "examples": True,
+        "format": True
+    }
+
+
+def create_feedback_criteria(options=None):
+    """Create custom feedback criteria, overriding the defaults with the given options"""
+    criteria = create_default_feedback_criteria()
+    criteria.update(options or {})
+    return criteria
+
+
+def _has_word_lookalike(text):
+    """Check whether lowercasing the text turns a non-word character into an ASCII word character"""
+    return not text.isascii() and ("\u0130" in text or "\u212a" in text)
+
+
+class KeywordMatcher:
+    """
+    Single-pass matcher for several named keyword sets.
+
+    All sets are compiled into one regex that branches on the first character of
+    each keyword and checks the rest with zero-width lookaheads, so a prompt is
+    lowercased and scanned once no matter how many sets or keywords there are.
+    Sets can match as plain substrings (like `text.toLowerCase().includes(word)`)
+    or as whole words (like the ASCII `\\b` regexes in the TypeScript rules).
+    Offsets are into the lowercased text.
+    """
+
+    def __init__(self, substring_sets=None, word_sets=None):
+        """Compile the keyword sets; both arguments map a set name to its keywords"""
+        substring_sets = {name: [w.lower() for w in words] for name, words in (substring_sets or {}).items()}
+        word_sets = {name: [w.lower() for w in words] for name, words in (word_sets or {}).items()}
+        self.names = tuple(substring_sets) + tuple(word_sets)
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Keyword set names must be unique")
+        keywords = {**substring_sets, **word_sets}
+        if not all(all(keywords[name]) for name in self.names):
+            raise ValueError("Keywords must be non-empty strings")
+        # Longest keyword, so callers know how far an edit can affect matches
+        self.max_length = max((len(w) for name in self.names for w in keywords[name]), default=0)
+
+        self._group_names = []
+        self._pattern = self._compile(self.names, keywords, word_sets, self._group_names)
+        # Whole-word sets rescanned on their own when the text has a lookalike character
+        self._word_patterns = {name: self._compile((name,), keywords, word_sets, []) for name in word_sets}
+
+        # Only the first alternative is captured at each position, so a set whose
+        # keywords can start where an earlier set's keyword starts needs a fallback
+        self._fallbacks = {}
+        seen = []
+        for name in self.names:
+            if any(a.startswith(b) or b.startswith(a) for a in keywords[name] for b in seen):
+                self._fallbacks[name] = self._compile((name,), keywords, word_sets, [])
+            seen.extend(keywords[name])
+
+    @staticmethod
+    def _compile(names, keywords, word_sets, group_names):
+        """Compile keyword sets into one first-character branch pattern"""
+        by_first = {}
+        for name in names:
+            for word in keywords[name]:
+                by_first.setdefault(word[0], {}).setdefault(name, []).append(word[1:])
+
+        branches = []
+        for first in sorted(by_first):
+            alternatives = []
+            for name, rests in by_first[first].items():
+                # Longest first so a keyword never hides a longer one from the same set
+                body = "|".join(re.escape(rest) for rest in sorted(rests, key=len, reverse=True))
+                if name in word_sets:
+                    # JavaScript's \b is ASCII-only, so check the boundaries the same way
+                    body = r"(?<![a-z0-9_].)(?:%s)(?![a-z0-9_])" % body
+                alternatives.append("(%s)" % body)
+                group_names.append(name)
+            branches.append("%s(?=%s)" % (re.escape(first), "|".join(alternatives)))
+        return re.compile("|".join(branches), re.DOTALL)
+
+    def positions(self, text):
+        """Return the start offsets of every keyword match in the lowercased text, per set"""
+        lowered = text.lower()
+        positions = {name: [] for name in self.names}
+        for m in self._pattern.finditer(lowered):
+            positions[self._group_names[m.lastindex - 1]].append(m.start())
+        for name, pattern in self._fallbacks.items():
+            positions[name] = [m.start() for m in pattern.finditer(lowered)]
+        if self._word_patterns and _has_word_lookalike(text):
+            # Same offsets as `lowered`, but the lookalikes can't touch a whole word
+            lowered = text.translate(_WORD_LOOKALIKES).lower()
+            for name, pattern in self._word_patterns.items():
+                positions[name] = [m.start() for m in pattern.finditer(lowered)]
+        return positions
+
+    def match(self, text):
+        """Return the names of the keyword sets that occur in the text"""
+        if self._word_patterns and _has_word_lookalike(text):
+            return {name for name, positions in self.positions(text).items() if positions}
+        text = text.lower()
+        found = set()
+        total = len(self.names)
+        for m in self._pattern.finditer(text):
+            found.add(self._group_names[m.lastindex - 1])
+            if len(found) == total:
+                return found
+        for name, pattern in self._fallbacks.items():
+            if name not in found and pattern.search(text):
+                found.add(name)
+        return found
+
+
+# Matcher for the rules used by PromptFeedbackEvaluator.run_heuristic_evaluation
+HEURISTIC_MATCHER = KeywordMatcher(
+    substring_sets={"context": CONTEXT_WORDS, "format": FORMAT_WORDS},
+    word_sets={"vague": VAGUE_WORDS},
+)
+
+# Matcher for the rules used by calculate_basic_prompt_score
+SCORE_MATCHER = KeywordMatcher(
+    substring_sets={"specificity": SPECIFICITY_WORDS, "context": SCORE_CONTEXT_WORDS, "format": FORMAT_WORDS},
+    word_sets={"vague": VAGUE_WORDS},
+)
+
+
+def calculate_basic_prompt_score(prompt):
+    """Calculate a prompt quality score (0-100) based on basic heuristics"""
+    if not prompt:
+        return 0
+
+    matched = SCORE_MATCHER.match(prompt)
+    score = 50  # Start with a neutral score
+    score += min(20, len(prompt) // 10)  # Length factor (0-20 points)
+    score += 10 if "specificity" in matched else 0  # Specificity factor (0-10 points)
+    score += 10 if '?' in prompt else 0  # Question clarity (0-10 points)
+    score += 10 if "context" in matched else 0  # Context factor (0-10 points)
+    score += 10 if "format" in matched else 0  # Format specification (0-10 points)
+    score -= 10 if "vague" in matched else 0  # Vague language penalty (-10 points)
+
+    # Ensure score is between 0-100
+    return max(0, min(100, score))
+
+
+def topic_words(prompt):
+    """Split a prompt into the lowercase words that can be topics (longer than 3 characters, not stop words)"""
+    # Remove punctuation and collapse runs of whitespace, then split on single spaces
+    clean_prompt = _EXTRA_SPACES.sub(" ", _TOPIC_PUNCTUATION.sub("", prompt.lower()))
+    return [word for word in clean_prompt.split(" ") if len(word) > 3 and word not in STOP_WORDS]
+
+
+def _is_array_index(word):
+    """Check whether JavaScript treats a word as an array index key"""
+    return word.isascii() and word.isdigit() and (word == "0" or word[0] != "0") and int(word) < 2 ** 32 - 1
+
+
+def topic_counts(prompt):
+    """Count a prompt's topic words, in the order the TypeScript version's object lists them"""
+    counts = Counter(topic_words(prompt))
+    # JavaScript objects list integer-like keys first, in numeric order, then the rest in insertion order
+    indices = [word for word in counts if _is_array_index(word)]
+    if not indices:
+        return counts
+    ordered = Counter({word: counts[word] for word in sorted(indices, key=int)})
+    ordered.update({word: count for word, count in counts.items() if word not in ordered})
+    return ordered
+
+
+def extract_key_topics(prompt):
+    """Extract up to five key topics from a prompt by word frequency"""
+    word_frequency = topic_counts(prompt)
+
+    # Top 5 by frequency; nlargest is stable, so ties keep the TypeScript version's order
+    return heapq.nlargest(5, word_frequency, key=word_frequency.__getitem__)
+
+
+# camelCase aliases matching the TypeScript API
+createDefaultFeedbackCriteria = create_default_feedback_criteria
+createFeedbackCriteria = create_feedback_criteria
+calculateBasicPromptScore = calculate_basic_prompt_score
+extractKeyTopics = extract_key_topics
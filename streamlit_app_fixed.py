@@ -1,8 +1,23 @@
+import time
+script_started = time.perf_counter()
+
 import streamlit as st
 import os
 import sys
+import functools
 import json
-from datetime import datetime
+import uuid
+
+from src.profiling import PhaseTimer
+
+# Streamlit re-executes this script on every interaction, so anything expensive
+# below is cached per process. FEEDBACK_PROFILE=1 or ?profile=1 times each phase.
+query_params = getattr(st, "query_params", {})
+profiler = PhaseTimer(
+    enabled=os.environ.get("FEEDBACK_PROFILE") == "1" or query_params.get("profile") == "1",
+    started=script_started
+)
+profiler.mark("imports")
 
 # Set page configuration
 st.set_page_config(
@@ -11,16 +26,28 @@ st.set_page_config(
     layout="wide"
 )
 
-# Load custom CSS
-def load_css():
+@st.cache_resource
+def get_process_stats():
+    """Get per-process run statistics, kept across reruns"""
+    return {"runs": 0}
+
+# Load custom CSS, read from disk once per process
+@st.cache_resource
+def read_css():
+    """Read style.css, or return an empty string if it is missing"""
     try:
         with open("style.css") as f:
-            st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
-    except:
-        pass
+            return f.read()
+    except OSError:
+        return ""
+
+def load_css():
+    if css := read_css():
+        st.markdown(f'<style>{css}</style>', unsafe_allow_html=True)
 
 # Try to load CSS
 load_css()
+profiler.mark("css")
 
 # App title and description
 st.title("✨ LangChain Prompt Feedback Tool")
@@ -29,132 +56,264 @@ This tool helps you improve your prompts for LLMs by providing real-time feedbac
 Type your prompt in the text area below and receive instant feedback on its quality.
 """)
 
-# Initialize session state for history
-if 'history' not in st.session_state:
-    st.session_state.history = []
+# Initialize session state for history; the entries themselves live in the history store
+if 'history_session' not in st.session_state:
+    st.session_state.history_session = uuid.uuid4().hex
+    st.session_state.history_page = 0
 
-# Handle LangChain imports with compatibility for different versions
-try:
-    # Try importing from langchain_community (newer versions)
-    from langchain_community.chat_models import ChatOpenAI
-    from langchain_community.llms import OpenAI
-    st.sidebar.success("✅ Using LangChain Community modules")
-except ImportError:
+HISTORY_PAGE_SIZE = 10
+TOPIC_SEED_PROMPTS = 5000
+
+def rerun():
+    """Rerun the script on both current and older Streamlit versions"""
+    if hasattr(st, "rerun"):
+        st.rerun()
+    else:
+        st.experimental_rerun()
+
+def use_prompt(prompt):
+    """Load a prompt into the editor"""
+    st.session_state.prompt_input = prompt
+
+# Check which LangChain flavour is installed without importing it; the evaluator
+# imports the LangChain modules it needs the first time it creates an LLM client
+@st.cache_resource
+def detect_langchain():
+    """Get "community", "legacy" or None for the installed LangChain modules"""
+    import importlib.util
+    if importlib.util.find_spec("langchain_community") is not None:
+        return "community"
+    if importlib.util.find_spec("langchain") is not None:
+        return "legacy"
+    return None
+
+# Resolve our component once per process - handle both direct import and relative import scenarios
+@st.cache_resource
+def load_component():
+    """Get (PromptFeedbackChain, createFeedbackCriteria, direct_import), or None if unavailable"""
     try:
-        # Try importing from langchain (older versions)
-        from langchain.chat_models import ChatOpenAI
-        from langchain.llms import OpenAI
-        st.sidebar.success("✅ Using LangChain legacy modules")
+        # Try to import directly (when installed as a package)
+        from langchain_prompt_feedback import PromptFeedbackChain, createFeedbackCriteria
+        return PromptFeedbackChain, createFeedbackCriteria, True
     except ImportError:
-        st.error("""
-        Failed to import LangChain modules. 
-        
-        Please make sure you have installed either:
-        1. `langchain` and `langchain_community` (for newer versions)
-        2. `langchain` (for older versions)
-        
-        Run: `pip install langchain langchain_community`
-        """)
-        st.stop()
-
-# Import our component - handle both direct import and relative import scenarios
-try:
-    # Try to import directly (when installed as a package)
-    from langchain_prompt_feedback import PromptFeedbackChain, createFeedbackCriteria
-    direct_import = True
-except ImportError:
+        pass
     try:
         # Try to import from src directory (when in the repository)
-        sys.path.append(".")
+        if "." not in sys.path:
+            sys.path.append(".")
         from src.PromptFeedbackChain import PromptFeedbackChain
         from src.utils import createFeedbackCriteria
-        direct_import = False
+        return PromptFeedbackChain, createFeedbackCriteria, False
     except ImportError:
+        pass
+    try:
         # Try to use the adapter
-        try:
-            from adapter import get_prompt_feedback_chain, get_feedback_criteria_creator
-            PromptFeedbackChain = get_prompt_feedback_chain()
-            createFeedbackCriteria = get_feedback_criteria_creator()
-            direct_import = True
-        except ImportError:
-            st.error("""
-            Failed to import the LangChain Prompt Feedback Component. 
-            
-            Please make sure you have either:
-            1. Installed the package using `pip install langchain-prompt-feedback`
-            2. Cloned the repository and are running this app from the repository root
-            
-            Check the deployment guide for more information.
-            """)
-            st.stop()
+        from adapter import get_prompt_feedback_chain, get_feedback_criteria_creator
+        return get_prompt_feedback_chain(), get_feedback_criteria_creator(), True
+    except ImportError:
+        return None
+
+profiler.mark("page setup")
+langchain_flavour = detect_langchain()
+profiler.mark("langchain check")
+if langchain_flavour == "community":
+    st.sidebar.success("✅ Using LangChain Community modules")
+elif langchain_flavour == "legacy":
+    st.sidebar.success("✅ Using LangChain legacy modules")
+else:
+    st.error("""
+    Failed to import LangChain modules. 
+    
+    Please make sure you have installed either:
+    1. `langchain` and `langchain_community` (for newer versions)
+    2. `langchain` (for older versions)
+    
+    Run: `pip install langchain langchain_community`
+    """)
+    st.stop()
 
-# Sidebar for configuration
-st.sidebar.title("Configuration")
+component = load_component()
+profiler.mark("component imports")
+if component is None:
+    st.error("""
+    Failed to import the LangChain Prompt Feedback Component. 
+    
+    Please make sure you have either:
+    1. Installed the package using `pip install langchain-prompt-feedback`
+    2. Cloned the repository and are running this app from the repository root
+    
+    Check the deployment guide for more information.
+    """)
+    st.stop()
+PromptFeedbackChain, createFeedbackCriteria, direct_import = component
+
+# Persistent feedback cache and evaluator pool
+from src.cache import FeedbackCache, cache_key, evaluation_options, should_cache
+from src.client import FeedbackServiceClient
+from src.history import HistoryStore
+from src.interfaces import feedback_event
+from src.live import LiveEvaluator
+from src.metrics import metrics, start_http_server
+from src.registry import get_evaluator, key_fingerprint
+from src.similarity import NearDuplicateCache
+from src.speculation import speculator
+from src.topics import TopicIndex
+profiler.mark("src imports")
+
+# Prometheus metrics endpoint, started once per process when FEEDBACK_METRICS_PORT is set
+@st.cache_resource
+def start_metrics_server():
+    """Serve /metrics on FEEDBACK_METRICS_PORT, if set"""
+    port = os.environ.get("FEEDBACK_METRICS_PORT")
+    if port:
+        return start_http_server(int(port), host=os.environ.get("FEEDBACK_METRICS_HOST", "127.0.0.1"))
+    return None
 
-# API Key input - check for secrets first
-api_key = None
+start_metrics_server()
 
-# Try to get API key from secrets
-try:
-    if hasattr(st.secrets, "openai") and "api_key" in st.secrets.openai:
-        api_key = st.secrets.openai.api_key
-        st.sidebar.success("✅ Using API key from secrets")
+# Thin client mode: a separately scaled feedback service evaluates the prompts
+@st.cache_resource
+def get_service_client():
+    """Get the client for the feedback service at FEEDBACK_SERVICE_URL, or None to evaluate in process"""
+    return FeedbackServiceClient.from_env()
+
+# Streamlit reruns only a fragment when a widget inside it changes, so sidebar and
+# history interactions don't re-execute the whole script. Older versions rerun everything.
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+fragments_supported = fragment is not None
+if not fragments_supported:
+    fragment = lambda func: func
+
+# Sidebar widget defaults, by session state key
+SETTING_DEFAULTS = {
+    "api_key_input": "",
+    "clarity": True,
+    "context": True,
+    "constraints": True,
+    "examples": True,
+    "format": True,
+    "use_llm": True,
+    "llm_model": "gpt-3.5-turbo",
+    "smart_routing": False,
+    "long_prompt_mode": False,
+    "debounce_time": 300,
+    "live_feedback": False,
+}
+
+def secret_api_key():
+    """Get the API key from secrets, or None if there isn't one"""
+    try:
+        if hasattr(st.secrets, "openai") and "api_key" in st.secrets.openai:
+            return st.secrets.openai.api_key
+    except Exception:
+        pass
+    return None
+
+def widget_settings():
+    """Get the sidebar widgets' current values"""
+    return {name: st.session_state.get(name, default) for name, default in SETTING_DEFAULTS.items()}
+
+@fragment
+def config_panel():
+    """Sidebar configuration; changing it reruns only this panel unless live feedback needs to update"""
+    st.title("Configuration")
+
+    # API Key input - check for secrets first
+    if secret_api_key() is not None:
+        st.success("✅ Using API key from secrets")
     else:
-        api_key = st.sidebar.text_input("OpenAI API Key", type="password", 
-                                      help="Enter your OpenAI API key. It will not be stored.")
-except:
-    api_key = st.sidebar.text_input("OpenAI API Key", type="password", 
-                                  help="Enter your OpenAI API key. It will not be stored.")
-
-# Feedback criteria selection
-st.sidebar.subheader("Feedback Criteria")
-clarity = st.sidebar.checkbox("Clarity", value=True, help="Is the prompt clear and specific?")
-context = st.sidebar.checkbox("Context", value=True, help="Does it provide necessary context?")
-constraints = st.sidebar.checkbox("Constraints", value=True, help="Does it specify constraints?")
-examples = st.sidebar.checkbox("Examples", value=True, help="Does it include examples if needed?")
-format = st.sidebar.checkbox("Format", value=True, help="Does it specify desired output format?")
-
-# LLM selection
-use_llm = st.sidebar.checkbox("Use LLM for advanced feedback", value=True, 
-                             help="Uses an LLM to provide more detailed feedback (requires API key)")
-
-# LLM model selection (only show if use_llm is checked)
-llm_model = "gpt-3.5-turbo"
-if use_llm:
-    llm_model = st.sidebar.selectbox(
-        "Select LLM Model",
-        ["gpt-3.5-turbo", "gpt-4", "gpt-4-turbo"],
-        index=0,
-        help="Select the OpenAI model to use for feedback"
+        st.text_input("OpenAI API Key", type="password", key="api_key_input",
+                      help="Enter your OpenAI API key. It will not be stored.")
+
+    if get_service_client() is not None:
+        st.caption(f"🔗 Evaluating with the feedback service at {get_service_client().base_url}")
+
+    # Feedback criteria selection
+    st.subheader("Feedback Criteria")
+    st.checkbox("Clarity", value=SETTING_DEFAULTS["clarity"], key="clarity", help="Is the prompt clear and specific?")
+    st.checkbox("Context", value=SETTING_DEFAULTS["context"], key="context", help="Does it provide necessary context?")
+    st.checkbox("Constraints", value=SETTING_DEFAULTS["constraints"], key="constraints", help="Does it specify constraints?")
+    st.checkbox("Examples", value=SETTING_DEFAULTS["examples"], key="examples", help="Does it include examples if needed?")
+    st.checkbox("Format", value=SETTING_DEFAULTS["format"], key="format", help="Does it specify desired output format?")
+
+    # LLM selection
+    if st.checkbox("Use LLM for advanced feedback", value=SETTING_DEFAULTS["use_llm"], key="use_llm",
+                   help="Uses an LLM to provide more detailed feedback (requires API key)"):
+        # LLM model selection (only shown if use_llm is checked)
+        st.selectbox(
+            "Select LLM Model",
+            ["gpt-3.5-turbo", "gpt-4", "gpt-4-turbo"],
+            key="llm_model",
+            help="Select the OpenAI model to use for feedback"
+        )
+
+        # Routing skips the LLM for clear-cut prompts and picks a model for the rest
+        st.checkbox(
+            "Smart model routing",
+            value=SETTING_DEFAULTS["smart_routing"],
+            key="smart_routing",
+            help="Skip the LLM when the quick check is conclusive, use gpt-3.5-turbo for medium-confidence prompts and gpt-4 for ambiguous ones"
+        )
+
+    # Long prompts are evaluated in chunks instead of being cut at 2000 characters
+    st.checkbox(
+        "Long prompt mode",
+        value=SETTING_DEFAULTS["long_prompt_mode"],
+        key="long_prompt_mode",
+        help="Evaluate the whole prompt in token-budgeted chunks instead of only the first 2000 characters"
     )
 
-# Debounce time
-debounce_time = st.sidebar.slider(
-    "Debounce Time (ms)",
-    min_value=100,
-    max_value=1000,
-    value=300,
-    step=100,
-    help="Time to wait after typing stops before processing feedback"
-)
+    # Debounce time
+    st.slider(
+        "Debounce Time (ms)",
+        min_value=100,
+        max_value=1000,
+        value=SETTING_DEFAULTS["debounce_time"],
+        step=100,
+        key="debounce_time",
+        help="Time to wait after typing stops before processing feedback"
+    )
 
-# Create feedback criteria
-if direct_import:
-    criteria = createFeedbackCriteria({
-        "clarity": clarity,
-        "context": context,
-        "constraints": constraints,
-        "examples": examples,
-        "format": format
-    })
-else:
-    criteria = {
-        "clarity": clarity,
-        "context": context,
-        "constraints": constraints,
-        "examples": examples,
-        "format": format
-    }
+    # Live feedback re-evaluates every committed edit (on blur or Ctrl+Enter) without the button
+    st.checkbox(
+        "Live feedback as you type",
+        value=SETTING_DEFAULTS["live_feedback"],
+        key="live_feedback",
+        help="Show quick feedback after each edit and detailed LLM feedback once you pause"
+    )
+
+    # Button feedback uses the new settings on the next click, but live feedback
+    # shows the current settings, so it reruns the app when they change
+    settings = widget_settings()
+    applied = st.session_state.get("applied_settings")
+    st.session_state.applied_settings = settings
+    if fragments_supported and applied is not None and applied != settings and (
+            settings["live_feedback"] or applied["live_feedback"]):
+        rerun()
+
+def load_settings():
+    """Read the sidebar settings into module-level names, so fragment reruns see the latest values"""
+    global api_key, use_llm, llm_model, routing, long_prompt_mode, debounce_time, live_feedback, criteria
+    settings = widget_settings()
+    api_key = secret_api_key() or settings["api_key_input"]
+    use_llm = settings["use_llm"]
+    llm_model = settings["llm_model"]
+    routing = {"fastModel": "gpt-3.5-turbo", "strongModel": "gpt-4"} if use_llm and settings["smart_routing"] else None
+    long_prompt_mode = settings["long_prompt_mode"]
+    debounce_time = settings["debounce_time"]
+    live_feedback = settings["live_feedback"]
+
+    # Create feedback criteria
+    selected = {name: settings[name] for name in ("clarity", "context", "constraints", "examples", "format")}
+    criteria = createFeedbackCriteria(selected) if direct_import else selected
+
+with st.sidebar:
+    config_panel()
+load_settings()
+
+# Client-side LLM rate limit per API key and model, in requests per second
+rate_limit = os.environ.get("FEEDBACK_LLM_RATE_LIMIT")
+resilience = {"requestsPerSecond": float(rate_limit)} if rate_limit else None
 
 # Main content - two columns layout
 col1, col2 = st.columns([3, 2])
@@ -163,6 +322,7 @@ with col1:
     st.subheader("Your Prompt")
     prompt_input = st.text_area(
         "Enter your prompt:",
+        key="prompt_input",
         height=200,
         placeholder="Type your prompt here. For example: Explain the concept of quantum computing to a high school student..."
     )
@@ -170,163 +330,362 @@ with col1:
     # Process button
     process_button = st.button("Get Feedback")
 
-# Function to get feedback (with caching)
-@st.cache_data(ttl=300)
-def get_feedback(prompt, criteria_json, use_llm_param, llm_model_param, api_key_param):
-    """Get feedback for a prompt with caching"""
-    if api_key_param:
-        os.environ["OPENAI_API_KEY"] = api_key_param
-    
+profiler.mark("sidebar and editor")
+
+# Persistent feedback cache, opened once per process and shared by all sessions
+@st.cache_resource
+def get_feedback_cache():
+    """Get the on-disk feedback cache"""
+    return FeedbackCache.from_env()
+
+# Capped, paginated prompt history, shared by all sessions
+@st.cache_resource
+def get_history_store():
+    """Get the on-disk prompt history store"""
+    return HistoryStore.from_env()
+
+# LLM feedback reused for near-identical prompts, shared by all sessions
+@st.cache_resource
+def get_similarity_cache():
+    """Get the on-disk near-duplicate LLM feedback cache"""
+    return NearDuplicateCache.from_env()
+
+# TF-IDF index over every prompt in the history, so key topics are what sets a prompt apart
+@st.cache_resource
+def get_topic_index():
+    """Get the topic index, seeded from the most recent prompts in the stored history"""
+    index = TopicIndex()
+    for prompt in get_history_store().prompts(limit=TOPIC_SEED_PROMPTS):
+        index.add(prompt)
+    return index
+
+# Function to stream feedback (with caching)
+def stream_feedback(prompt, criteria_json, use_llm_param, llm_model_param, api_key_param):
+    """Stream feedback events for a prompt, serving repeats from the cache"""
     # Convert criteria from JSON string back to dict
     criteria_dict = json.loads(criteria_json)
     
+    config = {
+        "criteria": criteria_dict,
+        "useLLM": use_llm_param,
+        "debounceTime": debounce_time,
+        "llmModel": llm_model_param if use_llm_param else None,
+        "longPromptMode": long_prompt_mode,
+        "streamLLM": True,
+        "routing": routing,
+        "resilience": resilience,
+        "openAIApiKey": api_key_param or None
+    }
+
+    # The service caches and evaluates, and sends LLM events already combined with the heuristic feedback
+    service = get_service_client()
+    if service is not None:
+        yield from service.stream_feedback(prompt, {
+            key: value for key, value in config.items() if key not in ("debounceTime", "resilience")
+        })
+        return
+    
+    # The cache key covers prompt, criteria, model and options, but never the API key
+    feedback_cache = get_feedback_cache()
+    key = cache_key(prompt, criteria_dict, llm_model_param if use_llm_param else None, evaluation_options(config))
+    cached = feedback_cache.get(key)
+    if cached is not None:
+        yield feedback_event("complete", cached, prompt)
+        return
+    
     # Create the feedback chain
     if direct_import:
-        feedback_chain = PromptFeedbackChain({
-            "criteria": criteria_dict,
-            "useLLM": use_llm_param,
-            "debounceTime": 300,
-            "llmModel": llm_model_param if use_llm_param else None
-        })
+        # The key is passed in config["openAIApiKey"], never through os.environ shared by every session
+        feedback_chain = PromptFeedbackChain(config)
     else:
-        feedback_chain = PromptFeedbackChain({
-            "criteria": criteria_dict,
-            "useLLM": use_llm_param,
-            "debounceTime": 300,
-            "llmModel": llm_model_param if use_llm_param else None
-        })
+        # Reuse a pooled evaluator; the API key goes to its client, not os.environ
+        feedback_chain = PromptFeedbackChain(evaluator=get_evaluator(config, get_similarity_cache()))
+    
+    # Get feedback, staged when the chain supports it
+    if hasattr(feedback_chain, "stream_feedback"):
+        events = feedback_chain.stream_feedback(prompt)
+    else:
+        events = [feedback_event("complete", feedback_chain.call({"input": prompt}).get("feedback", {}), prompt)]
     
-    # Get feedback
-    result = feedback_chain.call({"input": prompt})
-    return result.get("feedback", {})
+    heuristic_feedback = None
+    for event in events:
+        if event["type"] == "heuristic":
+            heuristic_feedback = event["feedback"]
+        elif event["type"] == "llm" and heuristic_feedback is not None and hasattr(feedback_chain, "get_evaluator"):
+            # Preview the streamed LLM fields combined with the heuristic feedback
+            event = dict(event, feedback=feedback_chain.get_evaluator().combine_feedback(heuristic_feedback, event["feedback"]))
+        elif event["type"] == "complete":
+            feedback = event["feedback"]
+            # Don't persist fallbacks for a failed or unparseable LLM call
+            if should_cache(feedback):
+                feedback_cache.set(key, feedback)
+        yield event
+
+def speculation_key(prompt):
+    """Identify a speculative evaluation by its prompt and the settings that change its feedback"""
+    return (prompt, json.dumps(criteria), use_llm, llm_model if use_llm else None, long_prompt_mode,
+            json.dumps(routing), key_fingerprint(api_key))
+
+def speculate(prompt, group):
+    """Evaluate a prompt the user is likely to pick next in the background, so its feedback is cached"""
+    # Only LLM feedback is slow enough to be worth evaluating ahead of time
+    if direct_import or not prompt.strip() or not use_llm or not (api_key or get_service_client()):
+        return
+    criteria_json = json.dumps(criteria)
+
+    def run(cancelled):
+        events = stream_feedback(prompt, criteria_json, use_llm, llm_model, api_key)
+        try:
+            for _ in events:
+                if cancelled.is_set():
+                    break
+        finally:
+            events.close()
+
+    speculator.submit(st.session_state.history_session, speculation_key(prompt), run, group)
+
+def get_live_evaluator(criteria_json, use_llm_param, llm_model_param, api_key_param):
+    """Get this session's live evaluator, rebuilding it when the settings change"""
+    settings = (criteria_json, use_llm_param, llm_model_param, debounce_time, long_prompt_mode,
+                json.dumps(routing), key_fingerprint(api_key_param))
+    live = st.session_state.get("live_evaluator")
+    if live is None or st.session_state.get("live_settings") != settings:
+        if live is not None:
+            live.cancel()
+        config = {
+            "criteria": json.loads(criteria_json),
+            "useLLM": use_llm_param,
+            "debounceTime": debounce_time,
+            "llmModel": llm_model_param if use_llm_param else None,
+            "longPromptMode": long_prompt_mode,
+            "routing": routing,
+            "resilience": resilience,
+            "openAIApiKey": api_key_param or None
+        }
+        live = LiveEvaluator(
+            get_evaluator(config, get_similarity_cache()),
+            debounce_ms=debounce_time,
+            cache=get_feedback_cache(),
+            cache_model=llm_model_param if use_llm_param else None
+        )
+        st.session_state.live_evaluator = live
+        st.session_state.live_settings = settings
+    return live
+
+# Feedback and history HTML is built once per distinct content and reused across reruns
+@functools.lru_cache(maxsize=1024)
+def findings_html(kind, icon, findings):
+    """Get the HTML for a list of findings, rendered as one element"""
+    return "\n".join(f'<div class="feedback-item {kind}">{icon} {finding}</div>' for finding in findings)
+
+@functools.lru_cache(maxsize=1024)
+def history_item_html(number, timestamp, score, preview):
+    """Get the HTML summary of a history entry"""
+    return f"""
+    <div class="history-item">
+        <h4>Prompt {number}</h4>
+        <p><strong>Time:</strong> {timestamp}</p>
+        <p><strong>Score:</strong> {score}/100</p>
+        <p><strong>Original:</strong> {preview}</p>
+    </div>
+    """
+
+def render_feedback(feedback, pending=False, topics=None):
+    """Render feedback in the current container; `pending` marks a partial result"""
+    with metrics.time_stage("render"):
+        st.subheader("Prompt Feedback")
+        if pending:
+            st.caption("⏳ Quick check shown below. Waiting for detailed LLM feedback...")
+
+        # Score with color coding and CSS classes
+        score = feedback.get("score", 0)
+        score_class = "score-low" if score < 50 else "score-medium" if score < 75 else "score-high"
+        score_color = "red" if score < 50 else "orange" if score < 75 else "green"
+
+        # Use HTML for better styling
+        st.markdown(f"""
+        <div class="score-container {score_class}">
+            <h3>Score: <span style="color:{score_color}">{score}/100</span></h3>
+        </div>
+        """, unsafe_allow_html=True)
+        if topics:
+            st.caption("🏷️ Key topics: " + ", ".join(topics))
+
+        # Strengths
+        if strengths := feedback.get("strengths", []):
+            st.markdown("### Strengths:")
+            st.markdown(findings_html("strength", "✅", tuple(strengths)), unsafe_allow_html=True)
+
+        # Weaknesses
+        if weaknesses := feedback.get("weaknesses", []):
+            st.markdown("### Areas for Improvement:")
+            st.markdown(findings_html("weakness", "🔍", tuple(weaknesses)), unsafe_allow_html=True)
+
+        # Suggestions
+        if suggestions := feedback.get("suggestions", []):
+            st.markdown("### Suggestions:")
+            st.markdown(findings_html("suggestion", "💡", tuple(suggestions)), unsafe_allow_html=True)
+
+        # Improved prompt
+        if not pending and (improved_prompt := feedback.get("improvedPrompt")):
+            st.markdown("### Improved Prompt:")
+            st.text_area("", value=improved_prompt, height=150, disabled=True, key="improved_prompt")
+            st.button("Use This Improved Prompt", on_click=use_prompt, args=(improved_prompt,))
 
 # Process the prompt if button is clicked
 if process_button:
     if not prompt_input.strip():
         st.error("Please enter a prompt to receive feedback.")
     else:
-        if use_llm and not api_key:
+        # With the feedback service, its own API key is used when none is entered
+        if use_llm and not api_key and get_service_client() is None:
             st.error("Please enter your OpenAI API key to use LLM-based feedback.")
         else:
-            with st.spinner("Analyzing your prompt..."):
-                try:
-                    # Convert criteria to JSON string for caching
-                    criteria_json = json.dumps(criteria)
-                    
-                    # Get feedback with caching
-                    feedback = get_feedback(
+            # Feedback is redrawn in place as each evaluation stage arrives
+            with col2:
+                feedback_placeholder = st.empty()
+            try:
+                # Convert criteria to JSON string for caching
+                criteria_json = json.dumps(criteria)
+                
+                # Evaluating a prompt moves on from other speculation. If this prompt is
+                # already being evaluated in the background, the stream below joins its LLM request
+                session = st.session_state.history_session
+                speculator.cancel(session, keep=(speculation_key(prompt_input),))
+                speculator.supersede(session, speculation_key(prompt_input))
+
+                feedback = {}
+                topics = get_topic_index().extract(prompt_input)
+                with speculator.foreground():
+                    for event in stream_feedback(
                         prompt_input, 
                         criteria_json, 
                         use_llm, 
                         llm_model if use_llm else None,
                         api_key
-                    )
-                    
-                    # Save to history
-                    history_item = {
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "original_prompt": prompt_input,
-                        "score": feedback.get("score", 0),
-                        "strengths": feedback.get("strengths", []),
-                        "weaknesses": feedback.get("weaknesses", []),
-                        "suggestions": feedback.get("suggestions", []),
-                        "improved_prompt": feedback.get("improvedPrompt", "")
-                    }
-                    st.session_state.history.append(history_item)
-                    
-                    # Display feedback in the second column
-                    with col2:
-                        st.subheader("Prompt Feedback")
-                        
-                        # Score with color coding and CSS classes
-                        score = feedback.get("score", 0)
-                        score_class = "score-low" if score < 50 else "score-medium" if score < 75 else "score-high"
-                        score_color = "red" if score < 50 else "orange" if score < 75 else "green"
-                        
-                        # Use HTML for better styling
-                        st.markdown(f"""
-                        <div class="score-container {score_class}">
-                            <h3>Score: <span style="color:{score_color}">{score}/100</span></h3>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Strengths
-                        if strengths := feedback.get("strengths", []):
-                            st.markdown("### Strengths:")
-                            for strength in strengths:
-                                st.markdown(f"""
-                                <div class="feedback-item strength">
-                                    ✅ {strength}
-                                </div>
-                                """, unsafe_allow_html=True)
-                        
-                        # Weaknesses
-                        if weaknesses := feedback.get("weaknesses", []):
-                            st.markdown("### Areas for Improvement:")
-                            for weakness in weaknesses:
-                                st.markdown(f"""
-                                <div class="feedback-item weakness">
-                                    🔍 {weakness}
-                                </div>
-                                """, unsafe_allow_html=True)
-                        
-                        # Suggestions
-                        if suggestions := feedback.get("suggestions", []):
-                            st.markdown("### Suggestions:")
-                            for suggestion in suggestions:
-                                st.markdown(f"""
-                                <div class="feedback-item suggestion">
-                                    💡 {suggestion}
-                                </div>
-                                """, unsafe_allow_html=True)
-                        
-                        # Improved prompt
-                        if improved_prompt := feedback.get("improvedPrompt"):
-                            st.markdown("### Improved Prompt:")
-                            st.text_area("", value=improved_prompt, height=150, disabled=True, key="improved_prompt")
-                            if st.button("Use This Improved Prompt"):
-                                prompt_input = improved_prompt
-                                st.experimental_rerun()
+                    ):
+                        if event["type"] == "initial":
+                            with feedback_placeholder.container():
+                                st.info("Analyzing your prompt...")
+                        elif event["type"] in ("heuristic", "llm"):
+                            with feedback_placeholder.container():
+                                render_feedback(event["feedback"], pending=use_llm, topics=topics)
+                        elif event["type"] == "complete":
+                            feedback = event["feedback"]
+                            with feedback_placeholder.container():
+                                render_feedback(feedback, topics=topics)
                 
-                except Exception as e:
-                    st.error(f"An error occurred: {str(e)}")
-                    st.error("If you're using LLM-based feedback, please check your API key.")
-
-# Display history in an expander
-with st.expander("Prompt History"):
-    if st.session_state.history:
-        # Add a button to clear history
-        if st.button("Clear History"):
-            st.session_state.history = []
-            st.experimental_rerun()
+                # Save to history, and keep the result on screen across later reruns
+                get_history_store().add(st.session_state.history_session, prompt_input, feedback)
+                st.session_state.history_page = 0
+                st.session_state.last_feedback = {"prompt": prompt_input, "feedback": feedback, "topics": topics}
+
+                # The improved prompt is usually evaluated next
+                if feedback.get("improvedPrompt"):
+                    speculate(feedback["improvedPrompt"], "feedback")
+            
+            except Exception as e:
+                st.error(f"An error occurred: {str(e)}")
+                st.error("If you're using LLM-based feedback, please check your API key.")
+
+elif live_feedback and prompt_input.strip() and not direct_import:
+    # Only LLM feedback needs the API key; quick checks run without it
+    live = get_live_evaluator(json.dumps(criteria), use_llm and bool(api_key), llm_model if use_llm else None, api_key)
+    live.update(prompt_input)
+    if st.session_state.get("live_prompt") != prompt_input:
+        # Editing the prompt moves on from earlier speculation
+        speculator.cancel(st.session_state.history_session, keep=(speculation_key(prompt_input),))
+        st.session_state.live_prompt = prompt_input
+    topics = get_topic_index().topics(prompt_input)
+
+    def poll_live_feedback():
+        """Show pending feedback, rerunning the whole app once the LLM result arrives"""
+        snapshot = live.snapshot()
+        if not snapshot["pending"]:
+            st.rerun()
+        render_feedback(snapshot["feedback"], pending=True, topics=topics)
+
+    with col2:
+        snapshot = live.snapshot()
+        if snapshot["pending"] and fragments_supported:
+            # Poll for the debounced LLM result without rerunning the rest of the app
+            fragment(run_every=0.5)(poll_live_feedback)()
+        else:
+            render_feedback(snapshot["feedback"], pending=snapshot["pending"], topics=topics)
+            if not snapshot["pending"] and snapshot["feedback"].get("improvedPrompt"):
+                speculate(snapshot["feedback"]["improvedPrompt"], "feedback")
+
+elif (last := st.session_state.get("last_feedback")) and last["prompt"] == prompt_input:
+    # Redraw the last result for this prompt instead of clearing or re-evaluating it
+    with col2:
+        render_feedback(last["feedback"], topics=last["topics"])
+
+profiler.mark("evaluation")
+
+# Display history in an expander, one page at a time
+def change_history_page(step):
+    """Move to a newer (-1) or older (+1) page of history"""
+    st.session_state.history_page = max(0, st.session_state.history_page + step)
+    speculator.cancel(st.session_state.history_session, group="history")
+
+def reset_history_page():
+    """Go back to the first page when the search changes"""
+    st.session_state.history_page = 0
+    speculator.cancel(st.session_state.history_session, group="history")
+
+@fragment
+def history_panel():
+    """Paginated prompt history; browsing it reruns only this panel"""
+    # Speculation uses the current settings, which may have changed since the last full run
+    load_settings()
+    with st.expander("Prompt History"):
+        history_store = get_history_store()
+        history_session = st.session_state.history_session
+        search = st.text_input("Search history", key="history_search", placeholder="Filter by prompt text",
+                               on_change=reset_history_page)
+        total = history_store.count(history_session, search)
+        # Add a button to clear history; only this panel changes, so it is redrawn in place
+        if total and st.button("Clear History"):
+            history_store.clear(history_session)
+            st.session_state.history_page = 0
+            total = 0
+        if total:
+            pages = (total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+            page = min(st.session_state.history_page, pages - 1)
         
-        # Display history items in reverse order (newest first)
-        for i, item in enumerate(reversed(st.session_state.history)):
-            # Use HTML for better styling
-            st.markdown(f"""
-            <div class="history-item">
-                <h4>Prompt {len(st.session_state.history) - i}</h4>
-                <p><strong>Time:</strong> {item['timestamp']}</p>
-                <p><strong>Score:</strong> {item['score']}/100</p>
-                <p><strong>Original:</strong> {item['original_prompt'][:100]}{"..." if len(item['original_prompt']) > 100 else ""}</p>
-            </div>
-            """, unsafe_allow_html=True)
+            # Display history items newest first, only for the current page
+            for item in history_store.page(history_session, page, HISTORY_PAGE_SIZE, search):
+                # Use HTML for better styling
+                st.markdown(history_item_html(item['number'], item['timestamp'], item['score'], item['preview']),
+                            unsafe_allow_html=True)
             
-            # Expandable details
-            with st.expander("View Details"):
-                st.markdown("**Original Prompt:**")
-                st.text_area("", value=item['original_prompt'], height=100, disabled=True, key=f"orig_{i}")
+                # Details are only rendered for entries the user opens
+                if st.checkbox("View Details", key=f"details_{item['id']}"):
+                    st.markdown("**Original Prompt:**")
+                    st.text_area("", value=item['prompt'], height=100, disabled=True, key=f"orig_{item['id']}")
                 
-                if item['improved_prompt']:
-                    st.markdown("**Improved Prompt:**")
-                    st.text_area("", value=item['improved_prompt'], height=100, disabled=True, key=f"imp_{i}")
+                    if item['improvedPrompt']:
+                        st.markdown("**Improved Prompt:**")
+                        st.text_area("", value=item['improvedPrompt'], height=100, disabled=True, key=f"imp_{item['id']}")
                     
-                    # Button to use this prompt
-                    if st.button("Use This Prompt", key=f"use_{i}"):
-                        prompt_input = item['improved_prompt']
-                        st.experimental_rerun()
-    else:
-        st.write("No history yet. Get feedback on prompts to build history.")
+                        # Button to use this prompt, whose feedback is prepared in the background.
+                        # The editor is outside this panel, so using it reruns the whole app
+                        if st.button("Use This Prompt", key=f"use_{item['id']}",
+                                     on_click=use_prompt, args=(item['improvedPrompt'],)):
+                            rerun()
+                        speculate(item['improvedPrompt'], "history")
+        
+            # Pagination
+            newer_col, page_col, older_col = st.columns([1, 2, 1])
+            newer_col.button("← Newer", disabled=page == 0, on_click=change_history_page, args=(-1,))
+            page_col.caption(f"Page {page + 1} of {pages} ({total} prompts)")
+            older_col.button("Older →", disabled=page >= pages - 1, on_click=change_history_page, args=(1,))
+        elif search:
+            st.write("No prompts in your history match the search.")
+        else:
+            st.write("No history yet. Get feedback on prompts to build history.")
+
+history_panel()
 
 # Footer
 st.markdown("---")
@@ -335,4 +694,45 @@ st.markdown("""
     <p>Built with ❤️ using LangChain and Streamlit</p>
     <p><a href="https://github.com/tinsantoshi/feedback-prompt" target="_blank">GitHub Repository</a> | <a href="FAQ.md" target="_blank">FAQ</a></p>
 </footer>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+profiler.mark("history and footer")
+
+@fragment
+def diagnostics_panel():
+    """Per-stage latency, cache hit rates and LLM errors for this process; toggling it reruns only this panel"""
+    if not st.checkbox("Show diagnostics", value=False, key="show_diagnostics",
+                       help="Show per-stage latency percentiles, cache hit rates and LLM error counts"):
+        return
+    with st.expander("📈 Diagnostics", expanded=True):
+        if stages := metrics.stage_summary():
+            st.caption("Stage latency (ms)")
+            st.table(stages)
+        else:
+            st.caption("No evaluations yet")
+        cache_requests = {}
+        for labels, count in metrics.counters("feedback_cache_requests_total").items():
+            labels = dict(labels)
+            cache_requests.setdefault(labels["cache"], {})[labels["result"]] = count
+        for cache_name, results in sorted(cache_requests.items()):
+            hits, misses = results.get("hit", 0), results.get("miss", 0)
+            st.write(f"**{cache_name.replace('_', ' ').capitalize()} cache:** {hits}/{hits + misses} hits ({hits / (hits + misses):.0%})")
+        for labels, count in sorted(metrics.counters("feedback_llm_errors_total").items()):
+            labels = dict(labels)
+            st.write(f"**LLM {labels['kind']} errors ({labels['model']}):** {count}")
+
+with st.sidebar:
+    diagnostics_panel()
+
+# Metrics file for scrapers such as node_exporter's textfile collector
+if metrics_file := os.environ.get("FEEDBACK_METRICS_FILE"):
+    metrics.write(metrics_file)
+
+# Profiling report: per-phase times for this run, in the sidebar and on stderr
+if profiler.enabled:
+    stats = get_process_stats()
+    stats["runs"] += 1
+    label = "cold start" if stats["runs"] == 1 else f"warm run {stats['runs']}"
+    profiler.log(label)
+    with st.sidebar.expander(f"⏱️ Profile ({label})", expanded=True):
+        st.table([{"phase": name, "ms": ms} for name, ms in profiler.report()])
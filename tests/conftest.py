@@ -0,0 +1,28 @@
+"""Shared test fixtures"""
+
+import threading
+
+import pytest
+
+from src.PromptFeedbackEvaluator import PromptFeedbackEvaluator
+from src.utils import create_default_feedback_criteria
+
+from helpers import FakeLLM
+
+
+@pytest.fixture
+def criteria():
+    return create_default_feedback_criteria()
+
+
+@pytest.fixture
+def heuristic_evaluator(criteria):
+    return PromptFeedbackEvaluator({"criteria": criteria, "useLLM": False})
+
+
+@pytest.fixture
+def llm_evaluator(criteria):
+    llm = FakeLLM()
+    llm.gate = threading.Event()
+    llm.gate.set()
+    return PromptFeedbackEvaluator({"criteria": criteria, "llmModel": "fake"}, llm=llm)
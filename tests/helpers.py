@@ -0,0 +1,69 @@
+"""Chat model stand-ins and other helpers shared by the tests"""
+
+import json
+import random
+import time
+
+
+LLM_FEEDBACK = {
+    "score": 80,
+    "strengths": ["Clear goal"],
+    "weaknesses": ["No audience"],
+    "suggestions": ["Name the audience"],
+    "improvedPrompt": "Explain recursion to a ten year old with a short story",
+}
+
+
+class FakeChunk:
+    """Streamed chat model chunk"""
+
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """Chat model stand-in that returns LLM_FEEDBACK, streaming it a few characters at a time"""
+
+    def __init__(self, response=None, chunk_chars=8):
+        self.response = json.dumps(LLM_FEEDBACK) if response is None else response
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+        # Set to hold a stream after its first chunk until the test releases it
+        self.gate = None
+
+    def invoke(self, messages):
+        self.calls += 1
+        return FakeChunk(self.response)
+
+    def stream(self, messages):
+        self.calls += 1
+        for start in range(0, len(self.response), self.chunk_chars):
+            if start and self.gate is not None:
+                self.gate.wait(5)
+            yield FakeChunk(self.response[start:start + self.chunk_chars])
+
+
+def wait_for(condition, timeout=5):
+    """Wait until `condition()` is true, failing the test after `timeout` seconds"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for a condition")
+        time.sleep(0.005)
+
+
+# Keywords, near misses, boundaries and characters whose case or whitespace rules differ between languages
+FRAGMENTS = (
+    "because", "since", "as", "given that", "context", "format", "structure", "style", "bullet points",
+    "numbered", "list", "table", "json", "thing", "stuff", "etc", "something", "anything", "good", "nice",
+    "great", "specific", "exactly", "precisely", "detailed", "things", "GREAT", "Etc", "thin", "_etc",
+    "etc_", "word", "alpha", "beta", "2024", "0123", "4294967295", "4294967294", " ", "  ", "\t", "\n",
+    "?", ".", ",", "-", "'", "1", "x", "é", "ß", "Σ", "ǅ", "\u0130", "\u212a",
+    "\x1c", "\x85", "\ufeff", "\xa0", "\u3000",
+)
+
+
+def random_prompts(seed, count=3000):
+    """Random prompts built from FRAGMENTS"""
+    rng = random.Random(seed)
+    return ["".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 25))) for _ in range(count)]
@@ -0,0 +1,44 @@
+"""Component discovery in the adapter"""
+
+import os
+
+import pytest
+
+import adapter
+
+
+@pytest.fixture
+def fresh_discovery(monkeypatch, tmp_path):
+    monkeypatch.setattr(adapter, "_discovered", {})
+    monkeypatch.setenv("FEEDBACK_ADAPTER_MANIFEST", str(tmp_path / "manifest.json"))
+    return tmp_path / "manifest.json"
+
+
+def test_usual_layout_skips_the_manifest(fresh_discovery, monkeypatch):
+    def fail(*args):
+        raise AssertionError("The manifest should not be used")
+
+    monkeypatch.setattr(adapter, "_read_manifest", fail)
+    monkeypatch.setattr(adapter, "_write_manifest", fail)
+    direct_import, path, root = adapter.discover_component()
+    assert (direct_import, path, root) == (False, ".", adapter.MODULE_DIR)
+    assert not fresh_discovery.exists()
+
+
+def test_other_layouts_are_remembered(fresh_discovery, monkeypatch, tmp_path):
+    # adapter.py two levels below a repository root, so only "../.." holds src/
+    module_dir = tmp_path / "repo" / "tools" / "adapter"
+    module_dir.mkdir(parents=True)
+    (tmp_path / "repo" / "src").mkdir()
+    (tmp_path / "repo" / "src" / "PromptFeedbackChain.py").write_text("")
+    monkeypatch.setattr(adapter, "MODULE_DIR", str(module_dir))
+
+    assert adapter.discover_component() == (False, "../..", str(tmp_path / "repo"))
+    assert fresh_discovery.exists()
+    written = os.path.getmtime(fresh_discovery)
+
+    # A later process reads the remembered root instead of probing, and doesn't rewrite the manifest
+    monkeypatch.setattr(adapter, "_discovered", {})
+    monkeypatch.setattr(adapter, "_find_component_root", lambda *args: pytest.fail("Probed again"))
+    assert adapter.discover_component() == (False, "../..", str(tmp_path / "repo"))
+    assert os.path.getmtime(fresh_discovery) == written
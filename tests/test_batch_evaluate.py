@@ -0,0 +1,22 @@
+"""Bulk evaluation"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import batch_evaluate
+from src.PromptFeedbackEvaluator import PromptFeedbackEvaluator
+
+
+def test_cut_prompts_say_so(criteria):
+    config = {"criteria": criteria, "useLLM": False, "maxPromptLength": 30}
+    evaluator = PromptFeedbackEvaluator(config)
+    records = [{"id": 0, "prompt": "Explain recursion. " * 5}, {"id": 1, "prompt": "Explain recursion."}]
+    notice = "Only the first 30 of 95 characters were evaluated. Enable long prompt mode to evaluate the whole prompt"
+
+    in_process = batch_evaluate.evaluate_chunk(records, None, None, evaluator, 0)
+    with ProcessPoolExecutor(1, initializer=batch_evaluate._init_worker, initargs=(config,)) as pool:
+        in_workers = batch_evaluate.evaluate_chunk(records, pool, None, evaluator, 1)
+
+    for results in (in_process, in_workers):
+        assert results[0]["feedback"]["suggestions"][-1] == notice
+        assert not any("were evaluated" in suggestion for suggestion in results[1]["feedback"]["suggestions"])
+    assert in_process == in_workers
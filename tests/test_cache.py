@@ -0,0 +1,81 @@
+"""Feedback cache keys and which results get cached"""
+
+import json
+import threading
+
+from src.PromptFeedbackEvaluator import PromptFeedbackEvaluator
+from src.cache import FeedbackCache, cache_key, should_cache
+from src.utils import create_default_feedback_criteria
+
+
+PROMPT = "Explain recursion to a ten year old using a short story"
+
+
+def make_evaluator():
+    return PromptFeedbackEvaluator({"criteria": create_default_feedback_criteria(), "useLLM": False})
+
+
+def test_cache_key_ignores_criteria_order():
+    criteria = create_default_feedback_criteria()
+    reordered = dict(reversed(list(criteria.items())))
+    assert cache_key(PROMPT, criteria, "gpt-4") == cache_key(PROMPT, reordered, "gpt-4")
+    assert cache_key(PROMPT, criteria, "gpt-4") != cache_key(PROMPT, criteria, "gpt-3.5-turbo")
+
+
+def test_parse_failure_fallback_is_not_cached():
+    evaluator = make_evaluator()
+    heuristic_feedback = evaluator.run_heuristic_evaluation(PROMPT)
+    fallback = evaluator.combine_feedback(heuristic_feedback, evaluator.parse_llm_response("not json"))
+    assert not should_cache(evaluator.parse_llm_response("not json"))
+    assert not should_cache(fallback)
+
+
+def test_failed_llm_call_is_not_cached(criteria):
+    class FailingLLM:
+        def invoke(self, messages):
+            raise RuntimeError("upstream down")
+
+    evaluator = PromptFeedbackEvaluator({"criteria": criteria, "llmModel": "fake", "resilience": {"maxRetries": 0}},
+                                        llm=FailingLLM())
+    heuristic_feedback = evaluator.run_heuristic_evaluation(PROMPT)
+    events = list(evaluator.stream_llm_stage(PROMPT, heuristic_feedback))
+    assert events[-1]["type"] == "complete"
+    assert not should_cache(events[-1]["feedback"])
+
+
+def test_llm_skipped_and_heuristic_feedback_are_cached():
+    evaluator = make_evaluator()
+    heuristic_feedback = evaluator.run_heuristic_evaluation(PROMPT)
+    response = json.dumps({"score": 80, "strengths": ["Clear"], "weaknesses": [], "suggestions": [],
+                           "improvedPrompt": "Tell a short story that explains recursion"})
+    combined = evaluator.combine_feedback(heuristic_feedback, evaluator.parse_llm_response(response))
+    assert should_cache(combined)
+    # Valid LLM feedback without an improved prompt, and routing skipping the LLM
+    without_improved = evaluator.combine_feedback(heuristic_feedback, evaluator.parse_llm_response('{"score": 90}'))
+    assert without_improved["improvedPrompt"] is None
+    assert should_cache(without_improved)
+    assert should_cache(heuristic_feedback)
+
+
+def test_hit_and_miss_counts_are_exact_across_threads(tmp_path):
+    cache = FeedbackCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("hit", {"score": 1, "strengths": [], "weaknesses": [], "suggestions": []})
+
+    def lookups():
+        for i in range(200):
+            cache.get("hit" if i % 2 else "miss")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (cache.hits, cache.misses) == (800, 800)
+
+
+def test_cache_round_trip(tmp_path):
+    cache = FeedbackCache(str(tmp_path / "cache.sqlite3"))
+    feedback = {"score": 75, "strengths": ["Clear"], "weaknesses": [], "suggestions": [], "improvedPrompt": "x"}
+    cache.set("key", feedback)
+    assert cache.get("key") == feedback
+    assert cache.get("other") is None
@@ -0,0 +1,133 @@
+"""Long prompt mode: token-budgeted chunking and merging chunk feedback"""
+
+import random
+import threading
+
+import pytest
+
+from src.PromptFeedbackEvaluator import MAX_MERGED_ITEMS, PromptFeedbackEvaluator
+from src.tokens import _estimate_tokens, split_into_chunks
+
+from helpers import LLM_FEEDBACK, FakeLLM
+
+
+def random_text(rng):
+    pieces = ["word ", "sentence. ", "Really?! ", "line\n", "\n\n", "  ", "x" * rng.randint(1, 300), "é", "İ"]
+    return "".join(rng.choice(pieces) for _ in range(rng.randint(0, 60)))
+
+
+def test_chunks_rebuild_the_text_within_the_budget():
+    rng = random.Random(0)
+    for _ in range(1000):
+        text = random_text(rng)
+        max_tokens = rng.randint(1, 40)
+        chunks = split_into_chunks(text, max_tokens)
+        assert "".join(chunks) == text
+        assert all(chunks)
+        assert all(_estimate_tokens(chunk) <= max_tokens for chunk in chunks), (text, max_tokens)
+
+
+def test_chunks_end_at_sentences_when_they_fit():
+    text = "First sentence here. Second one!\nThird line\n"
+    # Sentences are packed together until the next one would go over the budget
+    assert split_into_chunks(text, 6) == ["First sentence here. ", "Second one!\nThird line\n"]
+    # A sentence over the budget is cut into equal pieces
+    assert split_into_chunks(text, 3) == ["First sent", "ence here. ", "Second one!\n", "Third line\n"]
+    assert split_into_chunks(text, 1000) == [text]
+    assert split_into_chunks("", 10) == []
+    with pytest.raises(ValueError):
+        split_into_chunks(text, 0)
+
+
+def test_long_sentences_split_evenly():
+    chunks = split_into_chunks("x" * 4001, 250)
+    assert len(chunks) == 5
+    assert max(map(len, chunks)) - min(map(len, chunks)) <= 1
+
+
+def test_custom_token_counter():
+    text = "one two three. four five six seven. eight."
+    chunks = split_into_chunks(text, 4, count_tokens=lambda s: len(s.split()))
+    assert chunks == ["one two three. ", "four five six seven. ", "eight."]
+
+
+def feedback(score, items=(), improved="better"):
+    return {"score": score, "strengths": list(items), "weaknesses": [], "suggestions": list(items),
+            "improvedPrompt": improved}
+
+
+def test_merge_weights_scores_by_chunk_length(heuristic_evaluator):
+    merged = heuristic_evaluator.merge_chunk_feedback(["a" * 30, "b" * 10], [feedback(80, ["x"]), feedback(41, ["x", "y"])])
+    # (30 * 80 + 10 * 41) / 40 = 70.25
+    assert merged["score"] == 70
+    assert merged["strengths"] == ["x", "y"]
+    assert merged["improvedPrompt"] == "better\n\nbetter"
+    assert "_fallback" not in merged
+    # Halves round up like Math.round
+    assert heuristic_evaluator.merge_chunk_feedback(["ab", "cd"], [feedback(70), feedback(71)])["score"] == 71
+
+
+def test_merge_caps_lists_and_reports_missing_parts(heuristic_evaluator):
+    items = ["item %d" % i for i in range(MAX_MERGED_ITEMS + 5)]
+    merged = heuristic_evaluator.merge_chunk_feedback(
+        ["one", "two", "three"], [feedback(60, items), None, feedback(90, items, improved=None)],
+        total_chunks=5, failed=[1],
+    )
+    assert merged["strengths"] == items[:MAX_MERGED_ITEMS]
+    # Only chunks with feedback are weighted: (3 * 60 + 5 * 90) / 8
+    assert merged["score"] == 79
+    assert merged["improvedPrompt"] is None
+    # A failed part makes the merge a fallback, which is never cached
+    assert merged["_fallback"]
+    assert merged["suggestions"][-2:] == [
+        "Part 2 of the prompt could not be evaluated by the LLM",
+        "Only the first 3 of 5 parts of the prompt were evaluated by the LLM. "
+        "Raise maxChunks or chunkTokens to include the rest",
+    ]
+
+
+def test_merge_waits_for_every_improved_chunk(heuristic_evaluator):
+    merged = heuristic_evaluator.merge_chunk_feedback(["one", "two"], [feedback(50, improved=" first \n"), None])
+    assert merged["score"] == 50
+    assert merged["improvedPrompt"] is None
+
+
+def test_chunked_llm_feedback_covers_every_chunk(llm_evaluator):
+    llm_evaluator.config.update({"longPromptMode": True, "chunkTokens": 20, "maxChunks": 3, "chunkConcurrency": 2})
+    prompt = "".join("Sentence number %d asks for a short story about recursion. " % i for i in range(6))
+    chunks = llm_evaluator.split_prompt(prompt)
+    assert len(chunks) == 6 and "".join(chunks) == prompt
+
+    updates = list(llm_evaluator.iter_chunked_llm_feedback(chunks))
+    assert len(updates) == 3
+    merged = updates[-1]
+    assert merged["score"] == LLM_FEEDBACK["score"]
+    assert merged["strengths"] == LLM_FEEDBACK["strengths"]
+    assert merged["improvedPrompt"] == "\n\n".join([LLM_FEEDBACK["improvedPrompt"]] * 3)
+    assert merged["suggestions"][-1].startswith("Only the first 3 of 6 parts")
+    assert llm_evaluator.llm.calls == 3
+
+
+class BlockingLLM(FakeLLM):
+    """FakeLLM whose second and later requests wait for `release`"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def invoke(self, messages):
+        if self.calls:
+            self.release.wait(5)
+        return super().invoke(messages)
+
+
+def test_closing_chunked_feedback_skips_queued_parts(criteria):
+    llm = BlockingLLM()
+    evaluator = PromptFeedbackEvaluator({"criteria": criteria, "llmModel": "fake", "longPromptMode": True,
+                                         "chunkConcurrency": 1}, llm=llm)
+    updates = evaluator.iter_chunked_llm_feedback(["Part one is here.", "Part two is here.", "Part three here."])
+    assert next(updates)["score"] == LLM_FEEDBACK["score"]
+    # The second part is running; the third is queued and never sent
+    threading.Timer(0.1, llm.release.set).start()
+    updates.close()
+    assert llm.calls == 2
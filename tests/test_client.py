@@ -0,0 +1,103 @@
+"""Feedback service client connection handling"""
+
+import json
+import select
+import socket
+import threading
+
+import pytest
+
+from src.client import FeedbackServiceClient
+
+from helpers import wait_for
+
+
+class RawServer:
+    """
+    HTTP server that answers requests with `reply(method)` on kept-alive connections.
+    A reply of None drops the connection without answering, and `close_after` closes
+    each connection after that many answers.
+    """
+
+    def __init__(self, reply, close_after=None):
+        self.reply = reply
+        self.close_after = close_after
+        self.requests = []
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.url = f"http://127.0.0.1:{self.sock.getsockname()[1]}"
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        reader = conn.makefile("rb")
+        answered = 0
+        with conn:
+            while True:
+                line = reader.readline()
+                if not line:
+                    return
+                method = line.split()[0].decode()
+                length = 0
+                while (header := reader.readline()) not in (b"\r\n", b""):
+                    if header.lower().startswith(b"content-length:"):
+                        length = int(header.split(b":")[1])
+                reader.read(length)
+                self.requests.append(method)
+                body = self.reply(method)
+                if body is None:
+                    return
+                data = json.dumps(body).encode()
+                conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\n\r\n%s" % (len(data), data))
+                answered += 1
+                if self.close_after is not None and answered >= self.close_after:
+                    return
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def server_factory():
+    servers = []
+
+    def create(reply, close_after=None):
+        servers.append(RawServer(reply, close_after))
+        return servers[-1]
+
+    yield create
+    for server in servers:
+        server.close()
+
+
+def test_sent_post_is_not_resent(server_factory):
+    server = server_factory(lambda method: None)
+    client = FeedbackServiceClient(server.url, timeout=5)
+    with pytest.raises(ConnectionError):
+        client.evaluate("Explain recursion")
+    assert server.requests == ["POST"]
+
+
+def test_get_is_resent_once(server_factory):
+    server = server_factory(lambda method: None)
+    client = FeedbackServiceClient(server.url, timeout=5)
+    with pytest.raises(ConnectionError):
+        client.health()
+    assert server.requests == ["GET", "GET"]
+
+
+def test_post_reconnects_after_service_closed_idle_connection(server_factory):
+    server = server_factory(lambda method: {"feedback": {"score": 1}, "status": "ok"}, close_after=1)
+    client = FeedbackServiceClient(server.url, timeout=5)
+    assert client.health()["status"] == "ok"
+    # Wait until the service has closed the kept-alive connection
+    wait_for(lambda: select.select([client._local.conn.sock], [], [], 0)[0])
+    assert client.evaluate("Explain recursion") == {"score": 1}
+    assert server.requests == ["GET", "POST"]
@@ -0,0 +1,50 @@
+"""Round trips of the compact feedback encoding"""
+
+import json
+import zlib
+
+import pytest
+
+from src.compact import FINDINGS, MAGIC, CompactFeedback, decode_feedback, encode_feedback
+
+
+FEEDBACK = [
+    {"score": 70, "strengths": [FINDINGS[0], FINDINGS[1]], "weaknesses": [FINDINGS[5]], "suggestions": []},
+    {"score": 82.5, "strengths": ["Clear goal", FINDINGS[2]], "weaknesses": [FINDINGS[6], "Vague ñ ✨"],
+     "suggestions": [FINDINGS[9], "Add an example"], "improvedPrompt": "Explain recursion with an example"},
+    {"score": 0, "strengths": [], "weaknesses": [], "suggestions": [], "improvedPrompt": None},
+    {"score": 55, "strengths": [], "weaknesses": [""], "suggestions": [], "improvedPrompt": ""},
+    {"score": 90, "strengths": ["x" * 3000], "weaknesses": [], "suggestions": [], "improvedPrompt": "y" * 3000},
+]
+
+
+@pytest.mark.parametrize("feedback", FEEDBACK)
+def test_round_trip(feedback):
+    encoded = encode_feedback(feedback)
+    assert isinstance(encoded, bytes) and encoded[0] == MAGIC
+    decoded = decode_feedback(encoded)
+    assert decoded == feedback
+    assert type(decoded["score"]) is type(feedback["score"])
+    assert CompactFeedback.from_bytes(encoded).to_dict() == feedback
+    assert CompactFeedback.from_dict(feedback).to_bytes() == encoded
+
+
+@pytest.mark.parametrize("feedback", [
+    {"score": 50, "strengths": [], "weaknesses": [], "suggestions": [], "improvedPrompt": "\ud800"},
+    {"score": 50, "strengths": ["bad \udc00 text"], "weaknesses": [], "suggestions": []},
+    {"score": 50, "strengths": ["nul\0byte"], "weaknesses": [], "suggestions": []},
+    {"score": 50, "strengths": [], "weaknesses": [], "suggestions": [], "note": "extra key"},
+    {"score": "50", "strengths": [], "weaknesses": [], "suggestions": []},
+])
+def test_unrepresentable_feedback_falls_back_to_json(feedback):
+    encoded = encode_feedback(feedback)
+    assert isinstance(encoded, str)
+    assert decode_feedback(encoded) == feedback
+
+
+def test_decodes_earlier_formats():
+    feedback = FEEDBACK[1]
+    text = json.dumps(feedback)
+    assert decode_feedback(text) == feedback
+    assert decode_feedback(text.encode("utf-8")) == feedback
+    assert decode_feedback(zlib.compress(text.encode("utf-8"))) == feedback
@@ -0,0 +1,43 @@
+"""Retention and paging of the prompt history store"""
+
+import time
+
+from src.history import HistoryStore
+
+
+FEEDBACK = {"score": 60, "strengths": ["Prompt provides context"], "weaknesses": [], "suggestions": [],
+            "improvedPrompt": "Better prompt"}
+
+
+def test_page_newest_first(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    for number in range(15):
+        store.add("a", f"prompt {number}", FEEDBACK)
+    assert store.count("a") == 15
+    first = store.page("a", 0, 10)
+    assert [entry["prompt"] for entry in first[:2]] == ["prompt 14", "prompt 13"]
+    assert first[0]["number"] == 15 and first[0]["improvedPrompt"] == "Better prompt"
+    assert len(store.page("a", 1, 10)) == 5
+    assert store.count("a", "prompt 1") == 6
+
+
+def test_per_session_and_total_caps(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"), max_entries=3, max_total_entries=5)
+    for number in range(4):
+        store.add("a", f"a{number}", FEEDBACK)
+    assert [entry["prompt"] for entry in store.page("a")] == ["a3", "a2", "a1"]
+    for number in range(3):
+        store.add("b", f"b{number}", FEEDBACK)
+    # The oldest entries across sessions go first once the store is full
+    assert store.count("a") == 2 and store.count("b") == 3
+    assert sum(1 for _ in store.prompts()) == 5
+
+
+def test_expired_sessions_are_pruned(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"), ttl=60)
+    store.add("abandoned", "old prompt", FEEDBACK)
+    with store._connect() as conn:
+        conn.execute("UPDATE history SET created_at = ?", (time.time() - 120,))
+    store.add("active", "new prompt", FEEDBACK)
+    assert store.count("abandoned") == 0
+    assert store.count("active") == 1
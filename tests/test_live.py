@@ -0,0 +1,110 @@
+"""Parity of incremental heuristics with the full heuristic evaluation"""
+
+import random
+import sqlite3
+import threading
+
+from src.PromptFeedbackEvaluator import PromptFeedbackEvaluator
+from src.live import IncrementalHeuristics, LiveEvaluator, edit_region
+from src.utils import create_default_feedback_criteria
+
+from helpers import LLM_FEEDBACK, wait_for
+
+
+WORDS = ["please", "return", "json", "list", "table", "format", "explain", "why", "what", "context",
+         "background", "thing", "stuff", "something", "specific", "exactly", "as a", "?", "İ", "\u212a", "ß", "\n"]
+
+
+def make_evaluator():
+    return PromptFeedbackEvaluator({"criteria": create_default_feedback_criteria(), "useLLM": False})
+
+
+def test_edit_region():
+    assert edit_region("hello world", "hello there world") == (6, 6, 12)
+    assert edit_region("abc", "abc") == (3, 3, 3)
+    assert edit_region("", "abc") == (0, 0, 3)
+
+
+def test_length_changing_lowercase_keeps_counts():
+    evaluator = make_evaluator()
+    heuristics = IncrementalHeuristics(evaluator)
+    text = "İ please return json or json here"
+    assert heuristics.update(text) == evaluator.run_heuristic_evaluation(text)
+    text = "İ please return json or  here"
+    assert heuristics.update(text) == evaluator.run_heuristic_evaluation(text)
+    assert heuristics.update(text)["score"] == 90
+
+
+def test_random_edits_match_full_evaluation():
+    evaluator = make_evaluator()
+    heuristics = IncrementalHeuristics(evaluator)
+    rng = random.Random(1234)
+    text = ""
+    for _ in range(2000):
+        position = rng.randint(0, len(text))
+        if text and rng.random() < 0.4:
+            end = min(len(text), position + rng.randint(1, 12))
+            text = text[:position] + text[end:]
+        else:
+            words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+            text = text[:position] + words + " " + text[position:]
+        assert heuristics.update(text) == evaluator.run_heuristic_evaluation(evaluator.process_input(text)), text
+
+
+class BrokenCache:
+    """Feedback cache whose database is locked"""
+
+    def __init__(self, fail_get=True, block=None):
+        self.fail_get = fail_get
+        self.block = block
+        self.sets = 0
+
+    def get(self, key):
+        if self.block is not None:
+            self.block.wait(5)
+        if self.fail_get:
+            raise sqlite3.OperationalError("database is locked")
+        return None
+
+    def set(self, key, value):
+        self.sets += 1
+        raise sqlite3.OperationalError("database is locked")
+
+
+def settled(live):
+    return not live.snapshot()["pending"]
+
+
+def test_cache_errors_still_publish_feedback(llm_evaluator):
+    prompt = "Explain recursion to a child because they asked"
+    for cache in (BrokenCache(fail_get=True), BrokenCache(fail_get=False)):
+        live = LiveEvaluator(llm_evaluator, debounce_ms=0, cache=cache, cache_model="fake")
+        live.update(prompt)
+        wait_for(lambda: settled(live))
+        assert live.snapshot()["feedback"]["improvedPrompt"] == LLM_FEEDBACK["improvedPrompt"]
+    assert cache.sets == 1
+
+
+def test_failures_outside_the_llm_call_clear_pending(llm_evaluator, monkeypatch):
+    def broken_route(prompt, heuristic_feedback):
+        raise RuntimeError("routing failed")
+
+    monkeypatch.setattr(llm_evaluator, "route", broken_route)
+    live = LiveEvaluator(llm_evaluator, debounce_ms=0)
+    heuristic_feedback = live.update("Explain recursion to a child because they asked")
+    wait_for(lambda: settled(live))
+    assert live.snapshot()["feedback"] == heuristic_feedback
+
+
+def test_slow_cache_does_not_block_other_sessions(llm_evaluator):
+    release = threading.Event()
+    try:
+        slow = LiveEvaluator(llm_evaluator, debounce_ms=0, cache=BrokenCache(fail_get=False, block=release))
+        slow.update("Explain recursion to a child because they asked")
+        fast = LiveEvaluator(llm_evaluator, debounce_ms=0)
+        fast.update("Explain quicksort to a student because they asked")
+        wait_for(lambda: settled(fast))
+        assert not settled(slow)
+    finally:
+        release.set()
+    wait_for(lambda: settled(slow))
@@ -0,0 +1,81 @@
+"""Retries and circuit breaking around LLM calls"""
+
+import time
+
+import pytest
+
+from src.resilience import CircuitOpenError, LLMGuard, is_retryable
+
+
+class StatusError(Exception):
+    """Provider error with an HTTP status code"""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def failing(status_code):
+    def call():
+        raise StatusError(status_code)
+    return call
+
+
+def make_guard(**options):
+    return LLMGuard({"maxRetries": 0, "failureThreshold": 2, "resetTimeout": 0.05, **options}, model="fake")
+
+
+def test_retryable_errors():
+    assert is_retryable(StatusError(429)) and is_retryable(StatusError(503))
+    assert is_retryable(TimeoutError()) and is_retryable(ConnectionResetError())
+    assert not is_retryable(StatusError(400)) and not is_retryable(StatusError(401))
+
+
+def test_retries_then_succeeds():
+    guard = make_guard(maxRetries=2, retryBaseDelay=0.001)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise StatusError(500)
+        return "ok"
+
+    assert guard.call(flaky) == "ok"
+    assert len(attempts) == 3 and guard.breaker.state == "closed"
+
+
+def test_breaker_opens_after_consecutive_failures():
+    guard = make_guard()
+    for _ in range(2):
+        with pytest.raises(StatusError):
+            guard.call(failing(503))
+    assert guard.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        guard.call(lambda: "ok")
+
+
+def test_client_error_does_not_close_a_half_open_breaker():
+    guard = make_guard()
+    for _ in range(2):
+        with pytest.raises(StatusError):
+            guard.call(failing(503))
+    time.sleep(0.06)
+    # The probe gets a client error: the breaker stays half-open and lets another probe through
+    with pytest.raises(StatusError):
+        guard.call(failing(401))
+    assert guard.breaker.state == "half_open"
+    with pytest.raises(StatusError):
+        guard.call(failing(503))
+    assert guard.breaker.state == "open"
+
+
+def test_client_errors_do_not_reset_the_failure_count():
+    guard = make_guard(failureThreshold=3)
+    for status_code in (503, 400, 503):
+        with pytest.raises(StatusError):
+            guard.call(failing(status_code))
+    assert guard.breaker.failures == 2
+    with pytest.raises(StatusError):
+        guard.call(failing(503))
+    assert guard.breaker.state == "open"
@@ -0,0 +1,35 @@
+"""Parity of the vectorized batch scoring with calculate_basic_prompt_score"""
+
+import pytest
+
+from src.scoring import prompt_features, score_batch
+from src.utils import calculate_basic_prompt_score
+
+from helpers import random_prompts
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100000])
+def test_score_batch_matches_calculate_basic_prompt_score(chunk_size):
+    prompts = random_prompts(seed=chunk_size, count=2000)
+    scores = score_batch(prompts, chunk_size=chunk_size)
+    assert scores.dtype == np.int64
+    assert scores.tolist() == [calculate_basic_prompt_score(prompt) for prompt in prompts]
+
+
+def test_offsets_stay_with_their_prompt_when_lowercasing_grows_the_text():
+    # Each dotted capital I lowercases to two characters, which shifts the joined offsets of the prompts after it
+    prompts = ["\u0130" * 50, "format", "\u0130\u0130 etc", "plain", "", None, "etc\u212a"]
+    assert score_batch(prompts).tolist() == [calculate_basic_prompt_score(prompt) for prompt in prompts]
+    features = prompt_features(prompts)
+    assert features["format"].tolist() == [False, True, False, False, False, False, False]
+    assert features["vague"].tolist() == [False, False, True, False, False, False, True]
+
+
+def test_empty_and_generator_input():
+    assert score_batch([]).tolist() == []
+    assert score_batch(prompt for prompt in ["a list?", ""]).tolist() == [
+        calculate_basic_prompt_score("a list?"), 0]
+    with pytest.raises(ValueError):
+        score_batch(["x"], chunk_size=0)
@@ -0,0 +1,60 @@
+"""Feedback service internals"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from feedback_service import FeedbackService
+
+
+@pytest.fixture
+def service():
+    service = FeedbackService(max_concurrency=1)
+    service.start()
+    yield service
+    service.close()
+
+
+def test_abandoned_stream_closes_its_iterator_and_frees_the_thread(service):
+    pulled = []
+    closed = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                time.sleep(0.01)
+                pulled.append(None)
+                yield len(pulled)
+        finally:
+            closed.set()
+
+    # Held here, so only an explicit close() stops it
+    iterator = endless()
+
+    async def disconnect_after_first_item():
+        events = service._in_thread(iterator)
+        assert await events.__anext__() == 1
+        await events.aclose()
+        # The only LLM pool thread is free again once the iterator is closed
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(service.llm_pool, lambda: "free"), 5)
+
+    assert asyncio.run(disconnect_after_first_item()) == "free"
+    assert closed.wait(5)
+    count = len(pulled)
+    time.sleep(0.05)
+    assert len(pulled) == count <= 2
+
+
+def test_iterator_errors_reach_the_consumer(service):
+    def failing():
+        yield 1
+        raise ValueError("upstream failed")
+
+    async def consume():
+        return [item async for item in service._in_thread(failing())]
+
+    with pytest.raises(ValueError, match="upstream failed"):
+        asyncio.run(consume())
@@ -0,0 +1,67 @@
+"""Coalescing of identical in-flight LLM requests"""
+
+import threading
+
+from src.singleflight import SingleFlight, llm_flights
+
+from helpers import LLM_FEEDBACK, wait_for
+
+
+PROMPT = "Explain recursion to a child using a story about nesting dolls"
+
+
+def test_do_shares_one_call():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow(value):
+        calls.append(value)
+        release.wait(5)
+        return {"value": value}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do("key", slow, 1))) for _ in range(3)]
+    threads[0].start()
+    wait_for(lambda: flights.in_flight() == 1)
+    for thread in threads[1:]:
+        thread.start()
+    wait_for(lambda: flights.shared == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == [{"value": 1}] * 3
+
+
+def test_closed_leader_stream_still_serves_followers(llm_evaluator):
+    llm = llm_evaluator.llm
+    llm.gate.clear()
+    leader = llm_evaluator.stream_llm_feedback(PROMPT)
+    started = threading.Thread(target=lambda: next(leader))
+    started.start()
+    wait_for(lambda: llm_flights.in_flight() == 1)
+
+    results = []
+    follower = threading.Thread(target=lambda: results.extend(llm_evaluator.stream_llm_feedback(PROMPT)))
+    follower.start()
+    wait_for(lambda: next(iter(llm_flights._in_flight.values())).waiters == 1)
+
+    llm.gate.set()
+    started.join()
+    # The leader gives up part way, as a cancelled speculative evaluation does
+    leader.close()
+    follower.join(5)
+    assert results == [LLM_FEEDBACK]
+    assert llm.calls == 1
+    wait_for(lambda: llm_flights.in_flight() == 0)
+
+
+def test_closed_leader_stream_without_followers_is_abandoned(llm_evaluator):
+    llm = llm_evaluator.llm
+    leader = llm_evaluator.stream_llm_feedback(PROMPT)
+    next(leader)
+    leader.close()
+    assert llm_flights.in_flight() == 0
+    assert list(llm_evaluator.stream_llm_feedback(PROMPT))[-1] == LLM_FEEDBACK
+    assert llm.calls == 2
@@ -0,0 +1,78 @@
+"""Speculative background evaluation"""
+
+import os
+import sys
+import threading
+
+from src.speculation import Speculator
+
+from helpers import wait_for
+
+
+def blocking_job(started, release, ran):
+    def run(cancelled):
+        started.set()
+        release.wait(5)
+        ran.append(cancelled.is_set())
+    return run
+
+
+def test_jobs_are_deduplicated_and_remembered():
+    speculator = Speculator()
+    ran = []
+    done = threading.Event()
+    assert speculator.submit("s", "a", lambda cancelled: (ran.append("a"), done.set()))
+    assert not speculator.submit("s", "a", lambda cancelled: ran.append("again"))
+    done.wait(5)
+    wait_for(lambda: not speculator._jobs)
+    assert not speculator.submit("s", "a", lambda cancelled: ran.append("again"))
+    assert ran == ["a"]
+
+
+def test_no_job_starts_during_foreground_work():
+    speculator = Speculator()
+    started = threading.Event()
+    with speculator.foreground():
+        speculator.submit("s", "a", lambda cancelled: started.set())
+        assert not started.wait(0.1)
+    assert started.wait(5)
+
+
+def test_cancel_and_supersede():
+    speculator = Speculator(max_pending=4)
+    started, release, ran = threading.Event(), threading.Event(), []
+    speculator.submit("s", "running", blocking_job(started, release, ran))
+    started.wait(5)
+    speculator.submit("s", "queued", lambda cancelled: ran.append("queued"))
+    speculator.submit("s", "other", lambda cancelled: ran.append("other"), group="history")
+
+    # A running job is left to finish for the foreground evaluation to join; a queued one is dropped
+    assert speculator.supersede("s", "running")
+    assert not speculator.supersede("s", "queued")
+    speculator.cancel("s", group="history")
+    release.set()
+    wait_for(lambda: not speculator._jobs and not speculator._queue)
+    assert ran == [False]
+
+
+def test_pending_jobs_are_capped_per_owner():
+    speculator = Speculator(max_pending=2)
+    started, release, ran = threading.Event(), threading.Event(), []
+    speculator.submit("s", "running", blocking_job(started, release, ran))
+    started.wait(5)
+    for key in "abc":
+        speculator.submit("s", key, lambda cancelled, key=key: ran.append(key))
+    release.set()
+    wait_for(lambda: not speculator._jobs)
+    assert ran == [False, "b", "c"]
+
+
+def test_thread_priority_is_only_lowered_on_linux(monkeypatch):
+    calls = []
+    monkeypatch.setattr(os, "setpriority", lambda *args: calls.append(args), raising=False)
+    for platform, expected in (("darwin", 0), ("linux", 1)):
+        monkeypatch.setattr(sys, "platform", platform)
+        done = threading.Event()
+        Speculator().submit("s", "a", lambda cancelled: done.set())
+        assert done.wait(5)
+        assert len(calls) == expected
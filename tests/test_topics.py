@@ -0,0 +1,44 @@
+"""TF-IDF topic index"""
+
+from src.topics import TopicIndex
+from src.utils import extract_key_topics
+
+
+PROMPTS = [
+    "Explain recursion in Python with a short example of a recursive function",
+    "Write a Python function that reverses a linked list and explain the complexity",
+    "Summarize the history of the Roman empire in five bullet points",
+    "Explain how Python decorators work with an example",
+]
+
+
+def test_first_prompt_matches_extract_key_topics():
+    index = TopicIndex()
+    assert index.extract(PROMPTS[0]) == extract_key_topics(PROMPTS[0])
+
+
+def test_common_words_rank_lower():
+    index = TopicIndex()
+    for prompt in PROMPTS[:3]:
+        index.add(prompt)
+    topics = index.topics(PROMPTS[3])
+    assert topics[0] == "decorators"
+    assert topics.index("python") > topics.index("decorators")
+
+
+def test_repeated_prompts_are_counted_once():
+    index = TopicIndex()
+    index.extract_batch(PROMPTS)
+    state = (index.documents, dict(index.document_frequency))
+    for _ in range(3):
+        index.extract(PROMPTS[1])
+    assert (index.documents, index.document_frequency) == state
+
+
+def test_vocabulary_is_capped():
+    index = TopicIndex(max_words=100, max_prompts=50)
+    for number in range(500):
+        index.add(f"common shared words plus unique{number} rare{number}")
+    assert len(index.document_frequency) <= 100
+    assert len(index._seen) == 50
+    assert index.document_frequency["common"] == 500
@@ -0,0 +1,109 @@
+"""Parity of the keyword matcher, scoring and topic extraction with the TypeScript rules"""
+
+import random
+import re
+
+import pytest
+
+from src.utils import (
+    CONTEXT_WORDS, FORMAT_WORDS, HEURISTIC_MATCHER, SCORE_CONTEXT_WORDS, SPECIFICITY_WORDS,
+    STOP_WORDS, VAGUE_WORDS, KeywordMatcher, calculate_basic_prompt_score, extract_key_topics,
+)
+
+from helpers import random_prompts
+
+
+# Straight ports of the TypeScript rules
+def includes_any(prompt, words):
+    return any(word in prompt.lower() for word in words)
+
+
+def has_whole_word(prompt, words):
+    # Without the u flag, JavaScript's \b and i flag only know ASCII, which re.ASCII matches
+    return any(re.search(r"\b%s\b" % word, prompt, re.IGNORECASE | re.ASCII) for word in words)
+
+
+def reference_sets(prompt):
+    found = set()
+    if includes_any(prompt, CONTEXT_WORDS):
+        found.add("context")
+    if includes_any(prompt, FORMAT_WORDS):
+        found.add("format")
+    if has_whole_word(prompt, VAGUE_WORDS):
+        found.add("vague")
+    return found
+
+
+def reference_score(prompt):
+    if not prompt:
+        return 0
+    score = 50 + min(20, len(prompt) // 10)
+    score += 10 if includes_any(prompt, SPECIFICITY_WORDS) else 0
+    score += 10 if "?" in prompt else 0
+    score += 10 if includes_any(prompt, SCORE_CONTEXT_WORDS) else 0
+    score += 10 if includes_any(prompt, FORMAT_WORDS) else 0
+    score -= 10 if has_whole_word(prompt, VAGUE_WORDS) else 0
+    return max(0, min(100, score))
+
+
+JS_WHITESPACE = r"\t\n\v\f\r \xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000\ufeff"
+
+
+def reference_topics(prompt):
+    clean = re.sub(r"[.,/#!$%^&*;:{}=\-_`~()]", "", prompt.lower())
+    clean = re.sub("[%s]{2,}" % JS_WHITESPACE, " ", clean)
+    frequency = {}
+    for word in clean.split(" "):
+        if len(word) > 3 and word not in STOP_WORDS:
+            frequency[word] = frequency.get(word, 0) + 1
+    # Object.entries lists array index keys first, in numeric order
+    indices = sorted((w for w in frequency if re.fullmatch("0|[1-9][0-9]*", w) and int(w) < 2 ** 32 - 1), key=int)
+    entries = [(w, frequency[w]) for w in indices] + [(w, c) for w, c in frequency.items() if w not in indices]
+    return [w for w, _ in sorted(entries, key=lambda entry: -entry[1])][:5]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_matcher_score_and_topics_match_the_typescript_rules(seed):
+    for prompt in random_prompts(seed):
+        assert HEURISTIC_MATCHER.match(prompt) == reference_sets(prompt), prompt
+        assert calculate_basic_prompt_score(prompt) == reference_score(prompt), prompt
+        assert extract_key_topics(prompt) == reference_topics(prompt), prompt
+
+
+@pytest.mark.parametrize("prompt, expected", [
+    ("etc\u0130", {"vague"}),  # lowercases to "etci\u0307", but \b sees a non-word character
+    ("\u212aetc", {"vague"}),  # the Kelvin sign lowercases to an ASCII "k"
+    ("etc\u212a format", {"vague", "format"}),
+    ("etcetera", set()),
+    ("thing_", set()),
+])
+def test_whole_words_use_javascript_boundaries(prompt, expected):
+    assert HEURISTIC_MATCHER.match(prompt) == expected
+    assert {name for name, found in HEURISTIC_MATCHER.positions(prompt).items() if found} == expected
+
+
+def test_topic_ties_follow_javascript_object_order():
+    assert extract_key_topics("zeta 2024 alpha 1999 0123") == ["1999", "2024", "zeta", "alpha", "0123"]
+    assert extract_key_topics("word\x1c\x1cother") == ["word\x1c\x1cother"]
+
+
+def test_positions_match_every_keyword_start():
+    matcher = KeywordMatcher(substring_sets={"a": ("ab", "abc", "b"), "b": ("bc",)}, word_sets={"w": ("ab", "c")})
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = "".join(rng.choice("abcAB _-") for _ in range(rng.randint(0, 30)))
+        lowered = text.lower()
+        expected = {
+            name: sorted({i for word in words for i in range(len(lowered)) if lowered.startswith(word, i)})
+            for name, words in (("a", ("ab", "abc", "b")), ("b", ("bc",)))
+        }
+        expected["w"] = sorted(m.start() for word in ("ab", "c") for m in re.finditer(r"\b%s\b" % word, lowered, re.ASCII))
+        assert matcher.positions(text) == expected, text
+        assert matcher.match(text) == {name for name, found in expected.items() if found}, text
+
+
+def test_keyword_sets_are_validated():
+    with pytest.raises(ValueError):
+        KeywordMatcher(substring_sets={"a": ("x",)}, word_sets={"a": ("y",)})
+    with pytest.raises(ValueError):
+        KeywordMatcher(substring_sets={"a": ("",)})